@@ -0,0 +1,93 @@
+import glob
+import hashlib
+import os
+
+import polars as pl
+
+from jobs import JOBS
+
+DEFAULT_CACHE_DIR = "data/.columnar_cache"
+# Total size of converted files kept on disk
+DEFAULT_MAX_BYTES = 20 * 1024 ** 3
+
+
+class ColumnarCache:
+    """
+    Transparent CSV -> Parquet conversion cache. The first lookup of a CSV
+    starts a streaming conversion (sink_parquet, bounded memory) as a
+    background job, which reports bytes written and can be cancelled; once it
+    finishes, lookups return the Parquet copy. Copies are keyed by path +
+    size + mtime and evicted least recently used beyond max_bytes.
+    """
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES, jobs=JOBS):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.jobs = jobs
+
+    def _target(self, path):
+        st = os.stat(path)
+        raw = f"{os.path.abspath(path)}|{st.st_size}|{st.st_mtime_ns}"
+        return os.path.join(self.cache_dir, hashlib.sha1(raw.encode()).hexdigest() + ".parquet")
+
+    def lookup(self, path, convert=True):
+        """
+        Path of the Parquet copy of `path` if it is ready, else None.
+        When convert is True a missing copy is scheduled for conversion.
+        """
+        target = self._target(path)
+        if os.path.exists(target):
+            # mtime doubles as the last-used time for eviction
+            os.utime(target)
+            return target
+        if convert:
+            self.convert_async(path, target)
+        return None
+
+    def convert_async(self, path, target=None):
+        """Start (or join) the conversion job for path and return it."""
+        target = target or self._target(path)
+        return self.jobs.submit(f"Convert {os.path.basename(path)}", self._convert, path, target,
+                                key=("convert", target))
+
+    def convert(self, path):
+        """Convert synchronously (or wait for a running conversion) and return the Parquet path."""
+        job = self.convert_async(path)
+        job.wait()
+        if job.status != "done":
+            raise RuntimeError(f"CSV conversion {job.status}: {job.error or path}")
+        return job.result
+
+    def _convert(self, job, path, target):
+        tmp = target + ".tmp"
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            print(f"Converting {path} to {target}...")
+            job.run_query(pl.scan_csv(path).sink_parquet(tmp, lazy=True), progress_path=tmp)
+            os.replace(tmp, target)
+            self._evict(keep=target)
+            return target
+        except Exception as e:
+            print(f"CSV conversion stopped for {path}: {e!r}")
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            raise
+
+    def _evict(self, keep=None):
+        files = sorted(glob.glob(os.path.join(self.cache_dir, "*.parquet")), key=os.path.getmtime)
+        total = sum(os.path.getsize(f) for f in files)
+        for f in files:
+            if total <= self.max_bytes:
+                break
+            if f == keep:
+                continue
+            total -= os.path.getsize(f)
+            os.remove(f)
+
+    def clear(self):
+        for f in glob.glob(os.path.join(self.cache_dir, "*.parquet")):
+            os.remove(f)
+
+
+# Process-wide conversion cache
+COLUMNAR_CACHE = ColumnarCache()
@@ -0,0 +1,172 @@
+import threading
+from collections import OrderedDict
+
+import polars as pl
+
+ROWS = "rows"
+STALE = "minmax_stale"
+# Cubes with more groups than this are refused: the dimensions are not low-cardinality
+MAX_GROUPS = 100_000
+DEFAULT_MAX_CUBES = 32
+# Rows looked at to recognize a column that numbers the rows
+KEY_SAMPLE_ROWS = 1_000
+
+
+def measure_columns(schema, exclude=("id",)):
+    """Numeric columns that can be summed."""
+    return [c for c, dtype in schema.items() if dtype.is_numeric() and c not in exclude]
+
+
+def key_columns(lf, sample_rows=KEY_SAMPLE_ROWS):
+    """
+    Integer columns that number the rows, such as an id or an index written
+    out with the data: in the first sample_rows rows each value is the
+    previous one plus one. Neither a dimension nor a measure.
+    """
+    lf = lf.lazy()
+    columns = [c for c, dtype in lf.collect_schema().items() if dtype.is_integer()]
+    if not columns:
+        return []
+    head = lf.select(columns).head(sample_rows).collect()
+    if head.height < 2:
+        return []
+    steps = head.select(
+        ((pl.col(c).diff().drop_nulls() == 1).all() & (pl.col(c).null_count() == 0)) for c in columns
+    ).row(0)
+    return [c for c, step in zip(columns, steps) if step]
+
+
+def dimension_columns(schema, exclude=("id",)):
+    """Columns that can be grouped on: strings, categoricals, booleans and integers."""
+    return [c for c, dtype in schema.items()
+            if (dtype in (pl.String, pl.Categorical, pl.Enum, pl.Boolean) or dtype.is_integer()) and c not in exclude]
+
+
+def _aggregate(lf, dims, measures):
+    # Counts and integer sums are signed so that removed rows can be subtracted
+    schema = lf.collect_schema()
+    aggs = [pl.len().cast(pl.Int64).alias(ROWS)]
+    for m in measures:
+        c = pl.col(m)
+        total = c.sum().cast(pl.Int64) if schema[m].is_integer() else c.sum()
+        aggs += [
+            total.alias(f"{m}_sum"),
+            c.count().cast(pl.Int64).alias(f"{m}_count"),
+            c.min().alias(f"{m}_min"),
+            c.max().alias(f"{m}_max"),
+        ]
+    return lf.group_by(dims).agg(aggs)
+
+
+class Cube:
+    """
+    Row counts and per-measure sum, count, min and max for every combination
+    of a few low-cardinality dimensions. Coarser totals are rolled up from
+    it without touching the source. Replacing rows (apply) subtracts the old
+    rows' sums and counts and adds the new ones. Min and max can only be
+    widened that way: when a removed value was a group's extreme, the group
+    is flagged stale until the cube is rebuilt.
+    """
+
+    def __init__(self, dims, measures, frame):
+        self.dims = list(dims)
+        self.measures = list(measures)
+        self.frame = frame
+
+    @classmethod
+    def build(cls, lf, dims, measures):
+        """One streaming pass over lf."""
+        frame = _aggregate(lf, dims, measures).collect(engine="streaming")
+        if frame.height > MAX_GROUPS:
+            raise ValueError(f"{frame.height:,} groups; pick dimensions with fewer distinct values")
+        return cls(dims, measures, frame.with_columns(pl.lit(False).alias(STALE)))
+
+    def apply(self, old, new):
+        """The cube after rows old (DataFrames with the dims and measures) are replaced by new."""
+        if not old.height and not new.height:
+            return self
+        additive = [ROWS] + [f"{m}_{s}" for m in self.measures for s in ("sum", "count")]
+        extremes = [f"{m}_{s}" for m in self.measures for s in ("min", "max")]
+        schema = self.frame.schema
+
+        added = _aggregate(new.lazy(), self.dims, self.measures).collect()
+        removed = _aggregate(old.lazy(), self.dims, self.measures).collect()
+        # A removed value at a group's min or max may have been its only occurrence
+        current = self.frame.select(self.dims + extremes)
+        hit = [(pl.col(f"{m}_min") <= pl.col(f"{m}_min_cube")) | (pl.col(f"{m}_max") >= pl.col(f"{m}_max_cube"))
+               for m in self.measures]
+        removed = removed.join(current, on=self.dims, how="left", nulls_equal=True, suffix="_cube").with_columns(
+            (pl.any_horizontal(hit).fill_null(False) if hit else pl.lit(False)).alias(STALE),
+            *[(-pl.col(c)).alias(c) for c in additive],
+            *[pl.lit(None).cast(schema[c]).alias(c) for c in extremes],
+        )
+        parts = [
+            self.frame,
+            added.with_columns(pl.lit(False).alias(STALE)),
+            removed,
+        ]
+        parts = [p.select([pl.col(c).cast(dtype) for c, dtype in schema.items()]) for p in parts]
+        frame = (
+            pl.concat(parts)
+            .group_by(self.dims)
+            .agg(
+                *[pl.col(c).sum() for c in additive],
+                *[pl.col(c).min() for c in extremes if c.endswith("_min")],
+                *[pl.col(c).max() for c in extremes if c.endswith("_max")],
+                pl.col(STALE).any(),
+            )
+            .filter(pl.col(ROWS) > 0)
+            .select(schema.names())
+        )
+        return Cube(self.dims, self.measures, frame)
+
+    def rollup(self, dims=None):
+        """Totals by some of the cube's dimensions (all of them by default), with means."""
+        dims = list(self.dims if dims is None else dims)
+        aggs = [pl.col(ROWS).sum()]
+        for m in self.measures:
+            aggs += [
+                pl.col(f"{m}_sum").sum(),
+                pl.col(f"{m}_count").sum(),
+                pl.col(f"{m}_min").min(),
+                pl.col(f"{m}_max").max(),
+            ]
+        aggs.append(pl.col(STALE).any())
+        result = self.frame.group_by(dims).agg(aggs).sort(dims, nulls_last=True) if dims else self.frame.select(aggs)
+        return result.with_columns(
+            (pl.col(f"{m}_sum") / pl.col(f"{m}_count")).alias(f"{m}_mean") for m in self.measures
+        )
+
+
+class CubeCache:
+    """Small LRU of built cubes, keyed by source fingerprint, dimensions and measures."""
+
+    def __init__(self, max_cubes=DEFAULT_MAX_CUBES):
+        self.max_cubes = max_cubes
+        self._cubes = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            cube = self._cubes.get(key)
+            if cube is not None:
+                self._cubes.move_to_end(key)
+            return cube
+
+    def put(self, key, cube):
+        with self._lock:
+            self._cubes[key] = cube
+            self._cubes.move_to_end(key)
+            while len(self._cubes) > self.max_cubes:
+                self._cubes.popitem(last=False)
+
+    def get_or_compute(self, key, compute):
+        cube = self.get(key)
+        if cube is None:
+            cube = compute()
+            self.put(key, cube)
+        return cube
+
+
+# Process-wide cube cache
+CUBE_CACHE = CubeCache()
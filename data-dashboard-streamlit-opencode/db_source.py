@@ -0,0 +1,228 @@
+import glob
+import hashlib
+import os
+import threading
+import time
+import uuid
+import weakref
+
+import polars as pl
+import pyarrow as pa
+from sqlalchemy import create_engine, text
+
+DEFAULT_SPILL_DIR = "data/.db_cache"
+# Total size of spilled query results kept on disk
+DEFAULT_MAX_BYTES = 10 * 1024 ** 3
+DEFAULT_BATCH_SIZE = 100_000
+# Engines unused for this many seconds are disposed
+DEFAULT_IDLE_TIMEOUT = 600
+
+
+class EngineRegistry:
+    """
+    One SQLAlchemy engine (and so one connection pool) per connection string,
+    shared by every session. Pooled connections are pinged on checkout
+    (pool_pre_ping) so dead ones are replaced, and engines unused for
+    idle_timeout seconds are disposed on the next access.
+    """
+
+    def __init__(self, idle_timeout=DEFAULT_IDLE_TIMEOUT):
+        self.idle_timeout = idle_timeout
+        self._engines = {}  # {connection string: [engine, last used]}
+        self._lock = threading.Lock()
+
+    def get(self, connection_string):
+        now = time.monotonic()
+        with self._lock:
+            self._evict_idle(now)
+            entry = self._engines.get(connection_string)
+            if entry is None:
+                engine = create_engine(connection_string, pool_pre_ping=True, pool_recycle=1800)
+                entry = self._engines[connection_string] = [engine, now]
+            entry[1] = now
+            return entry[0]
+
+    def check(self, connection_string):
+        """Run SELECT 1. A failing engine is disposed so the next get() starts over."""
+        try:
+            with self.get(connection_string).connect() as conn:
+                conn.execute(text("SELECT 1"))
+            return True
+        except Exception as e:
+            print(f"Health check failed: {e}")
+            self.dispose(connection_string)
+            return False
+
+    def _evict_idle(self, now):
+        for key, (engine, last_used) in list(self._engines.items()):
+            if now - last_used > self.idle_timeout:
+                # Checked-out connections stay usable; only idle pooled ones are closed
+                engine.dispose()
+                del self._engines[key]
+
+    def evict_idle(self):
+        with self._lock:
+            self._evict_idle(time.monotonic())
+
+    def dispose(self, connection_string=None):
+        """Dispose one engine, or all of them."""
+        with self._lock:
+            keys = [connection_string] if connection_string else list(self._engines)
+            for key in keys:
+                entry = self._engines.pop(key, None)
+                if entry:
+                    entry[0].dispose()
+
+    def __len__(self):
+        return len(self._engines)
+
+
+def connectorx_uri(connection_string):
+    """
+    Translate a SQLAlchemy URL to the form connectorx expects: no '+driver'
+    suffix, and SQLite as sqlite:// followed by an absolute path.
+    """
+    scheme, sep, rest = connection_string.partition("://")
+    scheme = scheme.split("+")[0]
+    if scheme == "sqlite":
+        return "sqlite://" + os.path.abspath(rest[1:] if rest.startswith("/") else rest)
+    return f"{scheme}{sep}{rest}"
+
+
+class QueryResult:
+    """
+    One loaded query: lf scans its spill file, stats describes the load
+    (engine, rows, batches, seconds). The file stays on disk while the result
+    is referenced and is deleted once it is released or garbage collected,
+    so keep the result for as long as lf is used.
+    """
+
+    def __init__(self, lf, stats, release):
+        self.lf = lf
+        self.stats = stats
+        self._finalizer = weakref.finalize(self, release)
+
+    def release(self):
+        self._finalizer()
+
+
+class DatabaseSource:
+    """
+    Runs dashboard queries as a stream of Arrow record batches (connectorx's
+    arrow_stream, or SQLAlchemy in batches when connectorx can't handle the
+    URL) and spills them to an Arrow IPC file as they arrive. The returned
+    QueryResult memory-maps that file, so a result never has to fit in memory
+    as a whole and reruns don't query the database again. Every load writes
+    a new file, so sessions still scanning an earlier result are unaffected.
+    """
+
+    def __init__(self, engines=None, spill_dir=DEFAULT_SPILL_DIR, max_bytes=DEFAULT_MAX_BYTES,
+                 batch_size=DEFAULT_BATCH_SIZE, use_connectorx=True):
+        self.engines = engines or EngineRegistry()
+        self.spill_dir = spill_dir
+        self.max_bytes = max_bytes
+        self.batch_size = batch_size
+        self.use_connectorx = use_connectorx
+        self._live = set()  # spill files of unreleased results
+        self._lock = threading.Lock()
+
+    def _connectorx_reader(self, connection_string, query):
+        if not self.use_connectorx:
+            return None
+        try:
+            import connectorx as cx
+            return cx.read_sql(connectorx_uri(connection_string), query,
+                               return_type="arrow_stream", batch_size=self.batch_size)
+        except Exception as e:
+            print(f"connectorx unavailable for this source, using SQLAlchemy: {e}")
+            return None
+
+    def _sqlalchemy_batches(self, connection_string, query, columns):
+        """Arrow batches of the query's rows; its column names are appended to columns first."""
+        with self.engines.get(connection_string).connect() as conn:
+            result = conn.execute(text(query))
+            columns.extend(result.keys())
+            while rows := result.fetchmany(self.batch_size):
+                df = pl.DataFrame(rows, schema=list(columns), orient="row", infer_schema_length=None)
+                yield from df.to_arrow().to_batches()
+
+    def load(self, connection_string, query, job=None):
+        """
+        Run the query into a new spill file and return its QueryResult. With a
+        job (jobs.Job), each batch reports progress, the first one becomes the
+        preview, and a cancel stops the load at the next batch.
+        """
+        start = time.perf_counter()
+        reader = self._connectorx_reader(connection_string, query)
+        columns = []
+        batches = reader if reader is not None else self._sqlalchemy_batches(connection_string, query, columns)
+
+        key = hashlib.sha1(f"{connection_string}|{query}".encode()).hexdigest()
+        path = os.path.join(self.spill_dir, f"{key}.{uuid.uuid4().hex[:12]}.arrow")
+        tmp = f"{path}.{threading.get_ident()}.tmp"
+        os.makedirs(self.spill_dir, exist_ok=True)
+
+        schema = reader.schema if reader is not None else None
+        writer = pa.ipc.new_file(tmp, schema) if schema is not None else None
+        rows = num_batches = 0
+        try:
+            for batch in batches:
+                if writer is None:
+                    schema = batch.schema
+                    writer = pa.ipc.new_file(tmp, schema)
+                elif batch.schema != schema:
+                    # SQLAlchemy batches are typed one at a time and can drift
+                    batch = pa.Table.from_batches([batch]).cast(schema).combine_chunks().to_batches()[0]
+                writer.write_batch(batch)
+                rows += batch.num_rows
+                num_batches += 1
+                if job is not None:
+                    job.set_preview(pl.from_arrow(batch))
+                    job.progress(batch.num_rows, batch.nbytes)
+                    job.check()
+        except Exception:
+            if writer is not None:
+                writer.close()
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            raise
+
+        stats = {
+            "engine": "connectorx" if reader is not None else "sqlalchemy",
+            "rows": rows,
+            "batches": num_batches,
+            "seconds": time.perf_counter() - start,
+        }
+        if writer is None:
+            # Empty result from the SQLAlchemy path: the columns are known, their types aren't
+            writer = pa.ipc.new_file(tmp, pa.schema([(name, pa.null()) for name in columns]))
+        writer.close()
+        with self._lock:
+            os.replace(tmp, path)
+            self._live.add(path)
+        self._evict()
+        return QueryResult(pl.scan_ipc(path, memory_map=True), stats, lambda: self._release(path))
+
+    def _release(self, path):
+        with self._lock:
+            self._live.discard(path)
+            if os.path.exists(path):
+                os.remove(path)
+
+    def _evict(self):
+        """Remove files left by earlier processes while the spill directory is over max_bytes."""
+        with self._lock:
+            files = sorted(glob.glob(os.path.join(self.spill_dir, "*.arrow")), key=os.path.getmtime)
+            total = sum(os.path.getsize(f) for f in files)
+            for f in files:
+                if total <= self.max_bytes:
+                    break
+                if f in self._live:
+                    continue
+                total -= os.path.getsize(f)
+                os.remove(f)
+
+
+# Process-wide engine registry and query loader
+ENGINES = EngineRegistry()
+DB_SOURCE = DatabaseSource(ENGINES)
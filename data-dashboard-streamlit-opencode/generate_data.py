@@ -3,9 +3,18 @@
 Script to generate synthetic data similar to the CSV files in the data folder.
 """
 
+import argparse
+import multiprocessing
+import os
 import polars as pl
+import numpy as np
+import pyarrow.parquet as pq
 import random
-from datetime import datetime, timedelta
+import shutil
+import tempfile
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
 from pathlib import Path
 
 # Set random seed for reproducibility
@@ -32,137 +41,232 @@ def generate_medical_records(num_rows=1000):
     return df
 
 
-def generate_health_insurance_records(num_rows=10000):
+# Reference data for the health insurance records
+CASTES = ["BC", "OC", "SC", "ST", "Minorities"]
+CATEGORIES = {
+    "M5": "CARDIOLOGY",
+    "M6": "NEPHROLOGY",
+    "S7": "CARDIAC AND CARDIOTHORACIC SURGERY",
+    "S16": "COCHLEAR IMPLANT SURGERY",
+    "M8": "ONCOLOGY",
+    "S3": "GENERAL SURGERY"
+}
+SURGERIES = {
+    "M5.1.2": "Management Of Acute MI With Angiogram",
+    "M5.1.5": "Medical Management of Refractory Cardiac Failure",
+    "M6.5": "Maintenance Hemodialysis For Crf",
+    "S7.1.1.1": "Coronary Balloon Angioplasty with stent(00.45)",
+    "S7.2.1.1": "Coronary Bypass Surgery",
+    "S16.1.1": "Cochlear Implant Surgery",
+    "M8.3.2": "Chemotherapy for Cancer",
+    "S3.1.1": "Laparoscopic Cholecystectomy"
+}
+VILLAGES = [
+    "Lolugu", "Borivanka", "Kapasakuddi", "Telikipenta", "Thandemvalasa",
+    "Phasigangupeta", "Vallur", "Rajam", "Thurlapadu", "Pulipadu"
+]
+MANDALS = [
+    "Ponduru", "Kaviti", "Sarubujjili", "Srikakulam", "Pathapatnam",
+    "Nandyal", "Bhoghapuram", "Kakumanu", "Guntur(C)", "Butchayyapeta"
+]
+DISTRICTS = [
+    "Srikakulam", "Vizianagaram", "Vishakhapatnam", "Guntur", "Kurnool"
+]
+HOSPITALS = [
+    ("Rims Govt. General Hospital, Srikakulam", "G", "SRIKAKULAM", "Srikakulam"),
+    ("Govt General Hospital Kurnool", "G", "KURNOOL", "Kurnool"),
+    ("Queens Nri Hospitals", "C", "Visakhapatnam", "Vishakhapatnam"),
+    ("Karumuri Hospital", "C", "GUNTUR", "Guntur"),
+    ("Ent Nursing Home", "C", "GUNTUR", "Guntur"),
+    ("Apollo Hospital", "C", "VISAKHAPATNAM", "Vishakhapatnam")
+]
+SRC_REGISTRATION = ["D", "P"]
+PREAUTH_AMOUNTS = [12500, 30000, 40000, 115846, 520000]
+START_DATE = datetime(2013, 1, 1)
+END_DATE = datetime(2024, 12, 31)
+DATE_FORMAT = "%d/%m/%Y %H:%M:%S"
+
+# Rows per chunk when writing large files
+DEFAULT_CHUNK_SIZE = 1_000_000
+# Rows per Parquet row group; also the most the writing process holds at once
+ROW_GROUP_SIZE = 100_000
+
+
+def _surgery_table():
+    """
+    Flatten the category -> surgery mapping into lookup arrays: for category i,
+    its surgeries are codes[offsets[i]:offsets[i] + counts[i]].
+    Categories without a matching surgery get a generic procedure.
+    """
+    codes, names, offsets, counts = [], [], [], []
+    for category_code in CATEGORIES:
+        matching = [(code, name) for code, name in SURGERIES.items() if code.startswith(category_code)]
+        if not matching:
+            matching = [(f"{category_code}.1", "General Procedure")]
+        offsets.append(len(codes))
+        counts.append(len(matching))
+        codes.extend(code for code, _ in matching)
+        names.extend(name for _, name in matching)
+    return codes, names, np.array(offsets), np.array(counts)
+
+
+def _pick(rng, values, n):
+    """n uniform picks from values as a Polars Series."""
+    return pl.Series(values).gather(rng.integers(0, len(values), n))
+
+
+def _format_dates(days):
+    """Day offsets from START_DATE -> strings in DATE_FORMAT."""
+    dates = np.datetime64(START_DATE.date(), "D") + days
+    return pl.Series(dates).cast(pl.Datetime).dt.strftime(DATE_FORMAT)
+
+
+def generate_health_insurance_chunk(num_rows, seed=42, start_id=1):
+    """
+    Vectorized generator for one chunk of health insurance records.
+    Same columns and distributions as the original row-by-row version;
+    ids run from start_id. seed may be an int or a sequence (e.g. [seed, chunk]).
+    """
+    rng = np.random.default_rng(seed)
+    n = num_rows
+
+    # Category and a surgery belonging to that category
+    category_codes = list(CATEGORIES)
+    category_idx = rng.integers(0, len(category_codes), n)
+    surgery_codes, surgery_names, offsets, counts = _surgery_table()
+    surgery_idx = offsets[category_idx] + (rng.random(n) * counts[category_idx]).astype(np.int64)
+
+    hospital_idx = rng.integers(0, len(HOSPITALS), n)
+
+    # Dates: preauth <= surgery <= discharge <= claim
+    total_days = (END_DATE - START_DATE).days
+    preauth = rng.integers(0, total_days + 1, n)
+    surgery = preauth + rng.integers(1, 31, n)
+    discharge = surgery + rng.integers(1, 31, n)
+    claim = discharge + rng.integers(1, 1001, n)
+
+    mortality = rng.integers(0, 2, n) == 0
+    mortality_days = discharge + rng.integers(1, 61, n)
+
+    # Age groups 1-17 / 18-59 / 60-99 weighted 0.1 / 0.6 / 0.3
+    group = rng.choice(3, n, p=[0.1, 0.6, 0.3])
+    low = np.array([1, 18, 60])[group]
+    high = np.array([18, 60, 100])[group]
+    age = low + (rng.random(n) * (high - low)).astype(np.int64)
+    female = rng.integers(0, 2, n) == 1
+    sex = np.where(age < 18, np.where(female, "Female(Child)", "Male(Child)"), np.where(female, "Female", "Male"))
+
+    preauth_amt = np.array(PREAUTH_AMOUNTS)[rng.integers(0, len(PREAUTH_AMOUNTS), n)]
+    reduced = rng.random(n) <= 0.2
+    claim_amount = np.where(reduced, preauth_amt - rng.integers(0, 10001, n), preauth_amt)
+
+    hospitals = list(zip(*HOSPITALS))
+    df = pl.DataFrame({
+        "": np.arange(start_id, start_id + n),
+        "AGE": age,
+        "SEX": sex,
+        "CASTE_NAME": _pick(rng, CASTES, n),
+        "CATEGORY_CODE": pl.Series(category_codes).gather(category_idx),
+        "CATEGORY_NAME": pl.Series([CATEGORIES[c] for c in category_codes]).gather(category_idx),
+        "SURGERY_CODE": pl.Series(surgery_codes).gather(surgery_idx),
+        "SURGERY": pl.Series(surgery_names).gather(surgery_idx),
+        "VILLAGE": _pick(rng, VILLAGES, n),
+        "MANDAL_NAME": _pick(rng, MANDALS, n),
+        "DISTRICT_NAME": _pick(rng, DISTRICTS, n),
+        "PREAUTH_DATE": _format_dates(preauth),
+        "PREAUTH_AMT": preauth_amt,
+        "CLAIM_DATE": _format_dates(claim),
+        "CLAIM_AMOUNT": claim_amount,
+        "HOSP_NAME": pl.Series(hospitals[0]).gather(hospital_idx),
+        "HOSP_TYPE": pl.Series(hospitals[1]).gather(hospital_idx),
+        "HOSP_LOCATION": pl.Series(hospitals[2]).gather(hospital_idx),
+        "HOSP_DISTRICT": pl.Series(hospitals[3]).gather(hospital_idx),
+        "SURGERY_DATE": _format_dates(surgery),
+        "DISCHARGE_DATE": _format_dates(discharge),
+        "Mortality Y / N": np.where(mortality, "YES", "NO"),
+        "MORTALITY_DATE": _format_dates(mortality_days),
+        "SRC_REGISTRATION": _pick(rng, SRC_REGISTRATION, n),
+    })
+    return df.with_columns(
+        pl.when(pl.col("Mortality Y / N") == "YES").then(pl.col("MORTALITY_DATE")).otherwise(pl.lit("")).alias("MORTALITY_DATE")
+    )
+
+
+def generate_health_insurance_records(num_rows=10000, seed=42):
     """Generate synthetic health insurance records similar to ntrarogyaseva.csv"""
-    
-    # Reference data
-    castes = ["BC", "OC", "SC", "ST", "Minorities"]
-    categories = {
-        "M5": "CARDIOLOGY",
-        "M6": "NEPHROLOGY",
-        "S7": "CARDIAC AND CARDIOTHORACIC SURGERY",
-        "S16": "COCHLEAR IMPLANT SURGERY",
-        "M8": "ONCOLOGY",
-        "S3": "GENERAL SURGERY"
-    }
-    
-    surgeries = {
-        "M5.1.2": "Management Of Acute MI With Angiogram",
-        "M5.1.5": "Medical Management of Refractory Cardiac Failure",
-        "M6.5": "Maintenance Hemodialysis For Crf",
-        "S7.1.1.1": "Coronary Balloon Angioplasty with stent(00.45)",
-        "S7.2.1.1": "Coronary Bypass Surgery",
-        "S16.1.1": "Cochlear Implant Surgery",
-        "M8.3.2": "Chemotherapy for Cancer",
-        "S3.1.1": "Laparoscopic Cholecystectomy"
-    }
-    
-    villages = [
-        "Lolugu", "Borivanka", "Kapasakuddi", "Telikipenta", "Thandemvalasa",
-        "Phasigangupeta", "Vallur", "Rajam", "Thurlapadu", "Pulipadu"
-    ]
-    
-    mandals = [
-        "Ponduru", "Kaviti", "Sarubujjili", "Srikakulam", "Pathapatnam",
-        "Nandyal", "Bhoghapuram", "Kakumanu", "Guntur(C)", "Butchayyapeta"
-    ]
-    
-    districts = [
-        "Srikakulam", "Vizianagaram", "Vishakhapatnam", "Guntur", "Kurnool"
-    ]
-    
-    hospitals = [
-        ("Rims Govt. General Hospital, Srikakulam", "G", "SRIKAKULAM", "Srikakulam"),
-        ("Govt General Hospital Kurnool", "G", "KURNOOL", "Kurnool"),
-        ("Queens Nri Hospitals", "C", "Visakhapatnam", "Vishakhapatnam"),
-        ("Karumuri Hospital", "C", "GUNTUR", "Guntur"),
-        ("Ent Nursing Home", "C", "GUNTUR", "Guntur"),
-        ("Apollo Hospital", "C", "VISAKHAPATNAM", "Vishakhapatnam")
-    ]
-    
-    src_registration = ["D", "P"]
-    
-    # Generate data
-    start_date = datetime(2013, 1, 1)
-    end_date = datetime(2024, 12, 31)
-    
-    data = []
-    for i in range(1, num_rows + 1):
-        category_code = random.choice(list(categories.keys()))
-        category_name = categories[category_code]
-        
-        # Filter surgeries by category
-        matching_surgeries = [(code, name) for code, name in surgeries.items() 
-                             if code.startswith(category_code)]
-        if matching_surgeries:
-            surgery_code, surgery_name = random.choice(matching_surgeries)
-        else:
-            surgery_code = f"{category_code}.1"
-            surgery_name = "General Procedure"
-        
-        hospital_info = random.choice(hospitals)
-        
-        # Generate dates
-        preauth_date = start_date + timedelta(days=random.randint(0, (end_date - start_date).days))
-        surgery_date = preauth_date + timedelta(days=random.randint(1, 30))
-        discharge_date = surgery_date + timedelta(days=random.randint(1, 30))
-        claim_date = discharge_date + timedelta(days=random.randint(1, 1000))
-        
-        # Mortality
-        mortality = random.choice(["YES", "NO"])
-        mortality_date = discharge_date + timedelta(days=random.randint(1, 60)) if mortality == "YES" else None
-        
-        # Age considerations
-        age_group = random.choices(
-            [range(1, 18), range(18, 60), range(60, 100)],
-            weights=[0.1, 0.6, 0.3]
-        )[0]
-        age = random.choice(age_group)
-        
-        if age < 18:
-            sex = random.choice(["Male(Child)", "Female(Child)"])
-        else:
-            sex = random.choice(["Male", "Female"])
-        
-        # Amount
-        preauth_amt = random.choice([12500, 30000, 40000, 115846, 520000])
-        claim_amount = preauth_amt if random.random() > 0.2 else preauth_amt - random.randint(0, 10000)
-        
-        row = {
-            "": i,
-            "AGE": age,
-            "SEX": sex,
-            "CASTE_NAME": random.choice(castes),
-            "CATEGORY_CODE": category_code,
-            "CATEGORY_NAME": category_name,
-            "SURGERY_CODE": surgery_code,
-            "SURGERY": surgery_name,
-            "VILLAGE": random.choice(villages),
-            "MANDAL_NAME": random.choice(mandals),
-            "DISTRICT_NAME": random.choice(districts),
-            "PREAUTH_DATE": preauth_date.strftime("%d/%m/%Y %H:%M:%S"),
-            "PREAUTH_AMT": preauth_amt,
-            "CLAIM_DATE": claim_date.strftime("%d/%m/%Y %H:%M:%S"),
-            "CLAIM_AMOUNT": claim_amount,
-            "HOSP_NAME": hospital_info[0],
-            "HOSP_TYPE": hospital_info[1],
-            "HOSP_LOCATION": hospital_info[2],
-            "HOSP_DISTRICT": hospital_info[3],
-            "SURGERY_DATE": surgery_date.strftime("%d/%m/%Y %H:%M:%S"),
-            "DISCHARGE_DATE": discharge_date.strftime("%d/%m/%Y %H:%M:%S") if discharge_date else "",
-            "Mortality Y / N": mortality,
-            "MORTALITY_DATE": mortality_date.strftime("%d/%m/%Y %H:%M:%S") if mortality_date else "",
-            "SRC_REGISTRATION": random.choice(src_registration)
-        }
-        
-        data.append(row)
-    
-    df = pl.DataFrame(data)
-    return df
+    return generate_health_insurance_chunk(num_rows, seed=seed)
+
+
+def _generate_chunk(args):
+    # Top-level so it can run in a worker process. The chunk is written to its
+    # own part file; only the path goes back to the parent.
+    chunk_index, num_rows, seed, start_id, part_path = args
+    df = generate_health_insurance_chunk(num_rows, seed=[seed, chunk_index], start_id=start_id)
+    if part_path.endswith(".parquet"):
+        df.write_parquet(part_path, row_group_size=ROW_GROUP_SIZE)
+    else:
+        df.write_csv(part_path, include_header=chunk_index == 0)
+    return part_path
+
+
+def write_health_insurance_records(num_rows, output_path, chunk_size=DEFAULT_CHUNK_SIZE, workers=None, seed=42):
+    """
+    Generate num_rows records straight to a .parquet or .csv file in fixed-size
+    chunks. Chunks are generated in worker processes with per-chunk seeds, so the
+    output is the same for any worker count. Each worker writes its chunk to a
+    part file next to the output, which is appended in order: CSV parts byte
+    for byte, Parquet parts one row group at a time. Nothing but paths passes
+    between processes, and the parent holds at most one row group.
+    """
+    output_path = Path(output_path)
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    is_parquet = output_path.suffix == ".parquet"
+    workers = workers or os.cpu_count() or 1
+    # Bound the part files generated but not yet appended
+    window = workers * 2
+
+    writer = None
+    pending = deque()
+    # Polars' thread pool doesn't survive fork(), so workers are spawned
+    ctx = multiprocessing.get_context("spawn")
+    with tempfile.TemporaryDirectory(dir=output_path.parent, prefix=".parts-") as parts, \
+            ProcessPoolExecutor(max_workers=workers, mp_context=ctx) as pool, open(output_path, "wb") as f:
+        tasks = [
+            (i, min(chunk_size, num_rows - start), seed, start + 1, os.path.join(parts, f"{i:06d}{output_path.suffix}"))
+            for i, start in enumerate(range(0, num_rows, chunk_size))
+        ]
+        try:
+            for i, task in enumerate(tasks):
+                pending.append(pool.submit(_generate_chunk, task))
+                # Append parts in order as soon as the window is full
+                while pending and (len(pending) >= window or i == len(tasks) - 1):
+                    part_path = pending.popleft().result()
+                    if is_parquet:
+                        part = pq.ParquetFile(part_path)
+                        if writer is None:
+                            writer = pq.ParquetWriter(f, part.schema_arrow)
+                        for j in range(part.num_row_groups):
+                            writer.write_table(part.read_row_group(j))
+                        part.close()
+                    else:
+                        with open(part_path, "rb") as src:
+                            shutil.copyfileobj(src, f)
+                    os.remove(part_path)
+        finally:
+            if writer is not None:
+                writer.close()
+    return output_path
 
 
 def main():
     """Main function to generate all data files"""
+
+    parser = argparse.ArgumentParser(description="Generate synthetic data files")
+    parser.add_argument("--insurance-rows", type=int, default=10000)
+    parser.add_argument("--insurance-output", help="Output .csv or .parquet (default data/health_insurance_synthetic.csv)")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
     
     data_dir = Path(__file__).parent / "data"
     data_dir.mkdir(exist_ok=True)
@@ -174,10 +278,9 @@ def main():
     print(f"✓ Generated {len(medical_df)} medical records → {output_path}")
     
     print("\nGenerating synthetic health insurance records...")
-    insurance_df = generate_health_insurance_records(num_rows=10000)
-    output_path = data_dir / "health_insurance_synthetic.csv"
-    insurance_df.write_csv(output_path)
-    print(f"✓ Generated {len(insurance_df)} health insurance records → {output_path}")
+    output_path = Path(args.insurance_output or data_dir / "health_insurance_synthetic.csv")
+    write_health_insurance_records(args.insurance_rows, output_path, chunk_size=args.chunk_size, workers=args.workers)
+    print(f"✓ Generated {args.insurance_rows} health insurance records → {output_path}")
     
     # Also generate parquet versions
     # print("\nGenerating Parquet versions...")
@@ -3,40 +3,145 @@ import polars as pl
 import pyarrow as pa
 import pyarrow.parquet as pq
 import os
+import hashlib
+import time
+import uuid
 from pathlib import Path
-import boto3
-from sqlalchemy import create_engine
-import tempfile
+from row_count import count_file_rows
+from columnar_cache import COLUMNAR_CACHE
+from s3_source import S3_SOURCE
+from db_source import DB_SOURCE, ENGINES
+from piece_table import PieceTable
+from query_cache import RESULT_CACHE
+from profiler import PROFILE_CACHE, profile_frame
+import paging
+from paging import EXTERNAL_SORTS
+from tracing import TRACER, DEFAULT_TRACE_DIR
+from shared_registry import SHARED_REGISTRY
+from jobs import JOBS, PREVIEW_ROWS
+from out_of_core import SNAPSHOTS, OutOfCoreTable, POSITION
+from cube import CUBE_CACHE, Cube, ROWS, STALE, dimension_columns, key_columns, measure_columns
 
-def load_data_from_local(file_path, file_type):
+def load_data_from_local(file_path, file_type, use_columnar_cache=True):
     if file_type == 'parquet':
         return pl.scan_parquet(file_path)
     elif file_type == 'csv':
+        # CSVs are transcoded to Parquet in the background; use the copy once it exists
+        converted = COLUMNAR_CACHE.lookup(file_path) if use_columnar_cache else None
+        if converted:
+            return pl.scan_parquet(converted)
         return pl.scan_csv(file_path)
     else:
         raise ValueError("Unsupported file type")
 
-def load_data_from_s3(bucket, key, file_type, aws_access_key=None, aws_secret_key=None):
-    s3_client = boto3.client('s3',
-                             aws_access_key_id=aws_access_key,
-                             aws_secret_access_key=aws_secret_key)
-    with tempfile.NamedTemporaryFile(delete=False, suffix=f'.{file_type}') as tmp:
-        tmp_path = tmp.name
-    try:
-        s3_client.download_file(bucket, key, tmp_path)
-        data = load_data_from_local(tmp_path, file_type)
-        return data
-    finally:
-        if os.path.exists(tmp_path):
-            os.unlink(tmp_path)
-
-def load_data_from_db(connection_string, query):
-    engine = create_engine(connection_string)
-    return pl.read_database(query, engine).lazy()
+def load_data_from_s3(bucket, key, file_type, aws_access_key=None, aws_secret_key=None, endpoint_url=None, job=None):
+    s3_client = S3_SOURCE.client(aws_access_key, aws_secret_key, endpoint_url)
+    with TRACER.span("load", source="s3"):
+        if file_type == 'parquet':
+            # Scanned in place: only the footer and the needed column chunks are fetched
+            return S3_SOURCE.scan_parquet(s3_client, bucket, key)
+        elif file_type == 'csv':
+            # CSV has no footer to seek by; it is downloaded once per ETag into the block cache
+            return pl.scan_csv(S3_SOURCE.download(s3_client, bucket, key, file_type, job=job))
+        else:
+            raise ValueError("Unsupported file type")
+
+def count_s3_rows(bucket, key, file_type, aws_access_key=None, aws_secret_key=None, endpoint_url=None):
+    if file_type != 'parquet':
+        return None
+    s3_client = S3_SOURCE.client(aws_access_key, aws_secret_key, endpoint_url)
+    return S3_SOURCE.count_rows(s3_client, bucket, key)
+
+def load_data_from_db(connection_string, query, job=None):
+    # Streamed as Arrow batches into a memory-mapped spill file; engines are pooled per connection string.
+    # The returned QueryResult keeps the file on disk, so it is kept with the data.
+    with TRACER.span("load", source="db") as span:
+        result = DB_SOURCE.load(connection_string, query, job=job)
+        span.rows = result.stats["rows"]
+        return result
+
+def s3_load_job(job, bucket, key, file_type, aws_access_key=None, aws_secret_key=None, endpoint_url=None):
+    """Background S3 load; returns the session state to set once it is done."""
+    job.total_rows = count_s3_rows(bucket, key, file_type, aws_access_key, aws_secret_key, endpoint_url)
+    data = load_data_from_s3(bucket, key, file_type, aws_access_key, aws_secret_key, endpoint_url, job=job)
+    job.set_preview(TRACER.collect(data.head(PREVIEW_ROWS)))
+    return {
+        "loaded_data": data,
+        "file_type": file_type,
+        "source_path": None,
+        "source_rows": job.total_rows,
+        # Reads are pinned to this ETag, so it identifies the data
+        "source_fingerprint": ('s3', endpoint_url, bucket, key, S3_SOURCE.etag(
+            S3_SOURCE.client(aws_access_key, aws_secret_key, endpoint_url), bucket, key)),
+    }
+
+def db_load_job(job, connection_string, query):
+    """Background query; returns the session state to set once it is done."""
+    result = load_data_from_db(connection_string, query, job=job)
+    return {
+        "loaded_data": result.lf,
+        "db_result": result,
+        "file_type": 'db',
+        "source_path": None,
+        "source_rows": job.rows,
+        # Every execution is a new snapshot of the query result
+        "source_fingerprint": ('db', hashlib.sha1(f"{connection_string}|{query}".encode()).hexdigest(), time.time()),
+    }
+
+def save_parquet_job(job, frame, save_path):
+    with TRACER.span("save"):
+        if isinstance(frame, PieceTable):
+            frame.write_parquet(save_path)
+        elif isinstance(frame, OutOfCoreTable):
+            # Snapshot batches with the edits applied, one batch in memory at a time
+            frame.write_parquet(save_path, job=job)
+        else:
+            # Streamed to a temporary file, so a cancelled save leaves the target untouched
+            tmp = f"{save_path}.tmp"
+            try:
+                job.run_query(frame.sink_parquet(tmp, lazy=True), progress_path=tmp)
+            except Exception:
+                if os.path.exists(tmp):
+                    os.remove(tmp)
+                raise
+            os.replace(tmp, save_path)
+    return save_path
+
+@st.fragment(run_every=1)
+def job_progress(job_id, cancellable=True):
+    """Progress of a running job and its first rows, refreshed every second; reruns the app once it ends."""
+    job = JOBS.get(job_id)
+    if job is None or not job.active:
+        st.rerun()
+    total = f" of {job.total_rows:,}" if job.total_rows else ""
+    st.progress(
+        min(job.rows / job.total_rows, 1.0) if job.total_rows else 0.0,
+        text=f"{job.name}: {job.rows:,}{total} rows, {job.bytes / 1024 ** 2:.1f} MB, {job.seconds:.1f}s",
+    )
+    if cancellable and st.button("Cancel", key=f"cancel_{job.id}", disabled=job.cancelled):
+        job.cancel()
+    if job.preview is not None:
+        st.caption(f"Preview: first {job.preview.height} rows")
+        st.dataframe(job.preview, width='stretch', hide_index=True)
+
+def source_fingerprint():
+    """Identity of the loaded data: local files by path, size and mtime, others as recorded at load time."""
+    source_path = st.session_state.get('source_path')
+    if source_path:
+        try:
+            stat = os.stat(source_path)
+            return ('local', os.path.abspath(source_path), stat.st_size, stat.st_mtime_ns)
+        except OSError:
+            return None
+    return st.session_state.get('source_fingerprint')
 
 def main():
     st.title("Data Dashboard")
 
+    # Spans from this run are tagged with the session; profiling is a per-session switch
+    trace_session = st.session_state.setdefault('trace_session', uuid.uuid4().hex[:12])
+    TRACER.bind(trace_session, profile=st.session_state.get('profile_queries', False))
+
     # Sidebar for data source selection
     st.sidebar.header("Data Source")
 
@@ -58,6 +163,11 @@ def main():
                             data = load_data_from_local(file_path, file_type)
                             st.session_state.loaded_data = data
                             st.session_state.file_type = file_type
+                            st.session_state.source_path = file_path
+                            st.session_state.source_rows = None
+                            st.session_state.db_result = None
+                            # Supersedes any load still running in the background
+                            st.session_state.load_job = None
                             st.sidebar.success("Data loaded successfully")
                         except Exception as e:
                             st.sidebar.error(f"Error loading data: {e}")
@@ -74,43 +184,209 @@ def main():
         file_type_input = st.sidebar.selectbox("File Type", ["parquet", "csv"])
         aws_access_key = st.sidebar.text_input("AWS Access Key", type="password")
         aws_secret_key = st.sidebar.text_input("AWS Secret Key", type="password")
+        endpoint_url = st.sidebar.text_input("Endpoint URL (optional, e.g. MinIO)")
         if st.sidebar.button("Load from S3"):
-            try:
-                data = load_data_from_s3(bucket, key, file_type_input, aws_access_key, aws_secret_key)
-                st.session_state.loaded_data = data
-                st.session_state.file_type = file_type_input
-                file_type = file_type_input
-                st.sidebar.success("Data loaded successfully")
-            except Exception as e:
-                st.sidebar.error(f"Error loading data: {e}")
+            # Loaded in the background; the session keeps only the job id
+            st.session_state.load_job = JOBS.submit(
+                f"Load s3://{bucket}/{key}", s3_load_job, bucket, key, file_type_input,
+                aws_access_key, aws_secret_key, endpoint_url,
+                key=("s3", endpoint_url, bucket, key, file_type_input),
+            ).id
+        stats = S3_SOURCE.stats
+        st.sidebar.caption(f"S3: {stats['requests']} ranged GETs, {stats['bytes_fetched'] / 1024 ** 2:.1f} MB fetched, "
+                           f"{stats['cache_hits']} block cache hits")
 
     elif source_type == "Database":
         connection_string = st.sidebar.text_input("Connection String", type="password")
         query = st.sidebar.text_area("SQL Query")
         if st.sidebar.button("Execute Query"):
-            try:
-                data = load_data_from_db(connection_string, query)
-                st.session_state.loaded_data = data
-                st.session_state.file_type = 'db'
-                file_type = 'db'  # arbitrary
+            st.session_state.load_job = JOBS.submit(
+                "Execute query", db_load_job, connection_string, query,
+                key=("db", hashlib.sha1(f"{connection_string}|{query}".encode()).hexdigest()),
+            ).id
+        if st.sidebar.button("Test Connection") and connection_string:
+            if ENGINES.check(connection_string):
+                st.sidebar.success("Connection OK")
+            else:
+                st.sidebar.error("Connection failed")
+        if st.session_state.get('db_result') is not None:
+            last = st.session_state.db_result.stats
+            st.sidebar.caption(f"Last query: {last['rows']} rows in {last['batches']} batches via {last['engine']}, "
+                               f"{last['seconds']:.2f}s ({len(ENGINES)} pooled engines)")
+
+    # Background loads: the loaded data stays on screen until the new source is ready
+    load_job = JOBS.get(st.session_state.load_job) if st.session_state.get('load_job') else None
+    if load_job is not None:
+        if load_job.active:
+            job_progress(load_job.id)
+        else:
+            st.session_state.load_job = None
+            if load_job.status == "done":
+                # A previous query's spill file is released once its data is replaced
+                st.session_state.db_result = None
+                for name, value in load_job.result.items():
+                    st.session_state[name] = value
+                data = st.session_state.loaded_data
+                file_type = st.session_state.file_type
                 st.sidebar.success("Data loaded successfully")
-            except Exception as e:
-                st.sidebar.error(f"Error loading data: {e}")
+            elif load_job.status == "failed":
+                st.sidebar.error(f"Error loading data: {load_job.error}")
+            else:
+                st.sidebar.info("Load cancelled")
+    running = JOBS.active()
+    if running:
+        st.sidebar.caption("Background jobs: " + ", ".join(f"{j.name} ({j.seconds:.0f}s)" for j in running))
+
+    # Re-resolve local CSVs each rerun so the Parquet copy is picked up once converted
+    source_path = st.session_state.get('source_path')
+    if data is not None and source_path and file_type == 'csv':
+        data = load_data_from_local(source_path, file_type)
+        st.session_state.loaded_data = data
 
     # Display data if loaded
     if data is not None:
-        total_rows = data.select(pl.len()).collect().item()
+        fingerprint = source_fingerprint()
+
+        # Local files are counted from Parquet metadata or a cached newline count,
+        # S3 Parquet from the footer
+        with TRACER.span("count"):
+            total_rows = count_file_rows(source_path) if source_path else st.session_state.get('source_rows')
+            if total_rows is None:
+                count = lambda: TRACER.collect(data.select(pl.len())).item()
+                total_rows = RESULT_CACHE.get_or_compute((fingerprint, 'len'), count) if fingerprint else count()
         st.write(f"Total rows: {total_rows}")
+        cache_stats = RESULT_CACHE.stats()
+        st.sidebar.caption(f"Result cache: {cache_stats['entries']} entries, {cache_stats['bytes'] / 1024 ** 2:.1f} MB, "
+                           f"{cache_stats['hit_rate']:.0%} hit rate")
+        shared = SHARED_REGISTRY.stats()
+        st.sidebar.caption(f"Shared frames: {shared['entries']} ({shared['leases']} sessions), "
+                           f"{shared['bytes'] / 1024 ** 2:.1f} MB of {SHARED_REGISTRY.max_bytes / 1024 ** 2:.0f} MB")
 
-        # Performance: if large dataset, keep lazy, no editing
+        # Performance: if large dataset, keep lazy; editing then goes through an on-disk snapshot
         allow_editing = total_rows <= 10000
+        out_of_core = False
         if allow_editing:
-            if 'full_data' not in st.session_state:
-                st.session_state.full_data = data.collect()
+            # Rebuild the editable copy when a different source (or a changed file) is loaded
+            if 'full_data' not in st.session_state or st.session_state.get('full_data_source') != fingerprint:
+                with TRACER.span("load_snapshot"):
+                    if fingerprint:
+                        # Sessions editing the same source share one loaded frame; their
+                        # edits stay in their own piece tables
+                        lease = SHARED_REGISTRY.lease(fingerprint, lambda: TRACER.collect(data))
+                        st.session_state.full_data = PieceTable(lease.value)
+                        st.session_state.full_data_lease = lease
+                    else:
+                        st.session_state.full_data = PieceTable(TRACER.collect(data))
+                        st.session_state.full_data_lease = None
+                st.session_state.full_data_source = fingerprint
+                st.session_state.cube_changes = ([], [])  # (old, new) pages of applied edits, for the aggregates
             data_to_use = st.session_state.full_data
+            # Inserted and deleted rows change the row count
+            total_rows = data_to_use.height
         else:
             data_to_use = data
-            st.warning("Dataset is large. Editing disabled. Only display and save original data.")
+            table = None
+            if fingerprint and st.checkbox("Edit large dataset (out-of-core)",
+                                           help="Writes a memory-mapped snapshot of the source once; edits are kept "
+                                                "per cell and only the page on screen is loaded"):
+                table = st.session_state.get('ooc_table')
+                if table is None or st.session_state.get('ooc_source') != fingerprint:
+                    table = None
+                    snapshot = SNAPSHOTS.get(fingerprint)
+                    if snapshot is None:
+                        # Written in the background; the read-only view is shown meanwhile
+                        job = JOBS.get(st.session_state.get('snapshot_job') or '')
+                        if job is None or job.key != ("snapshot", fingerprint):
+                            job = JOBS.submit("Snapshot for editing", SNAPSHOTS.build, fingerprint, data,
+                                              key=("snapshot", fingerprint))
+                            job.total_rows = total_rows
+                            st.session_state.snapshot_job = job.id
+                        if job.active:
+                            job_progress(job.id)
+                        elif job.status == "done":
+                            snapshot = job.result
+                        else:
+                            st.error(f"Snapshot {job.status}: {job.error or 'no snapshot written'}")
+                            if st.button("Retry snapshot"):
+                                st.session_state.snapshot_job = None
+                                st.rerun()
+                    if snapshot is not None:
+                        table = OutOfCoreTable(snapshot)
+                        st.session_state.ooc_table = table
+                        st.session_state.ooc_source = fingerprint
+                        st.session_state.cube_changes = ([], [])
+                        st.session_state.snapshot_job = None
+            if table is not None:
+                out_of_core = True
+                data_to_use = table.lazy()
+            else:
+                st.warning("Dataset is large. Editing disabled. Only display and save original data.")
+
+        # Column profile, cached per source (and edit version)
+        with st.expander("Column profile"):
+            profile_key = (fingerprint, data_to_use.version if allow_editing else None)
+            profile = PROFILE_CACHE.get(profile_key) if fingerprint else None
+            if profile is None and st.button("Compute profile"):
+                parquet_path = None
+                if source_path and not allow_editing:
+                    parquet_path = source_path if file_type == 'parquet' else COLUMNAR_CACHE.lookup(source_path, convert=False)
+                with st.spinner("Profiling columns..."), TRACER.span("profile"):
+                    # Out-of-core edits are not profiled; the snapshot is the source
+                    profile = profile_frame((data if out_of_core else data_to_use).lazy(), parquet_path=parquet_path)
+                if fingerprint:
+                    PROFILE_CACHE.put(profile_key, profile)
+            if profile is not None:
+                st.dataframe(profile, width='stretch', hide_index=True)
+                st.caption("Distinct counts (HyperLogLog) and percentiles (KLL sketch) are approximate.")
+
+        # Aggregates from a cube cached per source; edits applied in this session are folded in
+        # by subtracting the old rows and adding the new ones
+        with st.expander("Aggregates"):
+            schema = data.collect_schema()
+            # Row numbers (e.g. the index column written out with the insurance data) are left out
+            find_keys = lambda: tuple(key_columns(data))
+            keys = RESULT_CACHE.get_or_compute((fingerprint, 'key_columns'), find_keys) if fingerprint else find_keys()
+            dimensions = dimension_columns(schema, exclude=keys)
+            measures = measure_columns(schema, exclude=keys)
+            a1, a2 = st.columns(2)
+            with a1:
+                cube_dims = st.multiselect("Dimensions", dimensions, key="cube_dims",
+                                           default=[c for c in ("DISTRICT_NAME", "CATEGORY_NAME", "HOSP_NAME") if c in dimensions])
+            with a2:
+                cube_measures = st.multiselect("Measures", measures, key="cube_measures",
+                                               default=[c for c in ("CLAIM_AMOUNT", "PREAUTH_AMT") if c in measures])
+            agg = None
+            if cube_dims and fingerprint:
+                cube_key = (fingerprint, tuple(cube_dims), tuple(cube_measures))
+                agg = CUBE_CACHE.get(cube_key)
+                if agg is None and st.button("Compute aggregates", help="One streaming pass over the source; cached until it changes"):
+                    try:
+                        with st.spinner("Aggregating..."), TRACER.span("cube_build") as span:
+                            agg = CUBE_CACHE.get_or_compute(cube_key, lambda: Cube.build(data, cube_dims, cube_measures))
+                            span.set_frame(agg.frame)
+                    except ValueError as e:
+                        st.error(str(e))
+            if agg is not None:
+                old, new = st.session_state.get('cube_changes') or ([], [])
+                edited = (allow_editing or out_of_core) and old
+                if edited:
+                    columns = cube_dims + cube_measures
+                    agg = agg.apply(pl.concat(old, how="vertical_relaxed").select(columns),
+                                    pl.concat(new, how="vertical_relaxed").select(columns))
+                totals_by = st.multiselect("Totals by", cube_dims, default=cube_dims[:1], key="cube_totals_by")
+                totals = agg.rollup(totals_by)
+                if len(totals_by) == 1:
+                    metric = st.selectbox("Chart", [ROWS] + [f"{m}_{s}" for m in cube_measures for s in ("sum", "mean")],
+                                          key="cube_metric")
+                    st.bar_chart(totals, x=totals_by[0], y=metric)
+                st.dataframe(totals, width='stretch', hide_index=True)
+                notes = []
+                if edited:
+                    notes.append(f"Includes {len(old)} unsaved page edits.")
+                if totals[STALE].any():
+                    notes.append("Min/max marked stale may be wider than the data: an edit removed the group's extreme value.")
+                if notes:
+                    st.caption(" ".join(notes))
 
         st.header("Data Preview")
 
@@ -126,52 +402,113 @@ def main():
             columns = data_to_use.columns
             sorted_data = data_to_use
         else:
-            columns = data_to_use.collect_schema().names()
+            columns = [c for c in data_to_use.collect_schema().names() if c != POSITION]
             sorted_data = data_to_use
         
         sort_col = st.selectbox("Sort by column", columns)
         sort_order = st.selectbox("Sort order", ["None", "Ascending", "Descending"])
         
-        if sort_order == "Ascending":
-            sorted_data = sorted_data.sort(sort_col) if not allow_editing else sorted_data.lazy().sort(sort_col)
-        elif sort_order == "Descending":
-            sorted_data = sorted_data.sort(sort_col, descending=True) if not allow_editing else sorted_data.lazy().sort(sort_col, descending=True)
+        # Shallow pages use a top-k, deeper ones a full sort, or an external
+        # merge sort when the sort wouldn't fit in memory. All three break ties
+        # by row position, so pages never overlap or skip rows.
+        descending = sort_order == "Descending"
+        if sort_order != "None":
+            sorted_data = paging.sort_view(sorted_data.lazy() if allow_editing else sorted_data, sort_col, descending)
+        strategy = None
+        # Out-of-core pages carry row positions, so their sorted files differ
+        external_key = (fingerprint, sort_col, POSITION) if out_of_core else (fingerprint, sort_col)
+        if sort_order != "None":
+            if not allow_editing and fingerprint and EXTERNAL_SORTS.get(external_key) is not None:
+                strategy = paging.EXTERNAL
+            else:
+                if allow_editing:
+                    sort_bytes = data_to_use.to_frame().estimated_size()
+                else:
+                    estimate = lambda: paging.estimate_row_bytes(data_to_use)
+                    row_bytes = RESULT_CACHE.get_or_compute((fingerprint, 'row_bytes'), estimate) if fingerprint else estimate()
+                    sort_bytes = total_rows * row_bytes
+                strategy = paging.choose_strategy(start_row, page_size, sort_bytes, EXTERNAL_SORTS.memory_budget)
+                if strategy == paging.EXTERNAL and not fingerprint:
+                    # Spilled sorts are keyed by fingerprint
+                    strategy = paging.IN_MEMORY
 
         # Get page data
-        if allow_editing and sort_order == "None":
-            df_page = sorted_data.slice(start_row, page_size)
-        else:
-            df_page = sorted_data.slice(start_row, page_size).collect() if hasattr(sorted_data, 'collect') else sorted_data.slice(start_row, page_size)
+        def load_page():
+            if strategy == paging.TOP_K:
+                return paging.top_k_page(data_to_use.lazy(), sort_col, descending, start_row, page_size)
+            if strategy == paging.EXTERNAL:
+                return EXTERNAL_SORTS.get_or_build(external_key, data_to_use, sort_col).page(start_row, page_size, descending)
+            if allow_editing and sort_order == "None":
+                return sorted_data.slice(start_row, page_size)
+            return TRACER.collect(sorted_data.slice(start_row, page_size)) if hasattr(sorted_data, 'collect') else sorted_data.slice(start_row, page_size)
+
+        with TRACER.span("page", page=page, sort=strategy) as span:
+            if fingerprint:
+                # Edited data is keyed by its version, so applied edits never hit stale pages
+                version = data_to_use.version if allow_editing else None
+                page_key = (fingerprint, version, out_of_core, sort_col if sort_order != "None" else None, sort_order,
+                            page_size, page)
+                df_page = RESULT_CACHE.get_or_compute(page_key, load_page)
+            else:
+                df_page = load_page()
+            if out_of_core:
+                # Pages are cached as read from the snapshot; this session's edits go on top
+                df_page, positions = table.overlay_page(df_page)
+            span.set_frame(df_page)
 
         # Display data
-        st.dataframe(df_page, width='stretch')
+        with TRACER.span("render") as span:
+            span.set_frame(df_page)
+            st.dataframe(df_page, width='stretch')
+        if strategy:
+            st.caption(f"Sorted with: {paging.STRATEGY_LABELS[strategy]}")
+
+        # Applying edits waits for a running save, which reads the same piece table or overlay
+        save_job = JOBS.get(st.session_state.save_job) if st.session_state.get('save_job') else None
+        saving = save_job is not None and save_job.active
 
         # Cell editing
         if allow_editing:
             st.header("Edit Data")
-            edited_df = st.data_editor(df_page, num_rows="dynamic", key=f"editor_page_{page}")
-            if st.button("Apply Edits to Full Data"):
+            # Edits replace the page's span of unsorted rows, which a sorted page isn't
+            sorted_page = sort_order != "None"
+            if sorted_page:
+                st.caption("Set the sort order to None to edit: edits are applied to the rows in their original order.")
+            with TRACER.span("render_editor") as span:
+                span.set_frame(df_page)
+                edited_df = st.data_editor(df_page, num_rows="dynamic", key=f"editor_page_{page}",
+                                           disabled=sorted_page)
+            if st.button("Apply Edits to Full Data", disabled=saving or sorted_page):
                 try:
                     # Convert edited page back to polars if needed
                     if not isinstance(edited_df, pl.DataFrame):
                         edited_df = pl.from_pandas(edited_df)
                     
-                    # Merge edits back into full dataset
-                    if edited_df.height <= df_page.height:
-                        # Update existing rows
-                        rows_before = st.session_state.full_data.slice(0, start_row)
-                        rows_after = st.session_state.full_data.slice(start_row + edited_df.height)
-                        st.session_state.full_data = pl.concat([rows_before, edited_df, rows_after])
-                    else:
-                        # Handle new rows added
-                        original_rows = df_page.height
-                        updated_existing = edited_df.slice(0, original_rows)
-                        new_rows = edited_df.slice(original_rows)
-                        
-                        rows_before = st.session_state.full_data.slice(0, start_row)
-                        rows_after = st.session_state.full_data.slice(start_row + original_rows)
-                        st.session_state.full_data = pl.concat([rows_before, updated_existing, new_rows, rows_after])
-                    
+                    # Swap the page's rows for the edited ones; added or deleted rows shift later offsets
+                    st.session_state.full_data.replace(start_row, df_page.height, edited_df)
+                    old, new = st.session_state.cube_changes
+                    old.append(df_page)
+                    new.append(edited_df.select([pl.col(c).cast(dtype, strict=False) for c, dtype in df_page.schema.items()]))
+
+                    st.success("Edits applied successfully")
+                    st.rerun()
+                except Exception as e:
+                    st.error(f"Error applying edits: {e}")
+        elif out_of_core:
+            st.header("Edit Data")
+            st.caption(f"Out-of-core editing: {len(table.overlay)} edited rows. Rows can't be added or removed, "
+                       "and sorting uses the values in the snapshot.")
+            editor_key = f"ooc_editor_{page}_{page_size}_{sort_col}_{sort_order}_{table.version}"
+            with TRACER.span("render_editor") as span:
+                span.set_frame(df_page)
+                st.data_editor(df_page, key=editor_key)
+            if st.button("Apply Edits to Full Data", disabled=saving):
+                try:
+                    # Recorded by row position in the overlay; the snapshot is never rewritten
+                    table.edit(positions, st.session_state[editor_key]["edited_rows"])
+                    old, new = st.session_state.cube_changes
+                    old.append(df_page)
+                    new.append(table.overlay.apply(df_page, positions))
                     st.success("Edits applied successfully")
                     st.rerun()
                 except Exception as e:
@@ -183,18 +520,48 @@ def main():
         # Save to Parquet
         st.header("Save Data")
         save_path = st.text_input("Save Path (for Parquet)")
-        if st.button("Save to Parquet"):
+        if st.button("Save to Parquet", disabled=saving):
             if save_path:
-                try:
-                    if allow_editing and 'full_data' in st.session_state:
-                        st.session_state.full_data.write_parquet(save_path)
-                    else:
-                        data.collect().write_parquet(save_path)
-                    st.success(f"Data saved to {save_path}")
-                except Exception as e:
-                    st.error(f"Error saving data: {e}")
+                frame = st.session_state.full_data if allow_editing and 'full_data' in st.session_state else data
+                if out_of_core:
+                    frame = table
+                st.session_state.save_job = JOBS.submit(f"Save {save_path}", save_parquet_job, frame, save_path,
+                                                        key=("save", save_path)).id
+                st.rerun()
             else:
                 st.error("Please provide a save path")
+        if saving:
+            job_progress(save_job.id)
+        elif save_job is not None:
+            st.session_state.save_job = None
+            if save_job.status == "done":
+                st.success(f"Data saved to {save_job.result}")
+            elif save_job.status == "failed":
+                st.error(f"Error saving data: {save_job.error}")
+            else:
+                st.info("Save cancelled")
+
+    # Timings, last so this run's spans (including the render) are shown
+    with st.sidebar.expander("Timings"):
+        st.checkbox("Profile Polars queries", key='profile_queries',
+                    help="Run this session's page queries with Polars profile() and keep the slowest plan nodes")
+        st.caption("This session's recent spans")
+        st.dataframe(TRACER.recent(20, session=trace_session), width='stretch', hide_index=True)
+        summary = TRACER.summary()
+        if summary.height:
+            st.caption("All sessions and background work since start (latencies over recent spans)")
+            st.dataframe(summary, width='stretch', hide_index=True)
+        profiled = TRACER.last_profile(session=trace_session)
+        if profiled:
+            st.caption(f"Slowest plan nodes ({profiled[0]})")
+            st.dataframe(profiled[1], width='stretch', hide_index=True)
+        if st.button("Append JSONL"):
+            path = os.path.join(DEFAULT_TRACE_DIR, "trace.jsonl")
+            st.caption(f"{TRACER.export_jsonl(path)} spans added to {path}")
+        if st.button("Write Prometheus"):
+            path = os.path.join(DEFAULT_TRACE_DIR, "metrics.prom")
+            TRACER.export_prometheus(path)
+            st.caption(f"Wrote {path}")
 
 if __name__ == "__main__":
     main()
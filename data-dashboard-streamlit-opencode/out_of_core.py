@@ -0,0 +1,231 @@
+import glob
+import hashlib
+import itertools
+import os
+import threading
+
+import polars as pl
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+DEFAULT_SNAPSHOT_DIR = "data/.edit_snapshots"
+# Total size of snapshots kept on disk
+DEFAULT_MAX_BYTES = 20 * 1024 ** 3
+# Rows per batch when saving; memory use is bounded by one batch
+SAVE_BATCH_ROWS = 65_536
+# Row position column carried through sorted pages
+POSITION = "__pos"
+
+# Versions are unique across overlays, so they can key shared caches
+_versions = itertools.count(1)
+
+
+class Snapshot:
+    """A source written once to an uncompressed Arrow IPC file and memory-mapped."""
+
+    def __init__(self, path):
+        self.path = path
+        self._table = pa.ipc.open_file(pa.memory_map(path)).read_all()
+        self.schema = pl.from_arrow(self._table.slice(0, 0)).schema
+
+    @property
+    def height(self):
+        return self._table.num_rows
+
+    def lazy(self):
+        return pl.scan_ipc(self.path, memory_map=True)
+
+    def batches(self, rows=SAVE_BATCH_ROWS):
+        """(offset, DataFrame) pairs covering the snapshot, rows at a time."""
+        for offset in range(0, self.height, rows):
+            yield offset, pl.from_arrow(self._table.slice(offset, rows))
+
+
+class SnapshotStore:
+    """
+    Snapshots for out-of-core editing, shared by every session and keyed by
+    source fingerprint. Building one streams the source to disk with
+    sink_ipc, so it never has to fit in memory; pages are then zero-copy
+    slices of the mapped file. Files outlive the process and are evicted
+    least recently used beyond max_bytes.
+    """
+
+    def __init__(self, snapshot_dir=DEFAULT_SNAPSHOT_DIR, max_bytes=DEFAULT_MAX_BYTES):
+        self.snapshot_dir = snapshot_dir
+        self.max_bytes = max_bytes
+        self._snapshots = {}  # {key: Snapshot}
+        self._lock = threading.Lock()
+
+    def _path(self, key):
+        return os.path.join(self.snapshot_dir, hashlib.sha1(repr(key).encode()).hexdigest() + ".arrow")
+
+    def get(self, key):
+        """The snapshot for key if it is on disk, else None."""
+        path = self._path(key)
+        with self._lock:
+            snapshot = self._snapshots.get(key)
+            if snapshot is None and os.path.exists(path):
+                snapshot = self._snapshots[key] = Snapshot(path)
+            if snapshot is not None and os.path.exists(path):
+                os.utime(path)
+                return snapshot
+            return None
+
+    def build(self, job, key, lf):
+        """Stream lf into the snapshot for key (run as a jobs.Job) and return it."""
+        snapshot = self.get(key)
+        if snapshot is not None:
+            return snapshot
+        path = self._path(key)
+        tmp = f"{path}.{threading.get_ident()}.tmp"
+        os.makedirs(self.snapshot_dir, exist_ok=True)
+        try:
+            # Uncompressed, so the file can be memory-mapped as is
+            job.run_query(lf.sink_ipc(tmp, compression="uncompressed", lazy=True), progress_path=tmp)
+        except Exception:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            raise
+        os.replace(tmp, path)
+        with self._lock:
+            snapshot = self._snapshots[key] = Snapshot(path)
+            self._evict(keep=path)
+        job.progress(snapshot.height)
+        return snapshot
+
+    def _evict(self, keep=None):
+        files = sorted(glob.glob(os.path.join(self.snapshot_dir, "*.arrow")), key=os.path.getmtime)
+        total = sum(os.path.getsize(f) for f in files)
+        for f in files:
+            if total <= self.max_bytes:
+                break
+            if f == keep:
+                continue
+            total -= os.path.getsize(f)
+            # Sessions still mapping the file keep reading it until they drop it
+            os.remove(f)
+        for key, snapshot in list(self._snapshots.items()):
+            if not os.path.exists(snapshot.path):
+                del self._snapshots[key]
+
+
+class EditOverlay:
+    """
+    Edited cells of a snapshot, by row position: one small (position, value)
+    frame per edited column, so memory grows with the edits, not the source.
+    New edits are buffered and merged into the frames when they are next
+    read. version changes with every edit.
+    """
+
+    def __init__(self, schema):
+        self.schema = schema
+        self.version = next(_versions)
+        self._edits = {}  # {column: DataFrame of position, value}
+        self._pending = {}  # {column: {position: value}} not yet merged
+
+    def __len__(self):
+        edits = self._frames()
+        if not edits:
+            return 0
+        return pl.concat([e[POSITION] for e in edits.values()]).n_unique()
+
+    def set(self, position, column, value):
+        self._pending.setdefault(column, {})[position] = value
+        self.version = next(_versions)
+
+    def _frames(self):
+        for column, pending in self._pending.items():
+            new = pl.DataFrame({
+                POSITION: pl.Series(list(pending), dtype=pl.Int64),
+                "value": pl.Series(list(pending.values()), strict=False).cast(self.schema[column], strict=False),
+            })
+            if column in self._edits:
+                new = pl.concat([self._edits[column], new]).unique(POSITION, keep="last", maintain_order=True)
+            self._edits[column] = new
+        self._pending = {}
+        return self._edits
+
+    def apply(self, df, positions):
+        """df (rows at positions) with the edited cells replaced."""
+        edits = self._frames()
+        if not edits or not len(positions):
+            return df
+        positions = positions.cast(pl.Int64)
+        lo, hi = positions.min(), positions.max()
+        rows = positions.to_frame(POSITION).with_row_index("__i")
+        for column, frame in edits.items():
+            hits = frame.filter(pl.col(POSITION).is_between(lo, hi))
+            if not hits.height:
+                continue
+            hits = rows.join(hits, on=POSITION)
+            if hits.height:
+                df = df.with_columns(df[column].clone().scatter(hits["__i"], hits["value"]))
+        return df
+
+
+class OutOfCoreTable:
+    """
+    Editing for sources too large to collect: a shared memory-mapped
+    Snapshot plus this session's EditOverlay. Only the page on screen is
+    materialized; saving streams snapshot batches through the overlay.
+    Rows can be edited but not added or removed, and sorting uses the
+    snapshot's values.
+    """
+
+    def __init__(self, snapshot):
+        self.snapshot = snapshot
+        self.overlay = EditOverlay(snapshot.schema)
+
+    @property
+    def height(self):
+        return self.snapshot.height
+
+    @property
+    def version(self):
+        return self.overlay.version
+
+    def lazy(self):
+        """The snapshot with each row's position, for paging and sorting."""
+        return self.snapshot.lazy().with_row_index(POSITION)
+
+    def overlay_page(self, df):
+        """Drop the position column from a page of lazy() and apply the edits. Returns (page, positions)."""
+        positions = df[POSITION]
+        return self.overlay.apply(df.drop(POSITION), positions), positions
+
+    def edit(self, positions, edited_rows):
+        """Record data_editor edited_rows ({page row: {column: value}}) for a page at positions."""
+        for row, changes in edited_rows.items():
+            for column, value in changes.items():
+                self.overlay.set(positions[int(row)], column, value)
+
+    def write_parquet(self, path, job=None):
+        """Stream snapshot + edits to Parquet, one batch in memory at a time."""
+        tmp = f"{path}.tmp"
+        writer = None
+        try:
+            for offset, batch in self.snapshot.batches():
+                if job is not None:
+                    job.check()
+                positions = pl.int_range(offset, offset + batch.height, eager=True)
+                table = self.overlay.apply(batch, positions).to_arrow()
+                if writer is None:
+                    writer = pq.ParquetWriter(tmp, table.schema)
+                writer.write_table(table)
+                if job is not None:
+                    job.progress(batch.height, table.nbytes)
+            if writer is None:
+                pl.DataFrame(schema=self.snapshot.schema).write_parquet(tmp)
+            else:
+                writer.close()
+        except Exception:
+            if writer is not None:
+                writer.close()
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            raise
+        os.replace(tmp, path)
+
+
+# Process-wide snapshot store
+SNAPSHOTS = SnapshotStore()
@@ -0,0 +1,123 @@
+import bisect
+import itertools
+
+import polars as pl
+
+# Flatten once this many pieces pile up, so lookups stay cheap
+MAX_PIECES = 256
+
+# Versions are unique across tables, so they can key shared caches
+_versions = itertools.count(1)
+
+
+class PieceTable:
+    """
+    Editable rows kept as a sequence of pieces, each a window (start, length)
+    into one of the buffers: the original frame or a frame of applied edits.
+    Replacing a page of rows only splits the pieces at the page boundaries
+    and adds the edited page as a new buffer, so applying edits costs
+    O(page + pieces) instead of copying the whole frame, and inserts or
+    deletes shift later row offsets without moving any data.
+    The contiguous frame is built lazily, for sorting and saving.
+    version changes whenever the rows do.
+    """
+
+    def __init__(self, frame):
+        self.version = next(_versions)
+        self.schema = frame.schema
+        self._buffers = [frame]
+        self._pieces = [(0, 0, frame.height)] if frame.height else []  # (buffer, start, length)
+        self._offsets = self._piece_offsets()
+        self._flat = frame
+
+    def _piece_offsets(self):
+        offsets, pos = [], 0
+        for _, _, length in self._pieces:
+            offsets.append(pos)
+            pos += length
+        self.height = pos
+        return offsets
+
+    @property
+    def columns(self):
+        return list(self.schema.names())
+
+    def __len__(self):
+        return self.height
+
+    def _split(self, offset):
+        """Make offset fall on a piece boundary and return that piece's index."""
+        i = bisect.bisect_right(self._offsets, offset) - 1
+        if i < 0 or offset >= self.height:
+            return len(self._pieces)
+        buf, start, length = self._pieces[i]
+        cut = offset - self._offsets[i]
+        if cut == 0:
+            return i
+        self._pieces[i:i + 1] = [(buf, start, cut), (buf, start + cut, length - cut)]
+        self._offsets.insert(i + 1, offset)
+        return i + 1
+
+    def slice(self, offset, length):
+        """Rows offset..offset+length as a DataFrame, touching only the pieces involved."""
+        end = min(offset + length, self.height)
+        if offset >= end:
+            return pl.DataFrame(schema=self.schema)
+        if self._flat is not None:
+            return self._flat.slice(offset, end - offset)
+
+        parts = []
+        i = bisect.bisect_right(self._offsets, offset) - 1
+        pos = offset
+        while pos < end:
+            buf, start, piece_len = self._pieces[i]
+            skip = pos - self._offsets[i]
+            take = min(piece_len - skip, end - pos)
+            parts.append(self._buffers[buf].slice(start + skip, take))
+            pos += take
+            i += 1
+        return pl.concat(parts) if len(parts) > 1 else parts[0]
+
+    def replace(self, offset, length, frame):
+        """
+        Replace rows offset..offset+length with frame, which may have more
+        rows (inserts) or fewer (deletes). frame is cast to the table schema.
+        """
+        if frame.schema != self.schema:
+            frame = frame.select([pl.col(c).cast(dtype, strict=False) for c, dtype in self.schema.items()])
+        offset = min(offset, self.height)
+        end = min(offset + length, self.height)
+
+        first = self._split(offset)
+        last = self._split(end)
+        new = []
+        if frame.height:
+            self._buffers.append(frame)
+            new = [(len(self._buffers) - 1, 0, frame.height)]
+        self._pieces[first:last] = new
+        self._offsets = self._piece_offsets()
+        self._flat = None
+        self.version = next(_versions)
+
+        if len(self._pieces) > MAX_PIECES:
+            self.compact()
+
+    def to_frame(self):
+        """The rows as one contiguous DataFrame (built once per round of edits)."""
+        if self._flat is None:
+            parts = [self._buffers[buf].slice(start, length) for buf, start, length in self._pieces]
+            self._flat = pl.concat(parts, rechunk=True) if parts else pl.DataFrame(schema=self.schema)
+        return self._flat
+
+    def compact(self):
+        """Flatten into a single buffer and drop buffers no longer referenced."""
+        flat = self.to_frame()
+        self._buffers = [flat]
+        self._pieces = [(0, 0, flat.height)] if flat.height else []
+        self._offsets = self._piece_offsets()
+
+    def lazy(self):
+        return self.to_frame().lazy()
+
+    def write_parquet(self, path):
+        self.to_frame().write_parquet(path)
@@ -0,0 +1,83 @@
+import threading
+from collections import OrderedDict
+
+import polars as pl
+
+# Memory budget for cached results
+DEFAULT_MAX_BYTES = 512 * 1024 ** 2
+
+
+def result_size(value):
+    if isinstance(value, pl.DataFrame):
+        return value.estimated_size()
+    return 64
+
+
+class QueryCache:
+    """
+    LRU of computed results (row counts, pages) shared by every session in the
+    process, bounded by estimated size. Keys start with the source
+    fingerprint, so a changed source or edited data simply stops matching
+    and its old entries age out.
+    """
+
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()  # {key: (value, size)}
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._entries.move_to_end(key)
+            return entry[0]
+
+    def put(self, key, value):
+        size = result_size(value)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= old[1]
+            self._entries[key] = (value, size)
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self._bytes -= evicted
+
+    def get_or_compute(self, key, compute):
+        value = self.get(key)
+        if value is None:
+            value = compute()
+            self.put(key, value)
+        return value
+
+    def invalidate(self, fingerprint=None):
+        """Drop entries for one source fingerprint, or everything."""
+        with self._lock:
+            for key in list(self._entries):
+                if fingerprint is None or key[0] == fingerprint:
+                    self._bytes -= self._entries.pop(key)[1]
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+            }
+
+
+# Process-wide result cache
+RESULT_CACHE = QueryCache()
@@ -0,0 +1,254 @@
+import glob
+import hashlib
+import io
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import boto3
+import polars as pl
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+DEFAULT_CACHE_DIR = "data/.s3_block_cache"
+# Total size of cached blocks kept on disk
+DEFAULT_MAX_BYTES = 5 * 1024 ** 3
+# Ranged GETs are aligned to blocks of this size
+DEFAULT_BLOCK_SIZE = 8 * 1024 ** 2
+
+_stats_lock = threading.Lock()
+
+
+class BlockCache:
+    """
+    Fixed-size blocks of S3 objects on local disk, keyed by bucket/key/ETag
+    and block index, so they survive Streamlit reruns and restarts and are
+    never reused once the object changes. Evicted least recently used
+    beyond max_bytes.
+    """
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES, block_size=DEFAULT_BLOCK_SIZE):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.block_size = block_size
+        self._lock = threading.Lock()
+        self._total = None
+
+    def _path(self, object_id, index):
+        return os.path.join(self.cache_dir, f"{object_id}.{self.block_size}.{index}.blk")
+
+    def get(self, object_id, index):
+        path = self._path(object_id, index)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+            # mtime doubles as the last-used time for eviction
+            os.utime(path)
+            return data
+        except FileNotFoundError:
+            return None
+
+    def put(self, object_id, index, data):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        path = self._path(object_id, index)
+        tmp = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+        self.added(path, len(data))
+
+    def added(self, path, size):
+        """Account for a file written to the cache directory and evict if over budget."""
+        with self._lock:
+            if self._total is None:
+                self._total = sum(os.path.getsize(p) for p in self._files())
+            else:
+                self._total += size
+            if self._total > self.max_bytes:
+                self._evict(keep=path)
+
+    def _files(self):
+        # Blocks plus whole-object downloads
+        return glob.glob(os.path.join(self.cache_dir, "*.blk")) + glob.glob(os.path.join(self.cache_dir, "*.obj"))
+
+    def _evict(self, keep=None):
+        files = sorted(self._files(), key=os.path.getmtime)
+        total = sum(os.path.getsize(f) for f in files)
+        for f in files:
+            if total <= self.max_bytes:
+                break
+            if f == keep:
+                continue
+            try:
+                size = os.path.getsize(f)
+                os.remove(f)
+                total -= size
+            except FileNotFoundError:
+                pass
+        self._total = total
+
+    def clear(self):
+        with self._lock:
+            for f in self._files():
+                os.remove(f)
+            self._total = 0
+
+
+class S3File(io.RawIOBase):
+    """
+    Seekable read-only view of one S3 object. Reads are served from the block
+    cache; missing blocks are fetched with ranged GETs, in parallel when a
+    read spans several of them (pyarrow coalesces column chunk reads into
+    large ranges, so a single read often does).
+    """
+
+    def __init__(self, client, bucket, key, size, etag, cache, pool, stats):
+        self.client = client
+        self.bucket = bucket
+        self.key = key
+        self.size = size
+        self.etag = etag
+        self.cache = cache
+        self.pool = pool
+        self.stats = stats
+        self.object_id = hashlib.sha1(f"{bucket}/{key}|{etag}".encode()).hexdigest()
+        self._pos = 0
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def tell(self):
+        return self._pos
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_SET:
+            self._pos = offset
+        elif whence == io.SEEK_CUR:
+            self._pos += offset
+        else:
+            self._pos = self.size + offset
+        return self._pos
+
+    def read(self, n=-1):
+        if n is None or n < 0:
+            n = self.size - self._pos
+        data = self.read_range(self._pos, n)
+        self._pos += len(data)
+        return data
+
+    def readinto(self, buffer):
+        data = self.read(len(buffer))
+        buffer[:len(data)] = data
+        return len(data)
+
+    def read_range(self, start, length):
+        end = min(start + length, self.size)
+        if start >= end:
+            return b""
+        block_size = self.cache.block_size
+        indexes = range(start // block_size, (end - 1) // block_size + 1)
+
+        blocks = {i: self.cache.get(self.object_id, i) for i in indexes}
+        missing = [i for i, data in blocks.items() if data is None]
+        with _stats_lock:
+            self.stats["cache_hits"] += len(indexes) - len(missing)
+        if len(missing) == 1:
+            blocks[missing[0]] = self._fetch(missing[0])
+        elif missing:
+            blocks.update(zip(missing, self.pool.map(self._fetch, missing)))
+
+        data = b"".join(blocks[i] for i in indexes)
+        offset = start - indexes[0] * block_size
+        return data[offset:offset + end - start]
+
+    def _fetch(self, index):
+        block_size = self.cache.block_size
+        first = index * block_size
+        last = min(first + block_size, self.size) - 1
+        response = self.client.get_object(
+            Bucket=self.bucket, Key=self.key, Range=f"bytes={first}-{last}", IfMatch=self.etag
+        )
+        data = response["Body"].read()
+        with _stats_lock:
+            self.stats["requests"] += 1
+            self.stats["bytes_fetched"] += len(data)
+        self.cache.put(self.object_id, index, data)
+        return data
+
+
+class S3Source:
+    """
+    Scans S3 objects in place. Parquet is exposed as a pyarrow dataset over
+    ranged reads, so Polars only fetches the footer and the column chunks
+    (and row groups, via statistics) that the query needs. CSV cannot be
+    read selectively and is downloaded once per ETag into the cache directory.
+    """
+
+    def __init__(self, cache=None, max_workers=8):
+        self.cache = cache or BlockCache()
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="s3-fetch")
+        self.stats = {"requests": 0, "bytes_fetched": 0, "cache_hits": 0}
+
+    def client(self, aws_access_key=None, aws_secret_key=None, endpoint_url=None):
+        return boto3.client('s3',
+                            aws_access_key_id=aws_access_key or None,
+                            aws_secret_access_key=aws_secret_key or None,
+                            endpoint_url=endpoint_url or None)
+
+    def open(self, client, bucket, key):
+        head = client.head_object(Bucket=bucket, Key=key)
+        return S3File(client, bucket, key, head["ContentLength"], head["ETag"], self.cache, self._pool, self.stats)
+
+    def scan_parquet(self, client, bucket, key):
+        f = self.open(client, bucket, key)
+        fmt = ds.ParquetFileFormat(default_fragment_scan_options=ds.ParquetFragmentScanOptions(pre_buffer=True))
+        fragment = fmt.make_fragment(pa.PythonFile(f, mode="r"))
+        # One fragment per row group: readahead is then bounded by fragments, so a
+        # head() stops fetching after a few row groups instead of reading the object
+        dataset = ds.FileSystemDataset(fragment.split_by_row_group(), fragment.physical_schema, fmt)
+        return pl.scan_pyarrow_dataset(dataset)
+
+    def etag(self, client, bucket, key):
+        return client.head_object(Bucket=bucket, Key=key)["ETag"]
+
+    def count_rows(self, client, bucket, key):
+        """Row count of a Parquet object from its footer (usually one cached block)."""
+        return pq.read_metadata(pa.PythonFile(self.open(client, bucket, key), mode="r")).num_rows
+
+    def download(self, client, bucket, key, suffix, job=None):
+        """
+        Whole-object copy in the cache directory, reused until the ETag changes.
+        With a job (jobs.Job), bytes received are reported as progress and a
+        cancel aborts the transfer.
+        """
+        head = client.head_object(Bucket=bucket, Key=key)
+        object_id = hashlib.sha1(f"{bucket}/{key}|{head['ETag']}".encode()).hexdigest()
+        path = os.path.join(self.cache.cache_dir, f"{object_id}.{suffix}.obj")
+        if not os.path.exists(path):
+            os.makedirs(self.cache.cache_dir, exist_ok=True)
+            tmp = path + ".tmp"
+
+            def job_callback(nbytes):
+                job.check()
+                job.progress(nbytes=nbytes)
+
+            # download_file already splits large objects into parallel multipart GETs
+            try:
+                client.download_file(bucket, key, tmp, Callback=job_callback if job is not None else None)
+            except Exception:
+                if os.path.exists(tmp):
+                    os.remove(tmp)
+                raise
+            os.replace(tmp, path)
+            with _stats_lock:
+                self.stats["bytes_fetched"] += head["ContentLength"]
+            self.cache.added(path, head["ContentLength"])
+        return path
+
+
+# Process-wide S3 reader and block cache
+S3_SOURCE = S3Source()
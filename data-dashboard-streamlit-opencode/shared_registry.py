@@ -0,0 +1,151 @@
+import threading
+import time
+import weakref
+
+import polars as pl
+
+# Memory budget across everything the registry holds
+DEFAULT_MAX_BYTES = 4 * 1024 ** 3
+# Entries unused for this many seconds are dropped (or trimmed while leased)
+DEFAULT_IDLE_TIMEOUT = 600
+
+
+def value_size(value):
+    if isinstance(value, pl.DataFrame):
+        return value.estimated_size()
+    return getattr(value, "nbytes", 0)
+
+
+class _Entry:
+    __slots__ = ("value", "refs", "last_used")
+
+    def __init__(self, value):
+        self.value = value
+        self.refs = 0
+        self.last_used = time.monotonic()
+
+
+class Lease:
+    """A reference to a shared value. Released explicitly or when garbage collected."""
+
+    def __init__(self, key, value, release):
+        self.key = key
+        self.value = value
+        self._finalizer = weakref.finalize(self, release)
+
+    def release(self):
+        self._finalizer()
+
+
+class SharedRegistry:
+    """
+    Process-wide objects shared read-only by every session, one per source key.
+    Each session holds a Lease on what it uses (from lease()); the lease is
+    released when the session drops it, i.e. when the session ends or moves
+    to another source.
+
+    A memory budget covers everything held: over budget, entries no session
+    references are dropped first (least recently used first, calling their
+    close()), then referenced entries are asked to trim() their caches.
+    Independently of the budget, entries unused for idle_timeout seconds are
+    dropped when no session references them, and trimmed when one still does
+    (e.g. a session left open in a background tab).
+    """
+
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES, idle_timeout=DEFAULT_IDLE_TIMEOUT):
+        self.max_bytes = max_bytes
+        self.idle_timeout = idle_timeout
+        self._entries = {}  # {key: _Entry}
+        self._lock = threading.Lock()
+
+    def lease(self, key, factory):
+        """A Lease on the shared value for key, built by factory() if missing."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                entry = self._entries[key] = _Entry(factory())
+            entry.refs += 1
+            entry.last_used = time.monotonic()
+        lease = Lease(key, entry.value, lambda: self._release(entry))
+        self.enforce()
+        return lease
+
+    def _release(self, entry):
+        with self._lock:
+            entry.refs -= 1
+
+    def touch(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                entry.last_used = time.monotonic()
+
+    def nbytes(self):
+        with self._lock:
+            entries = list(self._entries.values())
+        return sum(value_size(e.value) for e in entries)
+
+    def expire(self):
+        """Drop or trim entries unused for idle_timeout seconds."""
+        now = time.monotonic()
+        dropped, idle = [], []
+        with self._lock:
+            for key, entry in list(self._entries.items()):
+                if now - entry.last_used <= self.idle_timeout:
+                    continue
+                if entry.refs > 0:
+                    idle.append(entry)
+                else:
+                    del self._entries[key]
+                    dropped.append(entry)
+        for entry in dropped:
+            close = getattr(entry.value, "close", None)
+            if close:
+                close()
+        for entry in idle:
+            trim = getattr(entry.value, "trim", None)
+            if trim:
+                trim()
+
+    def enforce(self):
+        """Drop idle entries, then bring the registry back within its budget."""
+        self.expire()
+        with self._lock:
+            entries = sorted(self._entries.items(), key=lambda kv: kv[1].last_used)
+        total = sum(value_size(e.value) for _, e in entries)
+        for key, entry in entries:
+            if total <= self.max_bytes:
+                return
+            if entry.refs > 0:
+                continue
+            with self._lock:
+                if entry.refs > 0 or self._entries.get(key) is not entry:
+                    continue
+                del self._entries[key]
+            total -= value_size(entry.value)
+            close = getattr(entry.value, "close", None)
+            if close:
+                close()
+        # Still over: shrink what live sessions share, the least recently used first
+        for _, entry in entries:
+            if total <= self.max_bytes:
+                return
+            trim = getattr(entry.value, "trim", None)
+            if trim and entry.refs > 0:
+                before = value_size(entry.value)
+                trim()
+                total -= before - value_size(entry.value)
+
+    def stats(self):
+        with self._lock:
+            entries = list(self._entries.values())
+        return {
+            "entries": len(entries),
+            "referenced": sum(1 for e in entries if e.refs > 0),
+            "leases": sum(e.refs for e in entries),
+            "bytes": sum(value_size(e.value) for e in entries),
+        }
+
+
+# Process-wide registry of shared sources
+SHARED_REGISTRY = SharedRegistry()
@@ -0,0 +1,48 @@
+import os
+import sqlite3
+
+import polars as pl
+import pytest
+
+from db_source import DatabaseSource, EngineRegistry
+
+ROWS = 250
+
+
+@pytest.fixture
+def connection_string(tmp_path):
+    path = tmp_path / "source.db"
+    with sqlite3.connect(path) as conn:
+        conn.execute("CREATE TABLE t (id INTEGER, name TEXT, value REAL)")
+        conn.executemany("INSERT INTO t VALUES (?, ?, ?)", [(i, f"n{i}", i / 2) for i in range(ROWS)])
+    return f"sqlite:///{path}"
+
+
+@pytest.fixture(params=[True, False], ids=["connectorx", "sqlalchemy"])
+def source(request, tmp_path):
+    source = DatabaseSource(EngineRegistry(), spill_dir=str(tmp_path / "spill"), batch_size=100,
+                            use_connectorx=request.param)
+    yield source
+    source.engines.dispose()
+
+
+def test_load_spills_all_rows(source, connection_string):
+    result = source.load(connection_string, "SELECT * FROM t")
+    df = result.lf.collect()
+    assert df.shape == (ROWS, 3)
+    assert df.schema == pl.Schema({"id": pl.Int64, "name": pl.String, "value": pl.Float64})
+    assert result.stats["rows"] == ROWS
+
+
+def test_empty_result_keeps_columns(source, connection_string):
+    result = source.load(connection_string, "SELECT * FROM t WHERE id < 0")
+    df = result.lf.collect()
+    assert df.shape == (0, 3)
+    assert df.columns == ["id", "name", "value"]
+
+
+def test_release_removes_spill_file(source, connection_string):
+    result = source.load(connection_string, "SELECT * FROM t")
+    assert len(os.listdir(source.spill_dir)) == 1
+    result.release()
+    assert os.listdir(source.spill_dir) == []
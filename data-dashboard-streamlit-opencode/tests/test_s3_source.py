@@ -0,0 +1,89 @@
+import io
+
+import polars as pl
+import pyarrow.parquet as pq
+import pytest
+
+moto = pytest.importorskip("moto")
+
+from s3_source import BlockCache, S3Source
+
+BUCKET = "dashboard-tests"
+KEY = "data/table.parquet"
+ROWS = 200_000
+ROW_GROUP_ROWS = 4_000
+BLOCK_SIZE = 64 * 1024
+
+
+@pytest.fixture
+def table():
+    return pl.DataFrame({
+        "id": range(ROWS),
+        "category": [f"c{i % 17}" for i in range(ROWS)],
+        "value": [float(i % 1000) for i in range(ROWS)],
+    })
+
+
+def put_parquet(client, df, key=KEY):
+    buf = io.BytesIO()
+    # Uncompressed, so row groups span many blocks and selective reads show up in the stats
+    pq.write_table(df.to_arrow(), buf, row_group_size=ROW_GROUP_ROWS, compression="none")
+    client.put_object(Bucket=BUCKET, Key=key, Body=buf.getvalue())
+    return len(buf.getvalue())
+
+
+@pytest.fixture
+def s3(monkeypatch):
+    for name in ("AWS_ACCESS_KEY_ID", "AWS_SECRET_ACCESS_KEY"):
+        monkeypatch.setenv(name, "testing")
+    monkeypatch.setenv("AWS_DEFAULT_REGION", "us-east-1")
+    with moto.mock_aws():
+        yield
+
+
+@pytest.fixture
+def source(s3, tmp_path):
+    return S3Source(cache=BlockCache(cache_dir=str(tmp_path / "blocks"), block_size=BLOCK_SIZE), max_workers=4)
+
+
+@pytest.fixture
+def client(source):
+    client = source.client()
+    client.create_bucket(Bucket=BUCKET)
+    return client
+
+
+def test_scan_matches_object(source, client, table):
+    put_parquet(client, table)
+    assert source.scan_parquet(client, BUCKET, KEY).collect().equals(table)
+    assert source.count_rows(client, BUCKET, KEY) == ROWS
+
+
+def test_filter_and_projection(source, client, table):
+    put_parquet(client, table)
+    query = lambda lf: lf.filter(pl.col("id").is_between(50_000, 50_999)).select("id", "value")
+    assert query(source.scan_parquet(client, BUCKET, KEY)).collect().equals(query(table.lazy()).collect())
+
+
+def test_row_groups_skipped_by_statistics_are_not_fetched(source, client, table):
+    size = put_parquet(client, table)
+    query = lambda lf: lf.filter(pl.col("id") < 100)
+    assert query(source.scan_parquet(client, BUCKET, KEY)).collect().equals(query(table.lazy()).collect())
+    assert source.stats["bytes_fetched"] < size / 4
+
+
+def test_rescan_is_served_from_block_cache(source, client, table):
+    put_parquet(client, table)
+    source.scan_parquet(client, BUCKET, KEY).collect()
+    requests = source.stats["requests"]
+    assert source.scan_parquet(client, BUCKET, KEY).collect().equals(table)
+    assert source.stats["requests"] == requests
+    assert source.stats["cache_hits"] > 0
+
+
+def test_changed_object_is_not_served_from_cache(source, client, table):
+    put_parquet(client, table)
+    source.scan_parquet(client, BUCKET, KEY).collect()
+    changed = table.with_columns(pl.col("value") + 1)
+    put_parquet(client, changed)
+    assert source.scan_parquet(client, BUCKET, KEY).collect().equals(changed)
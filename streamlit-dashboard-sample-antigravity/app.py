@@ -1,9 +1,18 @@
 import streamlit as st
 import polars as pl
-import pandas as pd
 from data_manager import DataManager
+import filters
+from edit_overlay import overlay_page
+from prefetch import PREFETCHER
+from paging import STRATEGY_LABELS
+from tracing import TRACER, DEFAULT_TRACE_DIR
+from shared_registry import SHARED_REGISTRY
+from source_cache import SOURCE_CACHE
+from jobs import JOBS
+import cube
 import math
 import os
+import uuid
 
 st.set_page_config(layout="wide", page_title="Polars Dashboard")
 
@@ -16,14 +25,70 @@ if 'sort_col' not in st.session_state:
     st.session_state.sort_col = "id"
 if 'sort_desc' not in st.session_state:
     st.session_state.sort_desc = False
-if 'pending_edits' not in st.session_state:
-    st.session_state.pending_edits = {} # {id: {col: val}}
+if 'page_direction' not in st.session_state:
+    st.session_state.page_direction = 1 # +1 paging forward, -1 paging back
+if 'last_editor_edits' not in st.session_state:
+    st.session_state.last_editor_edits = {} # editor edited_rows already written to the journal
 if 'current_page_ids' not in st.session_state:
     st.session_state.current_page_ids = []
 if 'source_config' not in st.session_state:
     st.session_state.source_config = {"type": "local", "path": "data/large_dataset.parquet"}
 if 'manager' not in st.session_state:
     st.session_state.manager = None
+if 'edit_session' not in st.session_state:
+    # Pending edits are private to a session; the token is kept in the URL so a reload finds them again
+    st.session_state.edit_session = st.query_params.get("session") or uuid.uuid4().hex[:12]
+    st.query_params["session"] = st.session_state.edit_session
+# Spans from this run are tagged with the session; profiling is a per-session switch
+TRACER.bind(st.session_state.edit_session, profile=st.session_state.get("profile_queries", False))
+if 'filters' not in st.session_state:
+    st.session_state.filters = [] # filters.Condition list, pushed down to the source
+if 'pending_load' not in st.session_state:
+    st.session_state.pending_load = None # {"job", "manager", "config"} while a source loads in the background
+if 'auto_load' not in st.session_state:
+    st.session_state.auto_load = True # load the default dataset on the first run
+if 'save_job' not in st.session_state:
+    st.session_state.save_job = None
+
+
+def start_load(source_type, source_config):
+    """Load a source as a background job; the current manager stays in use until it finishes."""
+    manager = DataManager(source_type, source_config, session=st.session_state.edit_session)
+    job = JOBS.submit(f"Load {source_type} source", manager.load, key=("load", manager.fingerprint()))
+    # Jobs live in JOBS; the session keeps only the id
+    st.session_state.pending_load = {"job": job.id, "manager": manager,
+                                     "config": {"type": source_type, **source_config}}
+
+
+def save_journal(job, manager, journal):
+    job.total_rows = len(journal)
+    with TRACER.span("save", rows=len(journal)):
+        out_path = manager.save_edits(journal)
+    job.progress(len(journal))
+    journal.clear()
+    return out_path, manager.last_save_stats or {}
+
+
+@st.fragment(run_every=1)
+def job_progress(job_id, cancellable=True):
+    """Progress of a running job and its first rows, refreshed every second; reruns the app once it ends."""
+    job = JOBS.get(job_id)
+    if job is None or not job.active:
+        st.rerun()
+    total = f" of {job.total_rows:,}" if job.total_rows else ""
+    st.progress(
+        min(job.rows / job.total_rows, 1.0) if job.total_rows else 0.0,
+        text=f"{job.name}: {job.rows:,}{total} rows, {job.bytes / 1024 ** 2:.1f} MB, {job.seconds:.1f}s",
+    )
+    if cancellable and st.button("Cancel", key=f"cancel_{job.id}", disabled=job.cancelled):
+        job.cancel()
+    if job.preview is not None:
+        st.caption(f"Preview: first {job.preview.height} rows")
+        st.dataframe(job.preview, use_container_width=True, hide_index=True)
+
+
+# Progress of a background load, above the dashboard
+load_area = st.container()
 
 # --- Sidebar Controls ---
 with st.sidebar:
@@ -36,48 +101,129 @@ with st.sidebar:
         default_path = "data/large_dataset.parquet"
         path = st.text_input("File Path (Parquet or CSV)", value=default_path)
         if st.button("Load Data"):
-            st.session_state.source_config = {"type": "local", "path": path}
-            st.session_state.manager = DataManager("local", {"path": path})
-            st.session_state.page = 1
-            st.session_state.pending_edits = {}
+            start_load("local", {"path": path})
             st.rerun()
             
     elif source_type == "Cloud":
         path = st.text_input("Cloud URI (s3://, gs://, etc.) - Parquet or CSV")
         if st.button("Load Data"):
-            st.session_state.source_config = {"type": "cloud", "path": path}
-            st.session_state.manager = DataManager("cloud", {"path": path})
-            st.session_state.page = 1
-            st.session_state.pending_edits = {}
+            start_load("cloud", {"path": path})
             st.rerun()
             
     elif source_type == "Database":
         conn_str = st.text_input("Connection String (e.g. postgresql://...)")
         query = st.text_area("SQL Query", value="SELECT * FROM my_table")
+        partition_num = st.number_input("Parallel Partitions", value=os.cpu_count() or 1, min_value=1, max_value=64,
+                                        help="Full reads (e.g. saving) are split into this many parallel queries")
+        partition_on = st.text_input("Partition Column", value="", help="Integer column to split on. Blank picks 'id' or the first integer column.")
         if st.button("Load Data"):
-            st.session_state.source_config = {"type": "database", "connection_string": conn_str, "query": query}
-            st.session_state.manager = DataManager("database", {"connection_string": conn_str, "query": query})
-            st.session_state.page = 1
-            st.session_state.pending_edits = {}
+            db_config = {"connection_string": conn_str, "query": query,
+                         "partition_num": int(partition_num), "partition_on": partition_on.strip()}
+            start_load("database", db_config)
             st.rerun()
 
     st.divider()
 
+    # --- Background Load ---
+    # A finished load swaps its manager in; until then the current one keeps serving pages
+    pending = st.session_state.pending_load
+    if pending is not None:
+        job = JOBS.get(pending["job"])
+        if job is None or not job.active:
+            st.session_state.pending_load = None
+            if job is not None and job.status == "done":
+                st.session_state.manager = pending["manager"]
+                st.session_state.source_config = pending["config"]
+                st.session_state.page = 1
+                st.session_state.filters = []
+            elif job is not None and job.status == "failed":
+                st.error(f"Load failed: {job.error}")
+            else:
+                st.info("Load cancelled.")
+
     # Initialize manager if not present (first run)
-    if st.session_state.manager is None:
+    if st.session_state.manager is None and st.session_state.pending_load is None:
         # Try to load default
-        if os.path.exists("data/large_dataset.parquet"):
-             st.session_state.manager = DataManager("local", {"path": "data/large_dataset.parquet"})
+        if st.session_state.auto_load and os.path.exists("data/large_dataset.parquet"):
+            st.session_state.auto_load = False
+            start_load("local", {"path": "data/large_dataset.parquet"})
         else:
             st.warning("Please configure a data source.")
             st.stop()
 
+    if st.session_state.pending_load is not None:
+        with load_area:
+            job_progress(st.session_state.pending_load["job"])
+        if st.session_state.manager is None:
+            st.stop()
+
     manager = st.session_state.manager
 
+    if st.button("Refresh Source", help="Drop the cached snapshot and re-read the source"):
+        manager.refresh()
+        st.rerun()
+
+    st.title("Filters")
+    try:
+        schema = manager.get_schema()
+    except Exception as e:
+        st.error(f"Could not read columns: {e}")
+        st.stop()
+
+    filter_col = st.selectbox("Column", schema.names(), key="filter_col")
+    filter_op = st.selectbox("Operator", list(filters.OPERATORS), format_func=filters.OPERATORS.get, key="filter_op")
+    if filter_op == "between":
+        f1, f2 = st.columns(2)
+        with f1:
+            low_text = st.text_input("From", help="Blank for no lower bound", key="filter_low")
+        with f2:
+            high_text = st.text_input("To", help="Blank for no upper bound", key="filter_high")
+    elif filter_op in ("eq", "ne", "in"):
+        value_text = st.text_input("Values (comma-separated)" if filter_op == "in" else "Value", key="filter_value")
+
+    if st.button("Add Filter"):
+        dtype = schema[filter_col]
+        try:
+            if filter_op == "between":
+                value = tuple(filters.parse_value(t, dtype) if t.strip() else None for t in (low_text, high_text))
+            elif filter_op == "in":
+                value = [filters.parse_value(t, dtype) for t in value_text.split(",") if t.strip()]
+            elif filter_op in ("eq", "ne"):
+                value = filters.parse_value(value_text, dtype)
+            else:
+                value = None
+        except Exception as e:
+            st.error(f"Invalid value for {filter_col} ({dtype}): {e}")
+        else:
+            condition = filters.Condition(filter_col, filter_op, value)
+            if condition not in st.session_state.filters:
+                st.session_state.filters = st.session_state.filters + [condition]
+                st.session_state.page = 1
+            st.rerun()
+
+    for i, condition in enumerate(st.session_state.filters):
+        f1, f2 = st.columns([4, 1])
+        with f1:
+            st.caption(condition.label())
+        with f2:
+            if st.button("✕", key=f"remove_filter_{i}"):
+                st.session_state.filters = st.session_state.filters[:i] + st.session_state.filters[i + 1:]
+                st.session_state.page = 1
+                st.rerun()
+    if st.session_state.filters and st.button("Clear Filters"):
+        st.session_state.filters = []
+        st.session_state.page = 1
+        st.rerun()
+
+    # Counts, sort indexes and pages below are all computed under these filters
+    manager.set_filters(st.session_state.filters)
+
+    st.divider()
+
     st.title("Controls")
     try:
         total_rows = manager.get_total_rows()
-        st.metric("Total Rows", total_rows)
+        st.metric("Matching Rows" if st.session_state.filters else "Total Rows", total_rows)
     except Exception as e:
         st.error(f"Error accessing data: {e}")
         st.stop()
@@ -99,48 +245,90 @@ with st.sidebar:
     with c1:
         if st.button("Prev") and st.session_state.page > 1:
             st.session_state.page -= 1
+            st.session_state.page_direction = -1
             st.rerun()
     with c2:
         if st.button("Next") and st.session_state.page < total_pages:
             st.session_state.page += 1
+            st.session_state.page_direction = 1
             st.rerun()
             
     new_page = st.number_input("Page", value=st.session_state.page, min_value=1, max_value=total_pages)
     if new_page != st.session_state.page:
+        st.session_state.page_direction = 1 if new_page > st.session_state.page else -1
         st.session_state.page = new_page
         st.rerun()
     
     st.divider()
     
     # Save Button
-    if st.button("Save Changes", type="primary"):
-        if st.session_state.pending_edits:
-            with st.spinner("Saving changes to disk..."):
-                out_path = manager.save_edits(st.session_state.pending_edits)
-                st.session_state.pending_edits = {}
-                st.success(f"Saved successfully to {out_path}!")
-                # We do NOT reload the data from the new file automatically to keep the source consistent,
-                # but we clear the edits.
+    # Unsaved edits live in the source's on-disk journal, so they survive session restarts
+    journal = manager.journal
+    save_job = JOBS.get(st.session_state.save_job) if st.session_state.save_job else None
+    # Editing is paused while a save runs, so the journal cleared afterwards is the one saved
+    saving = save_job is not None and save_job.active
+    if st.button("Save Changes", type="primary", disabled=saving):
+        if len(journal):
+            st.session_state.save_job = JOBS.submit(
+                "Save changes", save_journal, manager, journal,
+                key=("save", manager.fingerprint(), st.session_state.edit_session),
+            ).id
+            st.rerun()
         else:
             st.info("No changes to save.")
+    if saving:
+        job_progress(save_job.id, cancellable=False)
+    elif save_job is not None:
+        st.session_state.save_job = None
+        if save_job.status == "done":
+            out_path, stats = save_job.result
+            st.success(f"Saved successfully to {out_path}!")
+            if stats.get('bytes_copied'):
+                st.caption(f"Rewrote {stats['bytes_rewritten']:,} bytes, copied {stats['bytes_copied']:,} bytes unchanged")
+            # We do NOT reload the data from the new file automatically to keep the source consistent,
+            # but we clear the edits.
+        else:
+            st.error(f"Save failed: {save_job.error}")
             
-    if st.session_state.pending_edits:
-        st.warning(f"Unsaved edits: {len(st.session_state.pending_edits)} rows")
+    if len(journal):
+        st.warning(f"Unsaved edits: {len(journal)} rows")
+
+    cache_stats = PREFETCHER.stats()
+    st.caption(
+        f"Page cache: {cache_stats['hits']} hits / {cache_stats['misses']} misses "
+        f"({cache_stats['hit_rate']:.0%}), {cache_stats['inflight']} prefetching"
+    )
+    running = JOBS.active()
+    if running:
+        st.caption("Background jobs: " + ", ".join(f"{j.name} ({j.seconds:.0f}s)" for j in running))
+    shared = SHARED_REGISTRY.stats()
+    st.caption(
+        f"Shared sources: {shared['entries']} ({shared['leases']} sessions), "
+        f"{shared['bytes'] / 1024 ** 2:.0f} MB of {SHARED_REGISTRY.max_bytes / 1024 ** 2:.0f} MB, "
+        f"snapshots {SOURCE_CACHE.nbytes / 1024 ** 2:.0f} MB"
+    )
 
 # --- Process Edits from Previous Interaction ---
 if "editor" in st.session_state:
     edits = st.session_state["editor"].get("edited_rows", {})
     
     if edits and st.session_state.current_page_ids:
+        # The editor reports all edits since the page was rendered, so only
+        # cells that changed since the last rerun are appended to the journal
+        last = st.session_state.last_editor_edits
+        new_edits = {}
         # Map indices to IDs using the IDs from the PREVIOUS render
         for idx, changes in edits.items():
             # Safety check
             if idx < len(st.session_state.current_page_ids):
                 row_id = st.session_state.current_page_ids[idx]
-                
-                if row_id not in st.session_state.pending_edits:
-                    st.session_state.pending_edits[row_id] = {}
-                st.session_state.pending_edits[row_id].update(changes)
+                prev = last.get(idx, {})
+                diff = {c: v for c, v in changes.items() if c not in prev or prev[c] != v}
+                if diff:
+                    new_edits[row_id] = diff
+
+        manager.journal.append(new_edits)
+        st.session_state.last_editor_edits = {idx: dict(changes) for idx, changes in edits.items()}
 
 # --- Main Area ---
 st.title("High-Performance Data Dashboard")
@@ -167,49 +355,136 @@ if sort_col != st.session_state.sort_col or sort_desc != st.session_state.sort_d
     st.session_state.sort_desc = sort_desc
     st.rerun()
 
+# --- Column Profile ---
+with st.expander("Column profile"):
+    profile = manager.get_profile(compute=False)
+    if profile is None and st.button("Compute profile", help="One streaming pass over the source; cached until it changes"):
+        with st.spinner("Profiling columns..."):
+            profile = manager.get_profile()
+    if profile is not None:
+        st.dataframe(profile, use_container_width=True, hide_index=True)
+        st.caption("Distinct counts (HyperLogLog) and percentiles (KLL sketch) are approximate.")
+
+# --- Aggregates ---
+with st.expander("Aggregates"):
+    # A cube over the chosen dimensions; coarser totals roll up from it, pending edits are folded in
+    schema = manager.get_schema()
+    dimensions = cube.dimension_columns(schema)
+    measures = cube.measure_columns(schema)
+    a1, a2 = st.columns(2)
+    with a1:
+        cube_dims = st.multiselect("Dimensions", dimensions, default=[c for c in ("category", "department") if c in dimensions],
+                                   key="cube_dims")
+    with a2:
+        cube_measures = st.multiselect("Measures", measures, default=[c for c in ("value",) if c in measures],
+                                       key="cube_measures")
+    if cube_dims:
+        agg = manager.get_cube(cube_dims, cube_measures, compute=False)
+        if agg is None and st.button("Compute aggregates", help="One streaming pass over the source; cached until it changes"):
+            with st.spinner("Aggregating..."):
+                try:
+                    agg = manager.get_cube(cube_dims, cube_measures)
+                except ValueError as e:
+                    st.error(str(e))
+        if agg is not None:
+            agg = manager.with_pending_edits(agg)
+            totals_by = st.multiselect("Totals by", cube_dims, default=cube_dims[:1], key="cube_totals_by")
+            totals = agg.rollup(totals_by)
+            if len(totals_by) == 1:
+                metric = st.selectbox("Chart", [cube.ROWS] + [f"{m}_{s}" for m in cube_measures for s in ("sum", "mean")],
+                                      key="cube_metric")
+                st.bar_chart(totals, x=totals_by[0], y=metric)
+            st.dataframe(totals, use_container_width=True, hide_index=True)
+            notes = []
+            if len(manager.journal):
+                notes.append(f"Includes unsaved edits to {len(manager.journal)} rows.")
+            if totals[cube.STALE].any():
+                notes.append("Min/max marked stale may be wider than the data: an edit removed the group's extreme value.")
+            if st.session_state.filters:
+                notes.append("Computed under the active filters.")
+            if notes:
+                st.caption(" ".join(notes))
+
 # --- Fetch Data ---
 # Get raw data for current page
 try:
-    df_pl = manager.get_data(st.session_state.page, st.session_state.page_size, st.session_state.sort_col, st.session_state.sort_desc)
+    with TRACER.span("page", page=st.session_state.page) as span:
+        df_pl = span.set_frame(PREFETCHER.get_page(manager, st.session_state.page, st.session_state.page_size, st.session_state.sort_col, st.session_state.sort_desc))
 except Exception as e:
     st.error(f"Error fetching data: {e}")
     st.stop()
 
+strategy = manager.sort_strategy(st.session_state.page, st.session_state.page_size, st.session_state.sort_col, st.session_state.sort_desc)
+if strategy:
+    st.caption(f"Sorted with: {STRATEGY_LABELS[strategy]}")
+
 # --- Apply Pending Edits to View ---
 # We need to patch the dataframe so the user sees their unsaved changes
-if st.session_state.pending_edits:
-    # Convert to pandas for easier row-wise patching or use Polars
-    # Since we are displaying in st.data_editor which takes pandas/arrow, let's convert to pandas first
-    # It's only one page (e.g. 100 rows), so it's fast.
-    df_pd = df_pl.to_pandas()
-    
-    # Apply edits
-    # We iterate through the rows in the current page
-    for idx, row in df_pd.iterrows():
-        r_id = row['id']
-        if r_id in st.session_state.pending_edits:
-            changes = st.session_state.pending_edits[r_id]
-            for col, val in changes.items():
-                if col in df_pd.columns:
-                    df_pd.at[idx, col] = val
-                    
-    display_df = df_pd
-else:
-    display_df = df_pl.to_pandas()
+# One join + coalesce against the journal's edits for the ids on this page
+with TRACER.span("overlay") as span:
+    df_pl = span.set_frame(overlay_page(df_pl, manager.journal))
+
+# Handed to the editor as Arrow, no pandas round-trip
+with TRACER.span("to_arrow") as span:
+    display_df = span.set_frame(df_pl.to_arrow())
 
 # --- Update Current Page IDs for Next Run ---
 # Important: Store the IDs of the rows we are ABOUT to display
-if "id" in display_df.columns:
-    st.session_state.current_page_ids = display_df["id"].tolist()
+if "id" in df_pl.columns:
+    page_ids = df_pl["id"].to_list()
+    if page_ids != st.session_state.current_page_ids:
+        # A different page: editor edits no longer refer to these rows
+        st.session_state.last_editor_edits = {}
+    st.session_state.current_page_ids = page_ids
 else:
     st.error("Dataset must have an 'id' column for editing to work.")
     st.session_state.current_page_ids = []
 
 # --- Display Editor ---
-edited_df = st.data_editor(
-    display_df,
-    key="editor",
-    use_container_width=True,
-    height=600,
-    disabled=["id"] # Prevent editing ID
+with TRACER.span("render") as span:
+    span.set_frame(display_df)
+    edited_df = st.data_editor(
+        display_df,
+        key="editor",
+        use_container_width=True,
+        height=600,
+        disabled=True if saving else ["id"] # Prevent editing ID
+    )
+
+# --- Prefetch Neighbouring Pages ---
+# Loaded in the background so the next Prev/Next is served from the page cache
+PREFETCHER.schedule(
+    manager,
+    st.session_state.page,
+    st.session_state.page_size,
+    st.session_state.sort_col,
+    st.session_state.sort_desc,
+    total_pages=total_pages,
+    direction=st.session_state.page_direction,
 )
+
+# --- Timings ---
+# Last in the script so this run's spans (including the render) are shown
+with st.sidebar.expander("Timings"):
+    st.checkbox("Profile Polars queries", key="profile_queries",
+                help="Run this session's page queries with Polars profile() and keep the slowest plan nodes")
+    st.caption("This session's recent spans")
+    st.dataframe(TRACER.recent(20, session=st.session_state.edit_session), use_container_width=True, hide_index=True)
+    summary = TRACER.summary()
+    if summary.height:
+        st.caption("All sessions and background work since start (latencies over recent spans)")
+        st.dataframe(summary, use_container_width=True, hide_index=True)
+    profiled = TRACER.last_profile(session=st.session_state.edit_session)
+    if profiled:
+        st.caption(f"Slowest plan nodes ({profiled[0]})")
+        st.dataframe(profiled[1], use_container_width=True, hide_index=True)
+    t1, t2 = st.columns(2)
+    with t1:
+        if st.button("Append JSONL"):
+            path = os.path.join(DEFAULT_TRACE_DIR, "trace.jsonl")
+            st.caption(f"{TRACER.export_jsonl(path)} spans added to {path}")
+    with t2:
+        if st.button("Write Prometheus"):
+            path = os.path.join(DEFAULT_TRACE_DIR, "metrics.prom")
+            TRACER.export_prometheus(path)
+            st.caption(f"Wrote {path}")
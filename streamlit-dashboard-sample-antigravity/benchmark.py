@@ -0,0 +1,234 @@
+import argparse
+import importlib.util
+import json
+import os
+import platform
+import resource
+import shutil
+import sys
+import tempfile
+import time
+
+import numpy as np
+import polars as pl
+
+import row_count
+from data_manager import DataManager
+from generate_data import generate_data_streaming
+from source_cache import SOURCE_CACHE
+
+DEFAULT_SIZES = [100_000, 1_000_000]
+DEFAULT_OPENCODE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "data-dashboard-streamlit-opencode")
+
+
+def reset_peak_rss():
+    """
+    Restart the peak resident set size count, so the next peak_rss_mb() covers
+    only what ran since. Linux only; returns False where the peak can't be reset.
+    """
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+
+def peak_rss_mb():
+    """Peak resident set size in MB: since the last reset_peak_rss() on Linux, else of the whole process."""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KB, macOS bytes
+    return rss / 1024 ** 2 if sys.platform == "darwin" else rss / 1024
+
+
+def reset_caches():
+    """Drop in-process caches so the next call runs cold."""
+    SOURCE_CACHE.invalidate()
+    with row_count._lock:
+        row_count._cache.clear()
+
+
+def ensure_dataset(num_rows, data_dir):
+    """Generate (or reuse) the Parquet and CSV files for one size."""
+    parquet = os.path.join(data_dir, f"bench_{num_rows}.parquet")
+    csv = parquet.replace(".parquet", ".csv")
+    if not (os.path.exists(parquet) and os.path.exists(csv)):
+        # Streamed in batches, so even 1e8 rows never sit in memory at once
+        generate_data_streaming(num_rows, parquet)
+    return {"parquet": parquet, "csv": csv}
+
+
+def measure(op, make_manager, repeats, rows):
+    """
+    Run op(manager) once cold (caches cleared, fresh manager) and then
+    `repeats` times warm on the same manager.
+    rows is the number of rows the operation handles, used for throughput.
+    The memory peak covers just these runs where the OS can reset it
+    (peak_rss_scope "operation"); elsewhere it is the running peak of the
+    whole benchmark so far ("process").
+    """
+    reset_caches()
+    per_operation = reset_peak_rss()
+    manager = make_manager()
+    start = time.perf_counter()
+    op(manager)
+    cold = time.perf_counter() - start
+
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        op(manager)
+        times.append(time.perf_counter() - start)
+
+    p50, p95, p99 = np.percentile(times, [50, 95, 99])
+    return {
+        "cold_s": cold,
+        "p50_s": float(p50),
+        "p95_s": float(p95),
+        "p99_s": float(p99),
+        "rows_per_s": rows / p50 if p50 > 0 else None,
+        "peak_rss_mb": peak_rss_mb(),
+        "peak_rss_scope": "operation" if per_operation else "process",
+    }
+
+
+def bench_manager(path, total_rows, page_size, repeats, sort_col, edits):
+    results = {}
+
+    def make_manager():
+        # CSV conversion runs in the background and would skew timings
+        return DataManager("local", {"path": path}, columnar_cache=None)
+
+    results["get_total_rows"] = measure(lambda m: m.get_total_rows(), make_manager, repeats, total_rows)
+    results["get_columns"] = measure(lambda m: m.get_columns(), make_manager, repeats, total_rows)
+
+    last_page = max(1, -(-total_rows // page_size))
+    pages = {"first": 1, "middle": max(1, last_page // 2), "last": last_page}
+    for label, page in pages.items():
+        results[f"get_data_{label}"] = measure(
+            lambda m: m.get_data(page, page_size), make_manager, repeats, page_size
+        )
+        results[f"get_data_{label}_sorted"] = measure(
+            lambda m: m.get_data(page, page_size, sort_col, True), make_manager, repeats, page_size
+        )
+
+    out_dir = tempfile.mkdtemp(prefix="bench_save_")
+    try:
+        results["save_edits"] = measure(
+            lambda m: m.save_edits(edits, output_folder=out_dir), make_manager, max(1, repeats // 5), total_rows
+        )
+    finally:
+        shutil.rmtree(out_dir, ignore_errors=True)
+    return results
+
+
+def load_opencode(opencode_dir):
+    """Import the opencode dashboard's main.py, or None if its dependencies are missing."""
+    path = os.path.join(opencode_dir, "main.py")
+    if not os.path.exists(path):
+        return None
+    sys.path.insert(0, opencode_dir)
+    try:
+        spec = importlib.util.spec_from_file_location("opencode_main", path)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        return module
+    except ImportError as e:
+        print(f"Skipping opencode benchmarks: {e}")
+        return None
+    finally:
+        sys.path.remove(opencode_dir)
+
+
+def bench_opencode(module, path, file_type, total_rows, page_size, repeats, sort_col):
+    def load_and_page(_):
+        lf = module.load_data_from_local(path, file_type, use_columnar_cache=False)
+        lf.select(pl.len()).collect()
+        return lf.sort(sort_col).slice(0, page_size).collect()
+
+    return {"load_data_from_local": measure(load_and_page, lambda: None, repeats, total_rows)}
+
+
+def compare(current, baseline, threshold):
+    """Return a list of (name, baseline p50, current p50) that regressed beyond threshold."""
+    regressions = []
+    for name, stats in current["results"].items():
+        base = baseline.get("results", {}).get(name)
+        if not base:
+            continue
+        if stats["p50_s"] > base["p50_s"] * (1 + threshold):
+            regressions.append((name, base["p50_s"], stats["p50_s"]))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark DataManager and the dashboard data paths")
+    parser.add_argument("--sizes", type=float, nargs="+", default=DEFAULT_SIZES,
+                        help="Row counts to generate (e.g. 1e5 1e6 1e7 1e8)")
+    parser.add_argument("--formats", nargs="+", default=["parquet", "csv"])
+    parser.add_argument("--data-dir", default="data/bench")
+    parser.add_argument("--page-size", type=int, default=100)
+    parser.add_argument("--repeats", type=int, default=10)
+    parser.add_argument("--sort-col", default="value")
+    parser.add_argument("--output", default="benchmark_results.json")
+    parser.add_argument("--baseline", help="Previous results JSON to compare against")
+    parser.add_argument("--threshold", type=float, default=0.2,
+                        help="Allowed p50 slowdown vs baseline before failing (0.2 = 20%%)")
+    parser.add_argument("--opencode-dir", default=DEFAULT_OPENCODE_DIR)
+    args = parser.parse_args()
+
+    os.makedirs(args.data_dir, exist_ok=True)
+    opencode = load_opencode(args.opencode_dir)
+    report = {
+        "meta": {
+            "timestamp": time.time(),
+            "python": platform.python_version(),
+            "polars": pl.__version__,
+            "machine": platform.machine(),
+            "cpus": os.cpu_count(),
+            "page_size": args.page_size,
+            "repeats": args.repeats,
+        },
+        "results": {},
+    }
+
+    for size in args.sizes:
+        num_rows = int(size)
+        files = ensure_dataset(num_rows, args.data_dir)
+        edits = {i: {"value": -1.0} for i in np.linspace(0, num_rows - 1, 5, dtype=int).tolist()}
+        for fmt in args.formats:
+            path = files[fmt]
+            print(f"Benchmarking {path}...")
+            results = bench_manager(path, num_rows, args.page_size, args.repeats, args.sort_col, edits)
+            if opencode is not None:
+                results.update(bench_opencode(opencode, path, fmt, num_rows, args.page_size, args.repeats, args.sort_col))
+            for op, stats in results.items():
+                name = f"{fmt}/{num_rows}/{op}"
+                report["results"][name] = stats
+                print(f"  {op:<28} p50 {stats['p50_s'] * 1000:9.2f} ms  p99 {stats['p99_s'] * 1000:9.2f} ms  "
+                      f"cold {stats['cold_s'] * 1000:9.2f} ms")
+
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(report, baseline, args.threshold)
+        for name, before, after in regressions:
+            print(f"REGRESSION {name}: p50 {before * 1000:.2f} ms -> {after * 1000:.2f} ms")
+        if regressions:
+            sys.exit(1)
+        print("No regressions beyond threshold.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+import argparse
+import os
+import sqlite3
+import time
+
+import numpy as np
+
+from db_backend import DatabaseBackend
+
+
+def create_sqlite_db(path, num_rows):
+    """Create a SQLite table shaped like generate_data.py's dataset."""
+    if os.path.exists(path):
+        os.remove(path)
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    print(f"Creating {num_rows} rows in {path}...")
+
+    con = sqlite3.connect(path)
+    con.execute(
+        "CREATE TABLE large_dataset (id INTEGER PRIMARY KEY, category TEXT, value REAL, is_active INTEGER, department TEXT)"
+    )
+    chunk = 500_000
+    for start in range(0, num_rows, chunk):
+        n = min(chunk, num_rows - start)
+        rows = zip(
+            range(start, start + n),
+            np.random.choice(['A', 'B', 'C', 'D', 'E'], n).tolist(),
+            (np.random.rand(n) * 1000).tolist(),
+            np.random.randint(0, 2, n).tolist(),
+            np.random.choice(['Sales', 'Engineering', 'HR', 'Marketing', 'Support'], n).tolist(),
+        )
+        con.executemany("INSERT INTO large_dataset VALUES (?, ?, ?, ?, ?)", rows)
+    con.commit()
+    con.close()
+
+
+def time_read(backend, partition_num, repeats):
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        df = backend.read_all(partition_num=partition_num)
+        best = min(best, time.perf_counter() - start)
+    return best, df.height
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark single vs partitioned database reads")
+    parser.add_argument("--rows", type=int, default=2_000_000)
+    parser.add_argument("--db", default="data/benchmark.db")
+    parser.add_argument("--partitions", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--repeats", type=int, default=3)
+    args = parser.parse_args()
+
+    create_sqlite_db(args.db, args.rows)
+    backend = DatabaseBackend(f"sqlite://{os.path.abspath(args.db)}", "SELECT * FROM large_dataset")
+
+    baseline = None
+    print(f"{'partitions':>10} {'seconds':>10} {'rows/s':>14} {'speedup':>8}")
+    for n in args.partitions:
+        seconds, rows = time_read(backend, n, args.repeats)
+        baseline = baseline or seconds
+        print(f"{n:>10} {seconds:>10.3f} {rows / seconds:>14,.0f} {baseline / seconds:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
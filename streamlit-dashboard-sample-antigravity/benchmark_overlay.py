@@ -0,0 +1,71 @@
+import argparse
+import time
+
+import numpy as np
+import polars as pl
+
+from edit_overlay import overlay_page
+
+
+def make_page(page_size, offset):
+    return pl.DataFrame({
+        "id": np.arange(offset, offset + page_size),
+        "category": np.random.choice(['A', 'B', 'C', 'D', 'E'], page_size),
+        "value": np.random.rand(page_size) * 1000,
+        "is_active": np.random.choice([True, False], page_size),
+        "department": np.random.choice(['Sales', 'Engineering', 'HR', 'Marketing', 'Support'], page_size),
+    })
+
+
+def make_edits(num_edits, num_rows):
+    ids = np.random.choice(num_rows, num_edits, replace=False)
+    return {int(i): {"value": float(i) * -1.0, "category": "Z"} for i in ids}
+
+
+def pandas_overlay(page, edits):
+    """The previous app.py overlay: pandas conversion plus iterrows/at per row."""
+    df_pd = page.to_pandas()
+    for idx, row in df_pd.iterrows():
+        r_id = row['id']
+        if r_id in edits:
+            for col, val in edits[r_id].items():
+                if col in df_pd.columns:
+                    df_pd.at[idx, col] = val
+    return df_pd
+
+
+def polars_overlay(page, edits):
+    """The vectorized overlay, ending in the Arrow table handed to st.data_editor."""
+    return overlay_page(page, edits).to_arrow()
+
+
+def time_it(fn, repeats):
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return float(np.median(times))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the pending-edit overlay for one page")
+    parser.add_argument("--page-size", type=int, default=1000)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--edits", type=int, nargs="+", default=[0, 100, 10_000, 100_000])
+    parser.add_argument("--repeats", type=int, default=20)
+    args = parser.parse_args()
+
+    page = make_page(args.page_size, 0)
+    print(f"{'edits':>8} {'pandas ms':>10} {'polars ms':>10} {'speedup':>8}")
+    for num_edits in args.edits:
+        edits = make_edits(num_edits, args.rows)
+        # Make sure the page itself is fully edited too
+        edits.update({i: {"value": -1.0} for i in range(min(num_edits, args.page_size))})
+        old = time_it(lambda: pandas_overlay(page, edits), args.repeats)
+        new = time_it(lambda: polars_overlay(page, edits), args.repeats)
+        print(f"{num_edits:>8} {old * 1000:>10.2f} {new * 1000:>10.2f} {old / new:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
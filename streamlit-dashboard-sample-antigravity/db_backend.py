@@ -0,0 +1,193 @@
+import datetime
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import polars as pl
+
+# Sort orders and filters whose page bookmarks are kept, least recently used dropped first
+MAX_BOOKMARK_VIEWS = 64
+
+
+def quote_ident(name):
+    """Quote a column name for SQL (ANSI double quotes)."""
+    return '"' + str(name).replace('"', '""') + '"'
+
+
+def sql_literal(value):
+    """Render a Python value as a SQL literal for the keyset predicate."""
+    if value is None:
+        return "NULL"
+    if isinstance(value, bool):
+        return "TRUE" if value else "FALSE"
+    if isinstance(value, (int, float)):
+        return repr(value)
+    if isinstance(value, datetime.datetime):
+        return "'" + value.isoformat(sep=' ') + "'"
+    if isinstance(value, datetime.date):
+        return "'" + value.isoformat() + "'"
+    return "'" + str(value).replace("'", "''") + "'"
+
+
+class DatabaseBackend:
+    """
+    Runs paging, sorting and counting on the database server by wrapping the
+    user's query as a subquery. Deep pages use keyset (seek) pagination on
+    (sort column, id) starting from the closest page boundary seen so far.
+    """
+
+    def __init__(self, uri, query, key_col="id", ttl=None, max_bookmark_views=MAX_BOOKMARK_VIEWS):
+        """
+        ttl: seconds after which the cached schema, count and bookmarks are
+        discarded, since the table may have changed underneath us.
+        max_bookmark_views: (sort column, direction, filter) combinations
+        whose bookmarks are kept.
+        """
+        self.uri = uri
+        self.query = query.strip().rstrip(';')
+        self.key_col = key_col
+        self.ttl = ttl
+        self.max_bookmark_views = max_bookmark_views
+        self._schema = None
+        self._counts = {}  # {where: row count}
+        # {(sort_col, descending, where): {offset: (sort_value, key_value)}} - last row before `offset`
+        self._bookmarks = OrderedDict()
+        self._loaded_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _read(self, sql):
+        return pl.read_database_uri(sql, self.uri)
+
+    def _from(self):
+        return f"FROM ({self.query}) AS _q"
+
+    def reset(self):
+        """Forget schema, count and bookmarks (e.g. after the source changed)."""
+        with self._lock:
+            self._schema = None
+            self._counts = {}
+            self._bookmarks = OrderedDict()
+            self._loaded_at = time.monotonic()
+
+    def _expire(self):
+        if self.ttl is not None and time.monotonic() - self._loaded_at > self.ttl:
+            self.reset()
+
+    def schema(self):
+        self._expire()
+        if self._schema is None:
+            self._schema = self._read(f"SELECT * {self._from()} LIMIT 0").schema
+        return self._schema
+
+    def count(self, where=None):
+        """Row count of the query, optionally restricted by a SQL condition."""
+        self._expire()
+        if where not in self._counts:
+            clause = f" WHERE {where}" if where else ""
+            self._counts[where] = self._read(f"SELECT COUNT(*) AS n {self._from()}{clause}").item()
+        return self._counts[where]
+
+    def partition_column(self, preferred=None):
+        """
+        Integer column to split parallel reads on: `preferred` if given,
+        otherwise the key column, otherwise the first integer column.
+        """
+        schema = self.schema()
+        candidates = [preferred] if preferred else [self.key_col, *schema.names()]
+        for col in candidates:
+            if col in schema and schema[col].is_integer():
+                return col
+        return None
+
+    def read_all(self, partition_on=None, partition_num=None):
+        """
+        Read the full query result. With more than one partition, connectorx
+        splits the read into ranges of the partition column fetched in parallel.
+        """
+        num = partition_num or os.cpu_count() or 1
+        col = self.partition_column(partition_on) if num > 1 else None
+        # Nothing to split; SQLite also can't type the MIN/MAX of an empty result
+        if col is None or not self.count():
+            return self._read(self.query)
+
+        bounds = self._read(
+            f"SELECT MIN({quote_ident(col)}) AS lo, MAX({quote_ident(col)}) AS hi {self._from()}"
+        )
+        lo, hi = bounds.row(0)
+        if lo is None:
+            return self._read(self.query)
+        return pl.read_database_uri(
+            self.query, self.uri, partition_on=col, partition_num=num, partition_range=(lo, hi)
+        )
+
+    def _has_key(self):
+        return self.key_col in self.schema().names()
+
+    def _order_by(self, sort_col, descending):
+        direction = " DESC" if descending else ""
+        terms = []
+        if sort_col and sort_col != self.key_col:
+            # Nulls first in both directions (as Polars does), portable across dialects
+            terms.append(f"({quote_ident(sort_col)} IS NULL) DESC")
+            terms.append(quote_ident(sort_col) + direction)
+        if self._has_key():
+            terms.append(quote_ident(self.key_col) + direction)
+        elif sort_col == self.key_col:
+            terms.append(quote_ident(sort_col) + direction)
+        if not terms:
+            return ""
+        return "ORDER BY " + ", ".join(terms)
+
+    def _seek_predicate(self, sort_col, descending, bookmark):
+        sort_val, key_val = bookmark
+        op = "<" if descending else ">"
+        key = quote_ident(self.key_col)
+        if sort_col is None or sort_col == self.key_col:
+            return f"{key} {op} {sql_literal(key_val)}"
+        col = quote_ident(sort_col)
+        v = sql_literal(sort_val)
+        return f"({col} {op} {v} OR ({col} = {v} AND {key} {op} {sql_literal(key_val)}))"
+
+    def _nearest_bookmark(self, sort_col, descending, where, offset):
+        key = (sort_col, descending, where)
+        marks = self._bookmarks.get(key, {})
+        if marks:
+            self._bookmarks.move_to_end(key)
+        best = max((o for o in marks if o <= offset), default=None)
+        return (best, marks[best]) if best is not None else (None, None)
+
+    def page(self, offset, limit, sort_col=None, descending=False, where=None, bookmark=True):
+        """
+        Fetch rows [offset, offset + limit) of the query ordered by sort_col,
+        optionally restricted by a SQL condition (see filters.to_sql).
+        Pass bookmark=False for one-off reads (e.g. rows by id) that won't be
+        paged further, so they leave no bookmark behind.
+        """
+        conditions = [f"({where})"] if where else []
+        skip = offset
+        if self._has_key():
+            with self._lock:
+                start, nearest = self._nearest_bookmark(sort_col, descending, where, offset)
+            # Nulls sort first, so a NULL bookmark can't be seeked past: fall back to OFFSET
+            if nearest is not None and nearest[0] is not None:
+                conditions.append(self._seek_predicate(sort_col, descending, nearest))
+                skip = offset - start
+
+        clause = "WHERE " + " AND ".join(conditions) if conditions else ""
+        sql = f"SELECT * {self._from()} {clause} {self._order_by(sort_col, descending)} LIMIT {int(limit)}"
+        if skip:
+            sql += f" OFFSET {int(skip)}"
+        df = self._read(sql)
+
+        if bookmark and self._has_key() and df.height:
+            last = df.row(df.height - 1, named=True)
+            sort_val = last[sort_col] if sort_col else last[self.key_col]
+            key = (sort_col, descending, where)
+            with self._lock:
+                marks = self._bookmarks.setdefault(key, {})
+                marks[offset + df.height] = (sort_val, last[self.key_col])
+                self._bookmarks.move_to_end(key)
+                while len(self._bookmarks) > self.max_bookmark_views:
+                    self._bookmarks.popitem(last=False)
+        return df
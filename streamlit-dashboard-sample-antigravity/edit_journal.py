@@ -0,0 +1,205 @@
+import glob
+import hashlib
+import json
+import os
+import threading
+
+import polars as pl
+
+# Compact in the background once this many segments have accumulated
+COMPACT_EVERY = 64
+
+JOURNAL_SCHEMA = {"seq": pl.UInt64, "id": pl.Int64, "column": pl.String, "value": pl.String}
+
+
+def journal_dir_for(source_key, root="data/journal"):
+    """Directory holding the journal for one source."""
+    digest = hashlib.sha1(repr(source_key).encode()).hexdigest()[:16]
+    return os.path.join(root, digest)
+
+
+class EditJournal:
+    """
+    Append-only log of cell edits stored as Arrow IPC segments on disk.
+    Each record is (seq, id, column, value) with the value JSON-encoded, so
+    edits survive session restarts and can be read back as a lazy frame.
+    Later sequence numbers win. Segments are merged by a background compaction.
+    The latest value per cell is also kept in memory, updated on every append,
+    so reads don't regroup the segments. version changes with every append
+    or clear.
+    """
+
+    def __init__(self, directory, compact_every=COMPACT_EVERY):
+        self.directory = directory
+        self.compact_every = compact_every
+        self._lock = threading.Lock()
+        self._compacting = False
+        self._generation = 0  # bumped by clear() so an in-flight compaction is discarded
+        self._edited_rows = None
+        self._latest = None  # DataFrame of id, column, value, seq; built on first read
+        self.version = 0
+        os.makedirs(directory, exist_ok=True)
+        self._seq = self._last_seq()
+
+    # --- Files ---
+
+    def _segments(self):
+        return sorted(glob.glob(os.path.join(self.directory, "*.arrow")))
+
+    def _last_seq(self):
+        segments = self._segments()
+        if not segments:
+            return 0
+        return pl.concat([pl.read_ipc(path) for path in segments]).select(pl.col("seq").max()).item() or 0
+
+    def _segment_path(self, prefix, seq):
+        # Named after a sequence number, so names never collide
+        return os.path.join(self.directory, f"{prefix}_{seq:020d}.arrow")
+
+    # --- Writing ---
+
+    def append(self, edits_dict):
+        """Record {row_id: {col_name: new_value}} as one new segment."""
+        records = {"seq": [], "id": [], "column": [], "value": []}
+        with self._lock:
+            for row_id, changes in edits_dict.items():
+                for col, val in changes.items():
+                    self._seq += 1
+                    records["seq"].append(self._seq)
+                    records["id"].append(int(row_id))
+                    records["column"].append(col)
+                    records["value"].append(json.dumps(val, default=str))
+            if not records["seq"]:
+                return
+            segment = pl.DataFrame(records, schema=JOURNAL_SCHEMA)
+            segment.write_ipc(self._segment_path("seg", records["seq"][0]))
+            if self._latest is not None:
+                # The segment's sequence numbers are the highest yet, so its values win
+                self._latest = pl.concat([self._latest, segment.select(self._latest.columns)]).unique(
+                    ["id", "column"], keep="last", maintain_order=True
+                )
+            self._edited_rows = None
+            self.version += 1
+            n_segments = len(self._segments())
+
+        if n_segments >= self.compact_every:
+            self.compact_async()
+
+    def clear(self):
+        """Drop every recorded edit (e.g. after they have been saved)."""
+        with self._lock:
+            for path in self._segments():
+                os.remove(path)
+            self._generation += 1
+            self._edited_rows = 0
+            self._latest = None
+            self.version += 1
+
+    # --- Reading ---
+
+    def scan(self):
+        """All journal records as a LazyFrame (empty if there are none)."""
+        # Segments are memory-mapped under the lock so a concurrent compaction
+        # can't delete a file between listing it and reading it.
+        with self._lock:
+            segments = [pl.read_ipc(path, memory_map=True) for path in self._segments()]
+        if not segments:
+            return pl.LazyFrame(schema=JOURNAL_SCHEMA)
+        return pl.concat(segments).lazy()
+
+    def latest(self):
+        """Latest value per (id, column)."""
+        with self._lock:
+            if self._latest is None:
+                segments = [pl.read_ipc(path, memory_map=True) for path in self._segments()]
+                records = pl.concat(segments) if segments else pl.DataFrame(schema=JOURNAL_SCHEMA)
+                self._latest = records.group_by("id", "column").agg(
+                    pl.col("value").sort_by("seq").last(),
+                    pl.col("seq").max(),
+                )
+            return self._latest.lazy()
+
+    def __len__(self):
+        return self.edited_rows()
+
+    def edited_rows(self):
+        """Number of distinct rows with pending edits."""
+        if self._edited_rows is None:
+            self._edited_rows = self.latest().select(pl.col("id").n_unique()).collect().item()
+        return self._edited_rows
+
+    def updates(self, schema, ids=None):
+        """
+        Wide LazyFrame of pending edits: an 'id' column plus one column per
+        edited field, decoded to the dtypes in `schema`. Fields that were not
+        edited for a row are null. Pass ids to restrict it to some rows.
+        """
+        latest = self.latest()
+        if ids is not None:
+            latest = latest.filter(pl.col("id").is_in(ids))
+
+        columns = latest.select(pl.col("column").unique()).collect()["column"].to_list()
+        result = latest.select("id").unique()
+        for col in columns:
+            if col not in schema or col == "id":
+                continue
+            dtype = schema[col]
+            value = pl.col("value").str.json_decode(pl.String if dtype.is_temporal() else dtype)
+            if dtype.is_temporal():
+                value = value.cast(dtype)
+            result = result.join(
+                latest.filter(pl.col("column") == col).select("id", value.alias(col)),
+                on="id",
+                how="left",
+            )
+        return result.with_columns(pl.col("id").cast(schema["id"]))
+
+    # --- Compaction ---
+
+    def compact(self):
+        """Rewrite all segments as one, keeping only the latest value per cell."""
+        with self._lock:
+            segments = self._segments()
+            if len(segments) <= 1:
+                return
+            generation = self._generation
+            records = pl.concat([pl.read_ipc(path) for path in segments])
+
+        # Appends can continue while we merge: they only ever add new segments
+        compacted = (
+            records.group_by("id", "column")
+            .agg(pl.col("value").sort_by("seq").last(), pl.col("seq").max())
+            .select(list(JOURNAL_SCHEMA))
+            .sort("seq")
+        )
+        path = self._segment_path("base", compacted["seq"].max())
+        tmp = path + ".tmp"
+        compacted.write_ipc(tmp)
+
+        with self._lock:
+            if generation != self._generation:
+                os.remove(tmp)
+                return
+            # Publish the merged segment before removing its inputs; readers
+            # only ever see duplicates, which the latest-by-seq rule resolves.
+            os.replace(tmp, path)
+            for old in segments:
+                if old != path:
+                    os.remove(old)
+
+    def compact_async(self):
+        """Run compact() on a background thread unless one is already running."""
+        with self._lock:
+            if self._compacting:
+                return
+            self._compacting = True
+
+        def run():
+            try:
+                self.compact()
+            except Exception as e:
+                print(f"Journal compaction failed: {e}")
+            finally:
+                self._compacting = False
+
+        threading.Thread(target=run, daemon=True).start()
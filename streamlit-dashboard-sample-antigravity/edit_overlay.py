@@ -0,0 +1,80 @@
+import polars as pl
+
+from edit_journal import EditJournal
+
+
+def build_updates(edits_dict, schema):
+    """
+    Turn {row_id: {col: value}} into a DataFrame with an 'id' column and one
+    column per edited field, cast to the source dtypes. Returns None if empty.
+    Fields that were not edited for a row are null.
+    """
+    columns = []
+    for changes in edits_dict.values():
+        for col in changes:
+            if col in schema and col != 'id' and col not in columns:
+                columns.append(col)
+
+    ids = []
+    values = {col: [] for col in columns}
+    for row_id, changes in edits_dict.items():
+        try:
+            ids.append(int(row_id))
+        except:
+            ids.append(row_id)
+        for col in columns:
+            values[col].append(changes.get(col))
+
+    if not ids:
+        return None
+
+    data = [pl.Series('id', ids).cast(schema['id'])]
+    for col in columns:
+        data.append(pl.Series(col, values[col], strict=False).cast(schema[col]))
+    return pl.DataFrame(data)
+
+
+def apply_updates(frame, updates):
+    """
+    Overlay updates on a DataFrame or LazyFrame with a left join on 'id'.
+    updates may itself be lazy (e.g. EditJournal.updates()).
+    """
+    if isinstance(frame, pl.LazyFrame):
+        updates = updates.lazy()
+        columns = frame.collect_schema().names()
+    else:
+        if isinstance(updates, pl.LazyFrame):
+            updates = updates.collect()
+        columns = frame.columns
+    update_cols = [c for c in updates.collect_schema().names() if c != 'id']
+
+    joined = frame.join(updates, on='id', how='left', suffix='_update', maintain_order='left')
+
+    exprs = []
+    for col in columns:
+        if col in update_cols:
+            exprs.append(
+                pl.coalesce([pl.col(f"{col}_update"), pl.col(col)]).alias(col)
+            )
+        else:
+            exprs.append(pl.col(col))
+    return joined.select(exprs)
+
+
+def overlay_page(page, edits):
+    """
+    Show pending edits on one page: a single join + coalesce against the
+    edits for the ids on this page. edits is an EditJournal or a
+    {row_id: {col: value}} dict.
+    """
+    if not edits or 'id' not in page.columns:
+        return page
+
+    if isinstance(edits, EditJournal):
+        updates = edits.updates(page.schema, ids=page['id'])
+    else:
+        page_ids = set(page['id'].to_list())
+        updates = build_updates({k: v for k, v in edits.items() if k in page_ids}, page.schema)
+        if updates is None:
+            return page
+    return apply_updates(page, updates)
@@ -0,0 +1,129 @@
+from functools import reduce
+
+import polars as pl
+
+from db_backend import quote_ident, sql_literal
+
+# Operators offered by the filter builder: {op: label}
+OPERATORS = {
+    "eq": "=",
+    "ne": "!=",
+    "between": "between",
+    "in": "in",
+    "is_null": "is null",
+    "not_null": "is not null",
+}
+
+
+class Condition:
+    """
+    One filter condition. value is a scalar for eq/ne, a (low, high) pair for
+    between (either end may be None), a list for in, and unused for null checks.
+    """
+
+    def __init__(self, column, op, value=None):
+        if op not in OPERATORS:
+            raise ValueError(f"Unknown filter operator: {op}")
+        self.column = column
+        self.op = op
+        self.value = tuple(value) if isinstance(value, (list, tuple)) else value
+
+    def key(self):
+        return (self.column, self.op, self.value)
+
+    def __eq__(self, other):
+        return isinstance(other, Condition) and self.key() == other.key()
+
+    def __hash__(self):
+        return hash(self.key())
+
+    def __repr__(self):
+        return f"Condition({self.column!r}, {self.op!r}, {self.value!r})"
+
+    def label(self):
+        if self.op in ("is_null", "not_null"):
+            return f"{self.column} {OPERATORS[self.op]}"
+        if self.op == "between":
+            low, high = self.value
+            return f"{'' if low is None else low} <= {self.column} <= {'' if high is None else high}"
+        if self.op == "in":
+            return f"{self.column} in ({', '.join(map(str, self.value))})"
+        return f"{self.column} {OPERATORS[self.op]} {self.value}"
+
+    def to_expr(self):
+        col = pl.col(self.column)
+        if self.op == "eq":
+            return col == self.value
+        if self.op == "ne":
+            return col != self.value
+        if self.op == "between":
+            low, high = self.value
+            parts = []
+            if low is not None:
+                parts.append(col >= low)
+            if high is not None:
+                parts.append(col <= high)
+            return reduce(lambda a, b: a & b, parts) if parts else pl.lit(True)
+        if self.op == "in":
+            return col.is_in(list(self.value))
+        if self.op == "is_null":
+            return col.is_null()
+        return col.is_not_null()
+
+    def to_sql(self):
+        col = quote_ident(self.column)
+        if self.op == "eq":
+            return f"{col} = {sql_literal(self.value)}"
+        if self.op == "ne":
+            return f"{col} <> {sql_literal(self.value)}"
+        if self.op == "between":
+            low, high = self.value
+            parts = []
+            if low is not None:
+                parts.append(f"{col} >= {sql_literal(low)}")
+            if high is not None:
+                parts.append(f"{col} <= {sql_literal(high)}")
+            return " AND ".join(parts) if parts else "1 = 1"
+        if self.op == "in":
+            if not self.value:
+                return "1 = 0"
+            return f"{col} IN ({', '.join(sql_literal(v) for v in self.value)})"
+        if self.op == "is_null":
+            return f"{col} IS NULL"
+        return f"{col} IS NOT NULL"
+
+
+def filter_key(conditions):
+    """Hashable, order-independent identity of a set of conditions (None when empty)."""
+    if not conditions:
+        return None
+    return tuple(sorted((c.key() for c in conditions), key=repr))
+
+
+def to_expr(conditions):
+    """All conditions ANDed into one Polars expression, or None."""
+    if not conditions:
+        return None
+    return reduce(lambda a, b: a & b, (c.to_expr() for c in conditions))
+
+
+def to_sql(conditions):
+    """All conditions ANDed into a SQL boolean expression (no WHERE keyword), or None."""
+    if not conditions:
+        return None
+    return " AND ".join(f"({c.to_sql()})" for c in conditions)
+
+
+def parse_value(text, dtype):
+    """Convert text typed in the filter builder to a value of the column's dtype."""
+    text = text.strip()
+    if dtype == pl.Boolean:
+        lowered = text.lower()
+        if lowered in ("true", "1", "yes"):
+            return True
+        if lowered in ("false", "0", "no"):
+            return False
+        raise ValueError(f"Not a boolean: {text!r}")
+    if dtype == pl.String or dtype == pl.Categorical:
+        return text
+    return pl.Series([text]).cast(dtype, strict=True)[0]
@@ -1,8 +1,15 @@
 import polars as pl
 import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
 from faker import Faker
+from concurrent.futures import ThreadPoolExecutor
+import argparse
 import os
 
+CATEGORIES = ['A', 'B', 'C', 'D', 'E']
+DEPARTMENTS = ['Sales', 'Engineering', 'HR', 'Marketing', 'Support']
+
 def generate_data(num_rows=1_000_000, output_file="data/large_dataset.parquet"):
     print(f"Generating {num_rows} rows of data...")
     fake = Faker()
@@ -44,5 +51,137 @@ def generate_data(num_rows=1_000_000, output_file="data/large_dataset.parquet"):
     
     print("Done!")
 
+def generate_batch(start, num_rows, seed=None):
+    """One batch of rows with ids start..start+num_rows-1, same columns as generate_data."""
+    rng = np.random.default_rng(seed)
+    return pl.DataFrame({
+        "id": np.arange(start, start + num_rows),
+        "category": pl.Series(CATEGORIES).gather(rng.integers(0, len(CATEGORIES), num_rows)),
+        "value": rng.random(num_rows) * 1000,
+        "is_active": rng.integers(0, 2, num_rows).astype(bool),
+        "department": pl.Series(DEPARTMENTS).gather(rng.integers(0, len(DEPARTMENTS), num_rows)),
+    })
+
+class _RowGroupWriter:
+    """Parquet writer that buffers batches so every row group has exactly row_group_size rows."""
+
+    def __init__(self, path, schema, row_group_size, compression, write_statistics):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.row_group_size = row_group_size
+        self._writer = pq.ParquetWriter(path, schema, compression=compression, write_statistics=write_statistics)
+        self._buffer = []
+        self._buffered = 0
+
+    def write(self, table):
+        self._buffer.append(table)
+        self._buffered += table.num_rows
+        if self._buffered >= self.row_group_size:
+            self._flush(final=False)
+
+    def _flush(self, final):
+        table = pa.concat_tables(self._buffer)
+        full = table.num_rows if final else table.num_rows - table.num_rows % self.row_group_size
+        if full:
+            self._writer.write_table(table.slice(0, full), row_group_size=self.row_group_size)
+        rest = table.slice(full)
+        self._buffer = [rest] if rest.num_rows else []
+        self._buffered = rest.num_rows
+
+    def close(self):
+        if self._buffered:
+            self._flush(final=True)
+        self._writer.close()
+
+
+def generate_data_streaming(num_rows, output_file="data/large_dataset.parquet", batch_size=1_000_000,
+                            row_group_size=1_000_000, compression="zstd", write_statistics=True,
+                            write_csv=True, csv_workers=None, partition_by=None, seed=42):
+    """
+    Generate num_rows rows in batches of batch_size, so memory stays bounded
+    by a batch plus one row group. Each batch gets its own seed, so the output
+    doesn't depend on batch timing.
+
+    partition_by: write a hive-partitioned dataset (e.g. 'category') to a
+    directory named after output_file instead of a single file.
+    CSV batches are serialized on csv_workers threads and appended in order.
+    """
+    print(f"Streaming {num_rows} rows of data in batches of {batch_size}...")
+    os.makedirs(os.path.dirname(output_file) or ".", exist_ok=True)
+    num_batches = -(-num_rows // batch_size)
+    batches = (
+        generate_batch(start, min(batch_size, num_rows - start), seed=[seed, i])
+        for i, start in enumerate(range(0, num_rows, batch_size))
+    )
+
+    csv_file = output_file.replace(".parquet", ".csv") if write_csv else None
+    dataset_dir = output_file.replace(".parquet", "") if partition_by else None
+    writers = {}
+    csv_pool = ThreadPoolExecutor(max_workers=csv_workers or os.cpu_count()) if csv_file else None
+    csv_pending = []
+    csv_out = open(csv_file, "wb") if csv_file else None
+
+    def drain_csv(limit):
+        # Write finished CSV chunks in order, keeping at most `limit` in flight
+        while len(csv_pending) > limit:
+            csv_out.write(csv_pending.pop(0).result())
+
+    try:
+        for i, df in enumerate(batches):
+            if partition_by:
+                for (key,), part in df.partition_by(partition_by, as_dict=True).items():
+                    path = os.path.join(dataset_dir, f"{partition_by}={key}", "part-0.parquet")
+                    table = part.drop(partition_by).to_arrow()
+                    if key not in writers:
+                        writers[key] = _RowGroupWriter(path, table.schema, row_group_size, compression, write_statistics)
+                    writers[key].write(table)
+            else:
+                table = df.to_arrow()
+                if None not in writers:
+                    writers[None] = _RowGroupWriter(output_file, table.schema, row_group_size, compression, write_statistics)
+                writers[None].write(table)
+
+            if csv_out:
+                csv_pending.append(csv_pool.submit(lambda d, header: d.write_csv(include_header=header).encode(), df, i == 0))
+                drain_csv(os.cpu_count() or 1)
+            print(f"  batch {i + 1}/{num_batches}")
+
+        if csv_out:
+            drain_csv(0)
+    finally:
+        for writer in writers.values():
+            writer.close()
+        if csv_out:
+            csv_out.close()
+            csv_pool.shutdown()
+
+    print(f"Saved to {dataset_dir or output_file}" + (f" and {csv_file}" if csv_file else ""))
+    print("Done!")
+
+
 if __name__ == "__main__":
-    generate_data()
+    parser = argparse.ArgumentParser(description="Generate the large_dataset test files")
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--output", default="data/large_dataset.parquet")
+    parser.add_argument("--streaming", action="store_true", help="Generate in bounded-memory batches")
+    parser.add_argument("--batch-size", type=int, default=1_000_000)
+    parser.add_argument("--row-group-size", type=int, default=1_000_000)
+    parser.add_argument("--compression", default="zstd")
+    parser.add_argument("--no-statistics", action="store_true", help="Don't write column statistics")
+    parser.add_argument("--no-csv", action="store_true", help="Skip the CSV copy")
+    parser.add_argument("--csv-workers", type=int, default=None)
+    parser.add_argument("--partition-by", help="Write a hive-partitioned dataset, e.g. --partition-by category")
+    args = parser.parse_args()
+
+    if args.streaming or args.partition_by:
+        generate_data_streaming(
+            args.rows, args.output,
+            batch_size=args.batch_size,
+            row_group_size=args.row_group_size,
+            compression=args.compression,
+            write_statistics=not args.no_statistics,
+            write_csv=not args.no_csv,
+            csv_workers=args.csv_workers,
+            partition_by=args.partition_by,
+        )
+    else:
+        generate_data(args.rows, args.output)
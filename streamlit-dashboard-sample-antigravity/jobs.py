@@ -0,0 +1,168 @@
+import itertools
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+# Finished jobs kept so their results can still be picked up
+DEFAULT_MAX_JOBS = 64
+# Rows kept from the first batch for the partial preview
+PREVIEW_ROWS = 100
+# How often a background Polars query is polled for completion or cancellation
+POLL_SECONDS = 0.1
+
+_ids = itertools.count(1)
+
+
+class JobCancelled(Exception):
+    pass
+
+
+class Job:
+    """
+    One background task. The task reports progress (rows and bytes so far)
+    and a preview of its first batch, and calls check() between steps so a
+    cancel() takes effect at the next batch boundary.
+    """
+
+    def __init__(self, name, key=None):
+        self.id = f"job-{next(_ids)}"
+        self.name = name
+        self.key = key
+        self.status = "queued"  # queued, running, done, failed, cancelled
+        self.rows = 0
+        self.bytes = 0
+        self.total_rows = None
+        self.preview = None
+        self.result = None
+        self.error = None
+        self.submitted = time.time()
+        self.started = None
+        self.finished = None
+        self._cancel = threading.Event()
+        self._done = threading.Event()
+
+    @property
+    def active(self):
+        return self.status in ("queued", "running")
+
+    @property
+    def seconds(self):
+        if self.started is None:
+            return 0.0
+        return (self.finished or time.time()) - self.started
+
+    def progress(self, rows=0, nbytes=0):
+        self.rows += rows
+        self.bytes += nbytes
+
+    def set_preview(self, df, rows=PREVIEW_ROWS):
+        if self.preview is None:
+            self.preview = df.head(rows)
+
+    def cancel(self):
+        self._cancel.set()
+
+    @property
+    def cancelled(self):
+        return self._cancel.is_set()
+
+    def check(self):
+        """Raise JobCancelled if cancel() was called."""
+        if self._cancel.is_set():
+            raise JobCancelled(self.name)
+
+    def wait(self, timeout=None):
+        return self._done.wait(timeout)
+
+    def run_query(self, lf, progress_path=None):
+        """
+        Run a lazy query (a collect, or a sink built with lazy=True) in the
+        background, polling so it can be cancelled mid-query. With
+        progress_path, the size of that file is reported as bytes written.
+        """
+        query = lf.collect(background=True)
+        while True:
+            result = query.fetch()
+            if result is not None:
+                return result
+            if self._cancel.is_set():
+                query.cancel()
+                raise JobCancelled(self.name)
+            if progress_path:
+                try:
+                    self.bytes = os.path.getsize(progress_path)
+                except OSError:
+                    pass
+            time.sleep(POLL_SECONDS)
+
+    def _run(self, fn, args, kwargs):
+        if self._cancel.is_set():
+            self.status = "cancelled"
+            self._done.set()
+            return
+        self.status = "running"
+        self.started = time.time()
+        try:
+            self.result = fn(self, *args, **kwargs)
+            self.status = "done"
+        except JobCancelled:
+            self.status = "cancelled"
+        except Exception as e:
+            print(f"Job {self.name} failed: {e}")
+            self.error = str(e)
+            self.status = "failed"
+        finally:
+            self.finished = time.time()
+            self._done.set()
+
+
+class JobExecutor:
+    """
+    Thread pool for loads, counts, conversions and saves, so the script
+    thread never blocks on them. Jobs live here rather than in session
+    state: a session keeps only the job id and picks the job up again on
+    every rerun. Submitting with a key that matches a job still running
+    returns that job instead of starting another.
+    """
+
+    def __init__(self, max_workers=4, max_jobs=DEFAULT_MAX_JOBS):
+        self.max_jobs = max_jobs
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="job")
+        self._jobs = OrderedDict()  # {id: Job}
+        self._lock = threading.Lock()
+
+    def submit(self, name, fn, *args, key=None, **kwargs):
+        """Run fn(job, *args, **kwargs) in the background and return the Job."""
+        with self._lock:
+            if key is not None:
+                for job in self._jobs.values():
+                    if job.key == key and job.active:
+                        return job
+            job = Job(name, key)
+            self._jobs[job.id] = job
+            self._trim()
+        self._pool.submit(job._run, fn, args, kwargs)
+        return job
+
+    def _trim(self):
+        finished = [j for j in self._jobs.values() if not j.active]
+        for job in finished[:max(0, len(self._jobs) - self.max_jobs)]:
+            del self._jobs[job.id]
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def active(self):
+        with self._lock:
+            return [j for j in self._jobs.values() if j.active]
+
+    def jobs(self):
+        with self._lock:
+            return list(self._jobs.values())
+
+
+# Process-wide job executor
+JOBS = JobExecutor()
@@ -0,0 +1,311 @@
+import glob
+import hashlib
+import os
+import shutil
+import threading
+import time
+
+import polars as pl
+import pyarrow as pa
+
+from tracing import TRACER
+
+TOP_K = "top_k"
+IN_MEMORY = "in_memory"
+EXTERNAL = "external"
+STRATEGY_LABELS = {
+    TOP_K: "top-k (partial sort)",
+    IN_MEMORY: "in-memory sort",
+    EXTERNAL: "external merge sort (spilled to disk)",
+}
+
+# Pages ending within this many rows of the start are served by a partial (top-k) sort
+TOP_K_MAX_ROWS = 50_000
+# Largest in-memory sort allowed; bigger sorts spill sorted runs to disk
+DEFAULT_MEMORY_BUDGET = 1024 ** 3
+DEFAULT_SPILL_DIR = "data/.sort_spill"
+# Total size of externally sorted files kept on disk
+DEFAULT_MAX_BYTES = 20 * 1024 ** 3
+# Rows per record batch in run and output files; the merge holds one block per run
+BLOCK_ROWS = 65_536
+SAMPLE_ROWS = 10_000
+# Row position column used to break ties between equal sort keys
+ROW = "__sort_row"
+
+
+def estimate_row_bytes(lf, columns=None, sample_rows=SAMPLE_ROWS):
+    """Average in-memory bytes per row, from the first sample_rows rows."""
+    if columns is not None:
+        lf = lf.select(columns)
+    sample = lf.head(sample_rows).collect()
+    return sample.estimated_size() / sample.height if sample.height else 0.0
+
+
+def choose_strategy(offset, page_size, sort_bytes, memory_budget=DEFAULT_MEMORY_BUDGET):
+    """
+    Pick how to produce rows offset..offset+page_size of a sorted view.
+    sort_bytes is the estimated memory an in-memory sort would need.
+    """
+    if offset + page_size <= TOP_K_MAX_ROWS:
+        return TOP_K
+    if sort_bytes <= memory_budget:
+        return IN_MEMORY
+    return EXTERNAL
+
+
+def sort_keys(column, descending):
+    """
+    Keys for lf.with_row_index(ROW), all sorted in the given direction, that
+    order the sorted view the same way as every strategy: nulls first, then
+    the values, with ties in row order. Descending views are the ascending
+    non-null rows reversed, so their ties come in reverse row order.
+    """
+    col, row = pl.col(column), pl.col(ROW).cast(pl.Int64)
+    if descending:
+        return [col.is_null(), col, pl.when(col.is_null()).then(-row).otherwise(row)]
+    return [col.is_not_null(), col, row]
+
+
+def sort_view(lf, column, descending):
+    """lf fully sorted in the sorted view's order."""
+    return lf.with_row_index(ROW).sort(sort_keys(column, descending), descending=descending).drop(ROW)
+
+
+def top_k_page(lf, column, descending, offset, page_size):
+    """
+    One page of the sorted view from a partial sort of the first
+    offset + page_size rows.
+    """
+    k = offset + page_size
+    keys = sort_keys(column, descending)
+    lf = lf.with_row_index(ROW)
+    head = lf.top_k(k, by=keys) if descending else lf.bottom_k(k, by=keys)
+    # top_k does not order its output
+    return TRACER.collect(head.sort(keys, descending=descending).slice(offset, page_size).drop(ROW))
+
+
+def _write_blocks(writer, df):
+    for batch in df.to_arrow().to_batches(max_chunksize=BLOCK_ROWS):
+        writer.write_batch(batch)
+
+
+def _through(buf, column, bound):
+    """Number of leading rows of buf (sorted by column, ROW) whose key is <= bound."""
+    value, row = bound
+    col = pl.col(column)
+    return buf.select(((col < value) | ((col == value) & (pl.col(ROW) <= row))).sum()).item()
+
+
+def _merge_runs(run_paths, column, writer):
+    """
+    k-way merge of run files sorted by (column, ROW), a block at a time:
+    everything up to the smallest last key among the blocks in hand is safe
+    to emit, and emitting it always empties at least one block. Row
+    positions are unique, so keys never tie across runs.
+    """
+    readers = [pa.ipc.open_file(pa.memory_map(p)) for p in run_paths]
+    next_block = [0] * len(readers)
+    buffers = [None] * len(readers)
+    while True:
+        for i, reader in enumerate(readers):
+            if (buffers[i] is None or buffers[i].height == 0) and next_block[i] < reader.num_record_batches:
+                buffers[i] = pl.from_arrow(reader.get_batch(next_block[i]))
+                next_block[i] += 1
+        live = [i for i, b in enumerate(buffers) if b is not None and b.height]
+        if not live:
+            break
+        # Runs with blocks still on disk bound what can be emitted
+        pending = [buffers[i].select(column, ROW).row(-1) for i in live
+                   if next_block[i] < readers[i].num_record_batches]
+        bound = min(pending) if pending else None
+
+        taken = []
+        for i in live:
+            buf = buffers[i]
+            n = buf.height if bound is None else _through(buf, column, bound)
+            if n:
+                taken.append(buf.slice(0, n))
+                buffers[i] = buf.slice(n)
+        _write_blocks(writer, pl.concat(taken).sort(column, ROW))
+
+
+class ExternalSort:
+    """
+    A source sorted ascending by one column (nulls first, ties in row order)
+    into an Arrow IPC file. Built by sorting memory-sized runs, spilling them,
+    and merging the runs block by block. Pages are slices of the
+    memory-mapped file; the descending view reads the non-null part backwards.
+    """
+
+    def __init__(self, path, column):
+        self.path = path
+        self.column = column
+        self._table = pa.ipc.open_file(pa.memory_map(path)).read_all()
+        meta = {k.decode(): v.decode() for k, v in (self._table.schema.metadata or {}).items()}
+        self.null_count = int(meta.get("null_count", 0))
+        self.runs = int(meta.get("runs", 0))
+        self.seconds = 0.0  # build time, when built by this process
+
+    @property
+    def height(self):
+        return self._table.num_rows
+
+    @classmethod
+    def build(cls, lf, column, path, memory_budget=DEFAULT_MEMORY_BUDGET):
+        start = time.perf_counter()
+        row_bytes = estimate_row_bytes(lf) or 1
+        # Half the budget per run leaves room for sorting it
+        run_rows = max(BLOCK_ROWS, int(memory_budget / 2 / row_bytes))
+        run_dir = f"{path}.{threading.get_ident()}.runs"
+        os.makedirs(run_dir, exist_ok=True)
+        col = pl.col(column)
+        # Row positions break ties, and are dropped again when pages are read
+        lf = lf.with_row_index(ROW)
+
+        try:
+            run_paths, pending, pending_rows = [], [], 0
+            null_path = os.path.join(run_dir, "nulls.arrow")
+            null_writer = None
+            null_count = 0
+
+            def flush():
+                run = pl.concat(pending or [pl.DataFrame(schema=lf.collect_schema())]).sort(column, ROW)
+                run_path = os.path.join(run_dir, f"run-{len(run_paths)}.arrow")
+                with pa.ipc.new_file(run_path, run.to_arrow().schema) as writer:
+                    _write_blocks(writer, run)
+                run_paths.append(run_path)
+
+            for batch in lf.collect_batches(chunk_size=BLOCK_ROWS):
+                nulls = batch.filter(col.is_null())
+                if nulls.height:
+                    if null_writer is None:
+                        null_writer = pa.ipc.new_file(null_path, nulls.to_arrow().schema)
+                    _write_blocks(null_writer, nulls)
+                    null_count += nulls.height
+                pending.append(batch.filter(col.is_not_null()))
+                pending_rows += pending[-1].height
+                if pending_rows >= run_rows:
+                    flush()
+                    pending, pending_rows = [], 0
+            if pending_rows or not run_paths:
+                flush()
+            if null_writer is not None:
+                null_writer.close()
+
+            tmp = os.path.join(run_dir, "sorted.arrow")
+            schema = pa.ipc.open_file(run_paths[0]).schema
+            schema = schema.with_metadata({
+                "column": column,
+                "null_count": str(null_count),
+                "runs": str(len(run_paths)),
+            })
+            with pa.ipc.new_file(tmp, schema) as writer:
+                if null_writer is not None:
+                    nulls = pa.ipc.open_file(pa.memory_map(null_path))
+                    for i in range(nulls.num_record_batches):
+                        writer.write_batch(nulls.get_batch(i))
+                if len(run_paths) == 1:
+                    run = pa.ipc.open_file(pa.memory_map(run_paths[0]))
+                    for i in range(run.num_record_batches):
+                        writer.write_batch(run.get_batch(i))
+                else:
+                    _merge_runs(run_paths, column, writer)
+            os.replace(tmp, path)
+        finally:
+            shutil.rmtree(run_dir, ignore_errors=True)
+        sort = cls(path, column)
+        sort.seconds = time.perf_counter() - start
+        return sort
+
+    def page(self, offset, page_size, descending=False):
+        return self._page(offset, page_size, descending).drop(ROW)
+
+    def _page(self, offset, page_size, descending):
+        if not descending:
+            return pl.from_arrow(self._table.slice(offset, page_size))
+        end = min(offset + page_size, self.height)
+        parts = []
+        if offset < self.null_count:
+            parts.append(pl.from_arrow(self._table.slice(offset, min(end, self.null_count) - offset)))
+        # Descending position i >= null_count is ascending position height - 1 - (i - null_count)
+        first = max(offset, self.null_count)
+        if end > first:
+            lo = self.height - (end - self.null_count)
+            parts.append(pl.from_arrow(self._table.slice(lo, end - first)).reverse())
+        if not parts:
+            return pl.from_arrow(self._table.slice(0, 0))
+        return pl.concat(parts) if len(parts) > 1 else parts[0]
+
+
+class ExternalSortCache:
+    """
+    Externally sorted files shared by every session, keyed by (source
+    fingerprint, column, ...) and kept on disk under a size budget. Files
+    outlive the process, so a restart reuses them while the key still matches.
+    """
+
+    def __init__(self, spill_dir=DEFAULT_SPILL_DIR, max_bytes=DEFAULT_MAX_BYTES,
+                 memory_budget=DEFAULT_MEMORY_BUDGET):
+        self.spill_dir = spill_dir
+        self.max_bytes = max_bytes
+        self.memory_budget = memory_budget
+        self._sorts = {}  # {key: ExternalSort}
+        self._building = {}  # {key: Lock held while that key is built}
+        self._lock = threading.Lock()
+
+    def _path(self, key):
+        return os.path.join(self.spill_dir, hashlib.sha1(repr(key).encode()).hexdigest() + ".arrow")
+
+    def get(self, key):
+        """An already built sort for key, else None."""
+        with self._lock:
+            sort = self._sorts.get(key)
+            return sort if sort is not None and os.path.exists(sort.path) else None
+
+    def get_or_build(self, key, lf, column):
+        path = self._path(key)
+        # Builds of one key are serialized, so two sessions paging the same sort
+        # share one build; other keys and get() are not blocked meanwhile
+        with self._lock:
+            build_lock = self._building.setdefault(key, threading.Lock())
+        with build_lock:
+            with self._lock:
+                sort = self._sorts.get(key)
+                if sort is not None and os.path.exists(path):
+                    os.utime(path)
+                    return sort
+            try:
+                os.makedirs(self.spill_dir, exist_ok=True)
+                if os.path.exists(path):
+                    sort = ExternalSort(path, column)
+                    os.utime(path)
+                else:
+                    with TRACER.span("external_sort_build", column=column) as span:
+                        sort = ExternalSort.build(lf, column, path, self.memory_budget)
+                        span.rows = sort.height
+                    print(f"External sort on {column}: {sort.height} rows, {sort.runs} runs, {sort.seconds:.1f}s")
+                with self._lock:
+                    self._sorts[key] = sort
+                    self._evict(keep=path)
+            finally:
+                with self._lock:
+                    self._building.pop(key, None)
+            return sort
+
+    def _evict(self, keep=None):
+        files = sorted(glob.glob(os.path.join(self.spill_dir, "*.arrow")), key=os.path.getmtime)
+        total = sum(os.path.getsize(f) for f in files)
+        for f in files:
+            if total <= self.max_bytes:
+                break
+            if f == keep:
+                continue
+            total -= os.path.getsize(f)
+            os.remove(f)
+        for key, sort in list(self._sorts.items()):
+            if not os.path.exists(sort.path):
+                del self._sorts[key]
+
+
+# Process-wide externally sorted files
+EXTERNAL_SORTS = ExternalSortCache()
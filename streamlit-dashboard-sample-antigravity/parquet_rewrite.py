@@ -0,0 +1,315 @@
+import io
+import struct
+
+import polars as pl
+import pyarrow.parquet as pq
+
+MAGIC = b"PAR1"
+# Copy buffer for untouched column chunks
+COPY_BYTES = 8 * 1024 ** 2
+
+# Thrift compact protocol type ids, as used by the Parquet footer
+_TRUE, _FALSE, _BYTE, _I16, _I32, _I64, _DOUBLE, _BINARY, _LIST, _SET, _MAP, _STRUCT = range(1, 13)
+
+# Field ids of the footer structs that are patched when column chunks move
+_FILE_SCHEMA, _FILE_NUM_ROWS, _FILE_ROW_GROUPS = 2, 3, 4
+# Schema element fields that decide how pages are encoded: physical type,
+# fixed length, repetition, name and number of children
+_SE_LAYOUT = (1, 2, 3, 4, 5)
+_RG_COLUMNS, _RG_NUM_ROWS, _RG_FILE_OFFSET, _RG_TOTAL_COMPRESSED, _RG_ORDINAL = 1, 3, 5, 6, 7
+_CC_FILE_OFFSET, _CC_META = 2, 3
+# Page indexes live outside the column chunk and are not carried over
+_CC_PAGE_INDEX = (4, 5, 6, 7)
+_CM_COMPRESSED_SIZE = 7
+_CM_PAGE_OFFSETS = (9, 10, 11)  # data, index and dictionary page offsets
+# Bloom filters likewise sit outside the chunk
+_CM_BLOOM_FILTER = (14, 15)
+
+
+# --- Thrift compact protocol ---
+# Structs are read into {field id: (type, value)} dicts and written back
+# field for field, so fields this module doesn't know about survive a copy.
+
+class _Reader:
+    def __init__(self, buf):
+        self.buf = buf
+        self.pos = 0
+
+    def byte(self):
+        b = self.buf[self.pos]
+        self.pos += 1
+        return b
+
+    def varint(self):
+        shift = result = 0
+        while True:
+            b = self.byte()
+            result |= (b & 0x7F) << shift
+            if not b & 0x80:
+                return result
+            shift += 7
+
+    def zigzag(self):
+        n = self.varint()
+        return (n >> 1) ^ -(n & 1)
+
+    def value(self, kind):
+        if kind in (_TRUE, _FALSE):
+            # Only inside lists; fields carry booleans in their type
+            return self.byte()
+        if kind == _BYTE:
+            return self.byte()
+        if kind in (_I16, _I32, _I64):
+            return self.zigzag()
+        if kind == _DOUBLE:
+            self.pos += 8
+            return self.buf[self.pos - 8:self.pos]
+        if kind == _BINARY:
+            n = self.varint()
+            self.pos += n
+            return self.buf[self.pos - n:self.pos]
+        if kind in (_LIST, _SET):
+            header = self.byte()
+            size, elem = header >> 4, header & 0x0F
+            if size == 15:
+                size = self.varint()
+            return elem, [self.value(elem) for _ in range(size)]
+        if kind == _MAP:
+            size = self.varint()
+            types = self.byte() if size else 0
+            key, val = types >> 4, types & 0x0F
+            return key, val, [(self.value(key), self.value(val)) for _ in range(size)]
+        if kind == _STRUCT:
+            return self.struct()
+        raise ValueError(f"Unknown thrift type {kind}")
+
+    def struct(self):
+        fields = {}
+        last = 0
+        while True:
+            header = self.byte()
+            if header == 0:
+                return fields
+            delta, kind = header >> 4, header & 0x0F
+            fid = last + delta if delta else self.zigzag()
+            fields[fid] = (kind, kind == _TRUE) if kind in (_TRUE, _FALSE) else (kind, self.value(kind))
+            last = fid
+
+
+def _varint(out, n):
+    while n > 0x7F:
+        out.append(n & 0x7F | 0x80)
+        n >>= 7
+    out.append(n)
+
+
+def _zigzag(out, n):
+    _varint(out, (n << 1) ^ (n >> 63))
+
+
+def _write_value(out, kind, value):
+    if kind in (_TRUE, _FALSE, _BYTE):
+        out.append(value)
+    elif kind in (_I16, _I32, _I64):
+        _zigzag(out, value)
+    elif kind == _DOUBLE:
+        out += value
+    elif kind == _BINARY:
+        _varint(out, len(value))
+        out += value
+    elif kind in (_LIST, _SET):
+        elem, items = value
+        if len(items) < 15:
+            out.append(len(items) << 4 | elem)
+        else:
+            out.append(0xF0 | elem)
+            _varint(out, len(items))
+        for item in items:
+            _write_value(out, elem, item)
+    elif kind == _MAP:
+        key, val, items = value
+        _varint(out, len(items))
+        if items:
+            out.append(key << 4 | val)
+        for k, v in items:
+            _write_value(out, key, k)
+            _write_value(out, val, v)
+    elif kind == _STRUCT:
+        _write_struct(out, value)
+    else:
+        raise ValueError(f"Unknown thrift type {kind}")
+
+
+def _write_struct(out, fields):
+    last = 0
+    for fid, (kind, value) in fields.items():
+        if kind in (_TRUE, _FALSE):
+            kind = _TRUE if value else _FALSE
+        if 0 < fid - last <= 15:
+            out.append((fid - last) << 4 | kind)
+        else:
+            out.append(kind)
+            _zigzag(out, fid)
+        if kind not in (_TRUE, _FALSE):
+            _write_value(out, kind, value)
+        last = fid
+    out.append(0)
+
+
+# --- Footer access ---
+
+def _read_footer(f):
+    """The file's FileMetaData struct, from the footer at the end of f."""
+    f.seek(-8, io.SEEK_END)
+    length, magic = struct.unpack("<I4s", f.read(8))
+    if magic != MAGIC:
+        raise ValueError("Not a plain Parquet file (encrypted footers are not supported)")
+    f.seek(-8 - length, io.SEEK_END)
+    return _Reader(f.read(length)).struct()
+
+
+def _chunk_range(chunk):
+    """(start, length) of a column chunk's pages in its file."""
+    meta = chunk[_CC_META][1]
+    offsets = [meta[fid][1] for fid in _CM_PAGE_OFFSETS if fid in meta and meta[fid][1] > 0]
+    return min(offsets), meta[_CM_COMPRESSED_SIZE][1]
+
+
+def _copy_row_group(src, dst, row_group, ordinal):
+    """
+    Append a row group's column chunks from src to dst byte for byte and
+    return its metadata with the page offsets moved to their new positions.
+    """
+    row_group = dict(row_group)
+    chunks = []
+    for chunk in row_group[_RG_COLUMNS][1][1]:
+        start, length = _chunk_range(chunk)
+        shift = dst.tell() - start
+        src.seek(start)
+        remaining = length
+        while remaining:
+            block = src.read(min(remaining, COPY_BYTES))
+            if not block:
+                raise ValueError("Column chunk runs past the end of the file")
+            dst.write(block)
+            remaining -= len(block)
+
+        chunk = {fid: v for fid, v in chunk.items() if fid not in _CC_PAGE_INDEX}
+        meta = {fid: v for fid, v in chunk[_CC_META][1].items() if fid not in _CM_BLOOM_FILTER}
+        for fid in _CM_PAGE_OFFSETS:
+            if fid in meta and meta[fid][1] > 0:
+                meta[fid] = (meta[fid][0], meta[fid][1] + shift)
+        chunk[_CC_META] = (_STRUCT, meta)
+        chunk[_CC_FILE_OFFSET] = (_I64, start + shift)
+        chunks.append(chunk)
+
+    row_group[_RG_COLUMNS] = (_LIST, (_STRUCT, chunks))
+    row_group[_RG_FILE_OFFSET] = (_I64, _chunk_range(chunks[0])[0])
+    row_group[_RG_ORDINAL] = (_I16, ordinal)
+    return row_group
+
+
+def _layout(schema):
+    """
+    The parts of a footer schema that decide how pages are encoded. Logical
+    type annotations are left out: writers differ on them, and the copied
+    footer keeps the source's anyway. The root's name and repetition vary too.
+    """
+    elements = schema[1][1]
+    layout = [(elements[0].get(5),)]
+    for element in elements[1:]:
+        layout.append(tuple(element.get(fid) for fid in _SE_LAYOUT))
+    return layout
+
+
+def _encode_row_group(table, schema, compression):
+    """A one-row-group Parquet file (as a BytesIO) holding table, and its footer."""
+    buf = io.BytesIO()
+    with pq.ParquetWriter(buf, schema, compression=compression) as writer:
+        writer.write_table(table, row_group_size=max(len(table), 1))
+    return buf, _read_footer(buf)
+
+
+# --- Rewriting ---
+
+def _id_range_may_match(row_group, id_index, ids):
+    """Use the row group's min/max statistics on `id` to rule it out cheaply."""
+    stats = row_group.column(id_index).statistics
+    if stats is None or not stats.has_min_max:
+        return True
+    return bool(ids.is_between(stats.min, stats.max).any())
+
+
+def _compressed_size(row_group):
+    return sum(row_group.column(i).total_compressed_size for i in range(row_group.num_columns))
+
+
+def _column_compression(meta):
+    """{column path: codec} as pyarrow's writer spells it, from the first row group."""
+    if not meta.num_row_groups:
+        return "snappy"
+    row_group = meta.row_group(0)
+    codecs = {}
+    for i in range(row_group.num_columns):
+        column = row_group.column(i)
+        codec = column.compression.lower()
+        codecs[column.path_in_schema] = "none" if codec == "uncompressed" else codec
+    return codecs
+
+
+def rewrite_row_groups(src_path, dst_path, ids, apply_updates):
+    """
+    Copy a Parquet file one row group at a time, passing only the row groups
+    that contain one of `ids` through `apply_updates(DataFrame) -> DataFrame`.
+    Other row groups are copied byte for byte: their column chunks are
+    appended unchanged and the footer is rewritten with the new offsets.
+    Row group boundaries and each column's compression are kept, and at most
+    one row group is in memory at a time. Page indexes and bloom filters of
+    the source are not carried over.
+
+    Raises ValueError if an updated row group does not encode to the source's
+    Parquet schema, or the file can't be copied this way (e.g. encrypted).
+
+    Returns {'row_groups_rewritten', 'row_groups_copied', 'bytes_rewritten', 'bytes_copied'},
+    where bytes are compressed sizes in the source file.
+    """
+    pf = pq.ParquetFile(src_path)
+    meta = pf.metadata
+    id_index = pf.schema_arrow.get_field_index('id')
+    compression = _column_compression(meta)
+
+    stats = {'row_groups_rewritten': 0, 'row_groups_copied': 0, 'bytes_rewritten': 0, 'bytes_copied': 0}
+    with open(src_path, "rb") as src, open(dst_path, "wb") as dst:
+        footer = _read_footer(src)
+        source_groups = footer[_FILE_ROW_GROUPS][1][1]
+        dst.write(MAGIC)
+        row_groups = []
+        for i, source_group in enumerate(source_groups):
+            row_group = meta.row_group(i)
+            size = _compressed_size(row_group)
+
+            if _id_range_may_match(row_group, id_index, ids):
+                df = pl.from_arrow(pf.read_row_group(i))
+                if df['id'].is_in(ids.implode()).any():
+                    table = apply_updates(df).to_arrow().cast(pf.schema_arrow)
+                    encoded, encoded_footer = _encode_row_group(table, pf.schema_arrow, compression)
+                    if _layout(encoded_footer[_FILE_SCHEMA]) != _layout(footer[_FILE_SCHEMA]):
+                        raise ValueError("Updated row group does not match the source's Parquet schema")
+                    new_group = encoded_footer[_FILE_ROW_GROUPS][1][1][0]
+                    row_groups.append(_copy_row_group(encoded, dst, new_group, i))
+                    stats['row_groups_rewritten'] += 1
+                    stats['bytes_rewritten'] += size
+                    continue
+
+            row_groups.append(_copy_row_group(src, dst, source_group, i))
+            stats['row_groups_copied'] += 1
+            stats['bytes_copied'] += size
+
+        footer[_FILE_ROW_GROUPS] = (_LIST, (_STRUCT, row_groups))
+        footer[_FILE_NUM_ROWS] = (_I64, sum(rg[_RG_NUM_ROWS][1] for rg in row_groups))
+        out = bytearray()
+        _write_struct(out, footer)
+        dst.write(out)
+        dst.write(struct.pack("<I", len(out)))
+        dst.write(MAGIC)
+    return stats
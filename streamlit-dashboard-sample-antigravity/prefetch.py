@@ -0,0 +1,131 @@
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from tracing import TRACER
+
+# Pages kept in the shared page cache
+DEFAULT_MAX_PAGES = 64
+# Extra pages fetched ahead in the direction the user is paging
+DEFAULT_LOOKAHEAD = 3
+
+
+class PageCache:
+    """Bounded LRU of fetched pages with hit/miss counters."""
+
+    def __init__(self, max_pages=DEFAULT_MAX_PAGES):
+        self.max_pages = max_pages
+        self.hits = 0
+        self.misses = 0
+        self._pages = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._pages
+
+    def get(self, key):
+        with self._lock:
+            df = self._pages.get(key)
+            if df is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._pages.move_to_end(key)
+            return df
+
+    def put(self, key, df):
+        with self._lock:
+            self._pages[key] = df
+            self._pages.move_to_end(key)
+            while len(self._pages) > self.max_pages:
+                self._pages.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._pages.clear()
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0,
+                "pages": len(self._pages),
+            }
+
+
+class Prefetcher:
+    """
+    Serves pages from a PageCache and, after each render, loads the neighbouring
+    pages (and a few more in the direction of travel) on a thread pool.
+    Pages are keyed by (source fingerprint, filter, sort_col, sort_desc, page_size, page).
+    """
+
+    def __init__(self, cache=None, max_workers=2, lookahead=DEFAULT_LOOKAHEAD):
+        self.cache = cache if cache is not None else PageCache()
+        self.lookahead = lookahead
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="prefetch")
+        self._inflight = {}  # {key: Future}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(manager, page, page_size, sort_col, sort_desc):
+        return (manager.fingerprint(), manager.filter_key(), sort_col, sort_desc, page_size, page)
+
+    def get_page(self, manager, page, page_size, sort_col=None, sort_desc=False):
+        """Return a page, from the cache, a pending prefetch, or a direct fetch."""
+        key = self._key(manager, page, page_size, sort_col, sort_desc)
+        df = self.cache.get(key)
+        if df is not None:
+            return df
+
+        with self._lock:
+            future = self._inflight.get(key)
+        if future is not None:
+            # Already being prefetched: waiting is cheaper than fetching again
+            try:
+                return future.result()
+            except Exception:
+                pass
+
+        df = manager.get_data(page, page_size, sort_col, sort_desc)
+        self.cache.put(key, df)
+        return df
+
+    def _fetch(self, key, manager, page, page_size, sort_col, sort_desc):
+        try:
+            with TRACER.span("prefetch", page=page):
+                df = manager.get_data(page, page_size, sort_col, sort_desc)
+            # The filters may have changed while this was queued
+            if manager.filter_key() == key[1]:
+                self.cache.put(key, df)
+            return df
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+
+    def schedule(self, manager, page, page_size, sort_col=None, sort_desc=False, total_pages=None, direction=1):
+        """Queue background loads of the pages around `page`."""
+        ahead = [page + direction * i for i in range(2, self.lookahead + 2)]
+        for target in [page + direction, page - direction, *ahead]:
+            if target < 1 or (total_pages is not None and target > total_pages):
+                continue
+            key = self._key(manager, target, page_size, sort_col, sort_desc)
+            with self._lock:
+                if key in self._inflight or key in self.cache:
+                    continue
+                self._inflight[key] = self._pool.submit(
+                    self._fetch, key, manager, target, page_size, sort_col, sort_desc
+                )
+
+    def stats(self):
+        stats = self.cache.stats()
+        with self._lock:
+            stats["inflight"] = len(self._inflight)
+        return stats
+
+
+# Process-wide prefetcher shared by all sessions
+PREFETCHER = Prefetcher()
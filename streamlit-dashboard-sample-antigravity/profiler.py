@@ -0,0 +1,247 @@
+import math
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import polars as pl
+import pyarrow.parquet as pq
+
+# 2**14 registers: about 0.8% standard error on distinct counts
+HLL_PRECISION = 14
+# Items kept per sketch level; rank error is roughly 1/k per level in use
+KLL_K = 256
+DEFAULT_CHUNK_SIZE = 250_000
+QUANTILES = [0.01, 0.25, 0.5, 0.75, 0.99]
+# Profiles kept in the shared profile cache
+DEFAULT_MAX_PROFILES = 32
+
+
+def _mix64(h):
+    """splitmix64 finalizer, so every bit of the hash is usable by the HyperLogLog."""
+    h = h ^ (h >> np.uint64(30))
+    h = h * np.uint64(0xBF58476D1CE4E5B9)
+    h = h ^ (h >> np.uint64(27))
+    h = h * np.uint64(0x94D049BB133111EB)
+    return h ^ (h >> np.uint64(31))
+
+
+def _bit_length(x):
+    """Bit length of each uint64, exact (frexp on 32-bit halves)."""
+    hi = np.frexp((x >> np.uint64(32)).astype(np.float64))[1]
+    lo = np.frexp((x & np.uint64(0xFFFFFFFF)).astype(np.float64))[1]
+    return np.where(hi > 0, hi + 32, lo)
+
+
+class HyperLogLog:
+    """Approximate distinct count over 64-bit hashes."""
+
+    def __init__(self, precision=HLL_PRECISION):
+        self.precision = precision
+        self.registers = np.zeros(1 << precision, dtype=np.uint8)
+
+    def add(self, series):
+        if series.len() == 0:
+            return
+        hashes = _mix64(series.hash(seed=0).to_numpy())
+        p = np.uint64(self.precision)
+        index = (hashes >> (np.uint64(64) - p)).astype(np.int64)
+        # A sentinel bit caps the rank at 64 - p + 1
+        rest = (hashes << p) | (np.uint64(1) << (p - np.uint64(1)))
+        rank = (65 - _bit_length(rest)).astype(np.uint8)
+        np.maximum.at(self.registers, index, rank)
+
+    def estimate(self):
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / np.sum(np.exp2(-self.registers.astype(np.float64)))
+        zeros = int(np.count_nonzero(self.registers == 0))
+        if estimate <= 2.5 * m and zeros:
+            # Small cardinalities: linear counting is more accurate
+            estimate = m * math.log(m / zeros)
+        return int(round(estimate))
+
+
+class QuantileSketch:
+    """
+    KLL-style quantile sketch. Level h holds items that each stand for 2**h
+    values; a level that outgrows k is sorted and every other item (from a
+    random offset) is promoted to the next level.
+    """
+
+    def __init__(self, k=KLL_K, seed=0):
+        self.k = k
+        self.levels = [np.empty(0)]
+        self.count = 0
+        self._rng = np.random.default_rng(seed)
+
+    def add(self, values):
+        if len(values) == 0:
+            return
+        self.count += len(values)
+        self.levels[0] = np.concatenate([self.levels[0], values])
+        h = 0
+        while h < len(self.levels):
+            level = self.levels[h]
+            if len(level) > self.k:
+                level = np.sort(level)
+                keep = level[:len(level) % 2]
+                level = level[len(keep):]
+                if h + 1 == len(self.levels):
+                    self.levels.append(np.empty(0))
+                self.levels[h + 1] = np.concatenate([self.levels[h + 1], level[self._rng.integers(2)::2]])
+                self.levels[h] = keep
+            h += 1
+
+    def quantiles(self, qs):
+        if not self.count:
+            return [None] * len(qs)
+        items = np.concatenate(self.levels)
+        weights = np.concatenate([np.full(len(level), 2.0 ** h) for h, level in enumerate(self.levels)])
+        order = np.argsort(items)
+        items, cumulative = items[order], np.cumsum(weights[order])
+        positions = np.searchsorted(cumulative, np.array(qs) * cumulative[-1])
+        return [float(items[min(i, len(items) - 1)]) for i in positions]
+
+
+def footer_statistics(path):
+    """
+    Per-column min and max from a Parquet footer, without reading any data.
+    Columns missing statistics in any row group are left out.
+    Null counts are not taken from the footer: some writers record them wrong.
+    """
+    metadata = pq.read_metadata(path)
+    stats = {}
+    for i in range(metadata.num_columns):
+        name = metadata.schema.column(i).path
+        lo, hi, complete = None, None, True
+        for rg in range(metadata.num_row_groups):
+            s = metadata.row_group(rg).column(i).statistics
+            if s is None or not s.has_min_max:
+                complete = False
+                break
+            lo = s.min if lo is None else min(lo, s.min)
+            hi = s.max if hi is None else max(hi, s.max)
+        if complete:
+            stats[name] = (lo, hi)
+    return stats
+
+
+class _ColumnProfile:
+    def __init__(self, dtype):
+        self.dtype = dtype
+        self.numeric = dtype.is_numeric()
+        self.nulls = 0
+        self.min = None
+        self.max = None
+        # Running count, mean and sum of squared deviations (Chan et al. merge)
+        self.n = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.distinct = HyperLogLog()
+        self.quantiles = QuantileSketch() if self.numeric else None
+
+    def add_bounds(self, nulls, lo, hi):
+        self.nulls += nulls
+        if lo is not None:
+            self.min = lo if self.min is None else min(self.min, lo)
+        if hi is not None:
+            self.max = hi if self.max is None else max(self.max, hi)
+
+    def add_values(self, series):
+        values = series.drop_nulls()
+        self.distinct.add(values)
+        if not self.numeric:
+            return
+        x = values.cast(pl.Float64).to_numpy()
+        x = x[~np.isnan(x)]
+        if len(x):
+            n, mean = len(x), float(x.mean())
+            m2 = float(((x - mean) ** 2).sum())
+            delta = mean - self.mean
+            total = self.n + n
+            self.mean += delta * n / total
+            self.m2 += m2 + delta * delta * self.n * n / total
+            self.n = total
+            self.quantiles.add(x)
+
+    def result(self, rows):
+        row = {
+            "dtype": str(self.dtype),
+            "nulls": self.nulls,
+            "null_pct": self.nulls / rows * 100 if rows else 0.0,
+            "distinct_approx": self.distinct.estimate(),
+            "min": None if self.min is None else str(self.min),
+            "max": None if self.max is None else str(self.max),
+            "mean": self.mean if self.n else None,
+            "std": math.sqrt(self.m2 / (self.n - 1)) if self.n > 1 else None,
+        }
+        values = self.quantiles.quantiles(QUANTILES) if self.quantiles else [None] * len(QUANTILES)
+        for q, v in zip(QUANTILES, values):
+            row[f"p{int(q * 100):02d}"] = v
+        return row
+
+
+def profile_frame(lf, parquet_path=None, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Profile every column in one streaming pass over lf: null count, min/max,
+    mean/std, approximate distinct count (HyperLogLog) and approximate
+    quantiles (KLL). With parquet_path, min/max come from the footer
+    statistics where present instead of being aggregated per batch.
+    Returns one row per column.
+    """
+    schema = lf.collect_schema()
+    footer = footer_statistics(parquet_path) if parquet_path else {}
+    profiles = {name: _ColumnProfile(dtype) for name, dtype in schema.items()}
+    for name, (lo, hi) in footer.items():
+        if name in profiles:
+            profiles[name].add_bounds(0, lo, hi)
+
+    bound_exprs = []
+    for c in schema.names():
+        bound_exprs.append(pl.col(c).null_count().alias(f"{c}__nulls"))
+        if c not in footer:
+            bound_exprs += [pl.col(c).min().alias(f"{c}__min"), pl.col(c).max().alias(f"{c}__max")]
+
+    rows = 0
+    for batch in lf.collect_batches(chunk_size=chunk_size, maintain_order=False):
+        rows += batch.height
+        bounds = batch.select(bound_exprs).row(0, named=True)
+        for c, profile in profiles.items():
+            profile.add_bounds(bounds[f"{c}__nulls"], bounds.get(f"{c}__min"), bounds.get(f"{c}__max"))
+            profile.add_values(batch[c])
+
+    return pl.DataFrame([{"column": c, **p.result(rows)} for c, p in profiles.items()])
+
+
+class ProfileCache:
+    """Small LRU of computed profiles, keyed by source fingerprint."""
+
+    def __init__(self, max_profiles=DEFAULT_MAX_PROFILES):
+        self.max_profiles = max_profiles
+        self._profiles = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            profile = self._profiles.get(key)
+            if profile is not None:
+                self._profiles.move_to_end(key)
+            return profile
+
+    def put(self, key, profile):
+        with self._lock:
+            self._profiles[key] = profile
+            self._profiles.move_to_end(key)
+            while len(self._profiles) > self.max_profiles:
+                self._profiles.popitem(last=False)
+
+    def get_or_compute(self, key, compute):
+        profile = self.get(key)
+        if profile is None:
+            profile = compute()
+            self.put(key, profile)
+        return profile
+
+
+# Process-wide profile cache
+PROFILE_CACHE = ProfileCache()
@@ -0,0 +1,79 @@
+import json
+import os
+
+import polars as pl
+import pyarrow as pa
+import pyarrow.ipc as ipc
+
+
+class SortIndex:
+    """
+    Argsort permutation for one column. Positions are stored in ascending order
+    with nulls first and ties in row order, so both sort directions can be served from the same array:
+    a page is just a slice of row positions, which is then gathered from the source.
+    """
+
+    def __init__(self, column, positions, null_count, token=None):
+        self.column = column
+        self.positions = positions  # pl.Series of row positions
+        self.null_count = null_count
+        self.token = token
+
+    @classmethod
+    def build(cls, lf, column, token=None):
+        # Ties are broken by row position, as in every other sorted paging strategy
+        df = lf.select(
+            pl.arg_sort_by([pl.col(column), pl.int_range(pl.len())], nulls_last=False).alias("pos"),
+            pl.col(column).null_count().alias("nulls"),
+        ).collect()
+        return cls(column, df["pos"], df["nulls"][0], token)
+
+    def __len__(self):
+        return len(self.positions)
+
+    @property
+    def nbytes(self):
+        return self.positions.estimated_size()
+
+    def page_positions(self, offset, page_size, descending=False):
+        """Row positions for rows [offset, offset + page_size) of the sorted view."""
+        if not descending:
+            return self.positions.slice(offset, page_size)
+        # Polars keeps nulls first in descending sorts too, so only the non-null
+        # tail is reversed.
+        nulls = self.positions.slice(0, self.null_count)
+        non_null = self.positions.slice(self.null_count).reverse()
+        return pl.concat([nulls, non_null]).slice(offset, page_size)
+
+    def restrict(self, rows):
+        """Index over only the given row positions (e.g. rows matching a filter), same order."""
+        keep = self.positions.is_in(rows.cast(self.positions.dtype))
+        null_count = int(keep.slice(0, self.null_count).sum())
+        return SortIndex(self.column, self.positions.filter(keep), null_count, self.token)
+
+    # --- Sidecar persistence ---
+
+    @staticmethod
+    def sidecar_path(source_path, column):
+        return f"{source_path}.{column}.sortidx"
+
+    def save(self, path):
+        table = pa.table({"pos": self.positions.to_arrow()})
+        meta = {"column": self.column, "null_count": str(self.null_count), "token": json.dumps(self.token)}
+        table = table.replace_schema_metadata(meta)
+        with ipc.new_file(path, table.schema) as writer:
+            writer.write_table(table)
+
+    @classmethod
+    def load(cls, path, token=None):
+        """Load a sidecar, returning None if it is missing or was built for a different token."""
+        if not os.path.exists(path):
+            return None
+        with ipc.open_file(path) as reader:
+            table = reader.read_all()
+        meta = {k.decode(): v.decode() for k, v in (table.schema.metadata or {}).items()}
+        saved_token = json.loads(meta.get("token", "null"))
+        if token is not None and saved_token != json.loads(json.dumps(token)):
+            return None
+        positions = pl.from_arrow(table["pos"])
+        return cls(meta["column"], positions, int(meta["null_count"]), token)
@@ -0,0 +1,176 @@
+import hashlib
+import itertools
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import polars as pl
+
+# Default memory budget for materialized snapshots (bytes)
+DEFAULT_MAX_BYTES = 2 * 1024 ** 3
+# Database snapshots are considered fresh for this many seconds
+DEFAULT_DB_TTL = 300
+
+
+# Config keys that change how a source is read, not what it contains
+READ_OPTIONS = {'partition_on', 'partition_num'}
+
+
+def source_key(source_type, source_config):
+    """Hashable key identifying a source by its type and config."""
+    items = ((k, str(v)) for k, v in source_config.items() if k not in READ_OPTIONS)
+    return (source_type, tuple(sorted(items)))
+
+
+def freshness_token(source_type, source_config):
+    """
+    Token that changes when the underlying data may have changed.
+    Local files: (mtime_ns, size). Databases: hash of uri + query (staleness is handled by TTL).
+    Returns None when no cheap token exists (e.g. cloud URIs).
+    """
+    if source_type == 'local':
+        st = os.stat(source_config['path'])
+        return (st.st_mtime_ns, st.st_size)
+    elif source_type == 'database':
+        raw = f"{source_config['connection_string']}\n{source_config['query']}"
+        return hashlib.sha1(raw.encode()).hexdigest()
+    return None
+
+
+_versions = itertools.count(1)
+
+
+class _Entry:
+    __slots__ = ("token", "table", "nbytes", "created", "version")
+
+    def __init__(self, token, table):
+        self.token = token
+        self.table = table
+        self.nbytes = table.nbytes
+        self.created = time.monotonic()
+        # Unique per load, so derived structures can tell a reload from a hit
+        self.version = next(_versions)
+
+
+class SourceCache:
+    """
+    LRU cache of materialized Arrow snapshots, bounded by a byte budget.
+    Entries are keyed by source_key() and validated against a freshness token.
+    """
+
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES, db_ttl=DEFAULT_DB_TTL):
+        self.max_bytes = max_bytes
+        self.db_ttl = db_ttl
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._epochs = {}  # {key: number of explicit invalidations}
+        self._global_epoch = 0
+        self._loading = {}  # {key: Lock held while that source loads}
+        self._lock = threading.Lock()
+
+    @property
+    def nbytes(self):
+        return self._bytes
+
+    def __len__(self):
+        return len(self._entries)
+
+    def size(self, key):
+        """Bytes held for one source's snapshot (0 if not cached)."""
+        with self._lock:
+            entry = self._entries.get(key)
+            return entry.nbytes if entry is not None else 0
+
+    def _is_fresh(self, key, entry, token):
+        if entry.token != token:
+            return False
+        if key[0] == 'database' and self.db_ttl is not None:
+            return time.monotonic() - entry.created <= self.db_ttl
+        return True
+
+    def _drop(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= entry.nbytes
+
+    def _get_entry(self, key, token):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if not self._is_fresh(key, entry, token):
+                self._drop(key)
+                return None
+            self._entries.move_to_end(key)
+            return entry
+
+    def get(self, key, token):
+        """Return the cached Arrow table, or None if missing or stale."""
+        entry = self._get_entry(key, token)
+        return entry.table if entry is not None else None
+
+    def put(self, key, token, table):
+        """
+        Store a snapshot, evicting least recently used entries to stay within budget.
+        Returns the snapshot version, or None if it was too large to cache.
+        """
+        with self._lock:
+            self._drop(key)
+            entry = _Entry(token, table)
+            if entry.nbytes > self.max_bytes:
+                # Never cache something that would flush the whole cache on its own
+                return None
+            while self._entries and self._bytes + entry.nbytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= evicted.nbytes
+            self._entries[key] = entry
+            self._bytes += entry.nbytes
+            return entry.version
+
+    def invalidate(self, key=None):
+        """Drop one source's snapshot, or everything when key is None."""
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+                self._bytes = 0
+                self._global_epoch += 1
+            else:
+                self._drop(key)
+                self._epochs[key] = self._epochs.get(key, 0) + 1
+
+    def epoch(self, key):
+        """Counter bumped whenever the key is explicitly invalidated."""
+        with self._lock:
+            return (self._global_epoch, self._epochs.get(key, 0))
+
+    def set_budget(self, max_bytes):
+        """Change the byte budget, evicting as needed."""
+        with self._lock:
+            self.max_bytes = max_bytes
+            while self._entries and self._bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= evicted.nbytes
+
+    def get_or_load(self, key, token, loader):
+        """
+        Return (DataFrame, version) for a snapshot, calling loader() on a miss.
+        version changes whenever the snapshot is reloaded (None if not cached).
+        Concurrent misses on one key load it once; the others wait and share it.
+        """
+        entry = self._get_entry(key, token)
+        if entry is not None:
+            return pl.from_arrow(entry.table), entry.version
+        with self._lock:
+            load_lock = self._loading.setdefault(key, threading.Lock())
+        with load_lock:
+            entry = self._get_entry(key, token)
+            if entry is not None:
+                return pl.from_arrow(entry.table), entry.version
+            df = loader()
+            version = self.put(key, token, df.to_arrow())
+            return df, version
+
+
+# Process-wide cache shared by all DataManager instances
+SOURCE_CACHE = SourceCache()
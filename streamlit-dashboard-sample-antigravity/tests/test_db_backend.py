@@ -0,0 +1,148 @@
+import sqlite3
+
+import polars as pl
+import pytest
+
+import filters
+from db_backend import DatabaseBackend
+from filters import Condition
+
+ROWS = 500
+PAGE_SIZE = 37
+
+
+@pytest.fixture
+def table():
+    """ids 1..ROWS, a sort column with ties and NULLs, and a category to filter on."""
+    return pl.DataFrame({
+        "id": range(1, ROWS + 1),
+        "value": [None if i % 7 == 0 else float(i % 13) for i in range(1, ROWS + 1)],
+        "category": ["abc"[i % 3] for i in range(1, ROWS + 1)],
+    })
+
+
+@pytest.fixture
+def uri(tmp_path, table):
+    path = tmp_path / "source.db"
+    with sqlite3.connect(path) as conn:
+        conn.execute("CREATE TABLE t (id INTEGER PRIMARY KEY, value REAL, category TEXT)")
+        conn.executemany("INSERT INTO t VALUES (?, ?, ?)", table.rows())
+    return f"sqlite://{path}"
+
+
+def expected_order(df, column, descending):
+    # NULLs first in both directions, ties by id in the sort direction
+    return df.sort([column, "id"], descending=descending, nulls_last=False)
+
+
+def read_pages(backend, column, descending, where=None):
+    pages = []
+    offset = 0
+    while True:
+        page = backend.page(offset, PAGE_SIZE, sort_col=column, descending=descending, where=where)
+        if not page.height:
+            return pl.concat(pages)
+        pages.append(page)
+        offset += page.height
+
+
+@pytest.mark.parametrize("descending", [False, True])
+def test_keyset_pages_follow_full_order_with_nulls(uri, table, descending):
+    backend = DatabaseBackend(uri, "SELECT * FROM t")
+    got = read_pages(backend, "value", descending)
+    assert got.equals(expected_order(table, "value", descending))
+    # Pages past the NULLs were seeked from a bookmark rather than an OFFSET
+    marks = backend._bookmarks[("value", descending, None)]
+    assert any(value is not None for value, _ in marks.values())
+
+
+@pytest.mark.parametrize("descending", [False, True])
+def test_deep_page_seeks_from_nearest_bookmark(uri, table, descending):
+    backend = DatabaseBackend(uri, "SELECT * FROM t")
+    expected = expected_order(table, "value", descending)
+    for offset in range(0, 5 * PAGE_SIZE, PAGE_SIZE):
+        backend.page(offset, PAGE_SIZE, sort_col="value", descending=descending)
+    offset = 8 * PAGE_SIZE + 5
+    got = backend.page(offset, PAGE_SIZE, sort_col="value", descending=descending)
+    assert got.equals(expected.slice(offset, PAGE_SIZE))
+
+
+@pytest.mark.parametrize("descending", [False, True])
+def test_keyset_pages_with_filter(uri, table, descending):
+    backend = DatabaseBackend(uri, "SELECT * FROM t")
+    conditions = [Condition("category", "in", ["a", "c"])]
+    got = read_pages(backend, "value", descending, where=filters.to_sql(conditions))
+    expected = expected_order(table.filter(filters.to_expr(conditions)), "value", descending)
+    assert got.equals(expected)
+
+
+@pytest.mark.parametrize("conditions", [
+    [Condition("category", "eq", "b")],
+    [Condition("value", "between", (3.0, 9.0))],
+    [Condition("value", "between", (None, 4.0)), Condition("category", "ne", "a")],
+    [Condition("value", "is_null")],
+    [Condition("id", "in", [1, 2, 3, 999])],
+])
+def test_filtered_count(uri, table, conditions):
+    backend = DatabaseBackend(uri, "SELECT * FROM t")
+    assert backend.count() == ROWS
+    assert backend.count(where=filters.to_sql(conditions)) == table.filter(filters.to_expr(conditions)).height
+
+
+def spy_reads(monkeypatch):
+    """Record the keyword arguments of every read_database_uri call."""
+    calls = []
+    read = pl.read_database_uri
+
+    def spy(query, uri, **kwargs):
+        calls.append(kwargs)
+        return read(query, uri, **kwargs)
+
+    monkeypatch.setattr(pl, "read_database_uri", spy)
+    return calls
+
+
+@pytest.mark.parametrize("partition_on", [None, "id"])
+def test_partitioned_read(uri, table, monkeypatch, partition_on):
+    backend = DatabaseBackend(uri, "SELECT * FROM t")
+    calls = spy_reads(monkeypatch)
+    got = backend.read_all(partition_on=partition_on, partition_num=4)
+    assert got.sort("id").equals(table)
+    assert calls[-1] == {"partition_on": "id", "partition_num": 4, "partition_range": (1, ROWS)}
+
+
+def test_partitioned_read_without_integer_column(tmp_path):
+    path = tmp_path / "names.db"
+    with sqlite3.connect(path) as conn:
+        conn.execute("CREATE TABLE names (name TEXT)")
+        conn.executemany("INSERT INTO names VALUES (?)", [("x",), ("y",)])
+    backend = DatabaseBackend(f"sqlite://{path}", "SELECT * FROM names")
+    assert backend.partition_column() is None
+    assert backend.read_all(partition_num=4)["name"].sort().to_list() == ["x", "y"]
+
+
+def test_partitioned_read_of_empty_result(uri, monkeypatch):
+    backend = DatabaseBackend(uri, "SELECT * FROM t WHERE id < 0")
+    calls = spy_reads(monkeypatch)
+    assert backend.read_all(partition_num=4).height == 0
+    assert "partition_on" not in calls[-1]
+
+
+def test_lookups_leave_no_bookmarks(uri, table):
+    backend = DatabaseBackend(uri, "SELECT * FROM t")
+    for ids in ([1, 2], [3], [400, 5]):
+        where = filters.to_sql([Condition("id", "in", ids)])
+        assert backend.page(0, len(ids), where=where, bookmark=False)["id"].sort().to_list() == sorted(ids)
+    assert not backend._bookmarks
+
+
+def test_bookmarks_are_bounded(uri, table):
+    backend = DatabaseBackend(uri, "SELECT * FROM t", max_bookmark_views=3)
+    backend.page(0, PAGE_SIZE, sort_col="value")
+    for i in range(10):
+        backend.page(0, PAGE_SIZE, sort_col="value", where=f'"id" > {i}')
+        # The first view stays recently used
+        backend.page(PAGE_SIZE, PAGE_SIZE, sort_col="value")
+    assert len(backend._bookmarks) == 3
+    assert ("value", False, None) in backend._bookmarks
+    assert ("value", False, '"id" > 9') in backend._bookmarks
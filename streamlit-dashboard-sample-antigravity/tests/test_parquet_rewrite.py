@@ -0,0 +1,136 @@
+import datetime
+
+import polars as pl
+import pyarrow.parquet as pq
+import pytest
+
+from data_manager import DataManager
+from edit_overlay import apply_updates, build_updates
+from parquet_rewrite import rewrite_row_groups
+from source_cache import SourceCache
+
+ROWS = 4_000
+ROW_GROUP_ROWS = 1_000
+# Edited ids, all in the second row group
+EDITED = {1_500: {"name": "edited", "value": -1.0}, 1_501: {"value": None}, 1_999: {"name": None}}
+CODECS = {"id": "SNAPPY", "name": "ZSTD", "value": "UNCOMPRESSED"}
+
+
+@pytest.fixture
+def table():
+    return pl.DataFrame({
+        "id": range(ROWS),
+        "name": [None if i % 11 == 0 else f"n{i % 97}" for i in range(ROWS)],
+        "value": [float(i % 1000) / 3 for i in range(ROWS)],
+    })
+
+
+def write_with_pyarrow(df, path):
+    pq.write_table(df.to_arrow(), path, row_group_size=ROW_GROUP_ROWS,
+                   compression={col: codec.lower().replace("uncompressed", "none") for col, codec in CODECS.items()})
+
+
+def write_with_polars(df, path):
+    df.write_parquet(path, row_group_size=ROW_GROUP_ROWS, compression="zstd")
+
+
+@pytest.fixture(params=[write_with_pyarrow, write_with_polars], ids=["pyarrow", "polars"])
+def source(request, tmp_path, table):
+    path = tmp_path / "source.parquet"
+    request.param(table, path)
+    return path
+
+
+def updates_for(path):
+    return build_updates(EDITED, pl.read_parquet_schema(path))
+
+
+def rewrite(src, dst):
+    updates = updates_for(src)
+    return rewrite_row_groups(src, dst, updates["id"], lambda df: apply_updates(df, updates))
+
+
+def chunk_bytes(path, row_group, column):
+    """The raw pages of one column chunk."""
+    chunk = pq.ParquetFile(path).metadata.row_group(row_group).column(column)
+    start = chunk.dictionary_page_offset if chunk.has_dictionary_page else chunk.data_page_offset
+    with open(path, "rb") as f:
+        f.seek(start)
+        return f.read(chunk.total_compressed_size)
+
+
+def test_output_matches_full_rewrite(source, tmp_path):
+    dst = tmp_path / "out.parquet"
+    stats = rewrite(source, dst)
+    assert stats["row_groups_rewritten"] == 1
+    assert stats["row_groups_copied"] == ROWS // ROW_GROUP_ROWS - 1
+    expected = apply_updates(pl.read_parquet(source), updates_for(source))
+    assert pl.read_parquet(dst).equals(expected)
+    assert pq.ParquetFile(dst).metadata.num_rows == ROWS
+
+
+def test_untouched_row_groups_are_copied_byte_for_byte(source, tmp_path):
+    dst = tmp_path / "out.parquet"
+    rewrite(source, dst)
+    meta = pq.ParquetFile(dst).metadata
+    assert meta.num_row_groups == ROWS // ROW_GROUP_ROWS
+    for i in range(meta.num_row_groups):
+        for column in range(meta.num_columns):
+            same = chunk_bytes(source, i, column) == chunk_bytes(dst, i, column)
+            if i != 1:
+                assert same, (i, column)
+            elif meta.schema.column(column).name != "id":
+                # The edited columns of the rewritten row group were re-encoded
+                assert not same, (i, column)
+
+
+def test_codecs_and_statistics_survive(source, tmp_path):
+    dst = tmp_path / "out.parquet"
+    rewrite(source, dst)
+    before, after = pq.ParquetFile(source).metadata, pq.ParquetFile(dst).metadata
+    rewritten = pl.read_parquet(dst)
+    for i in range(after.num_row_groups):
+        assert after.row_group(i).num_rows == before.row_group(i).num_rows
+        for column in range(after.num_columns):
+            old, new = before.row_group(i).column(column), after.row_group(i).column(column)
+            assert new.compression == old.compression
+            assert new.statistics is not None and new.statistics.has_min_max
+            if i != 1:
+                assert new.statistics == old.statistics
+            else:
+                values = rewritten.slice(i * ROW_GROUP_ROWS, ROW_GROUP_ROWS)[new.path_in_schema]
+                assert new.statistics.null_count == values.null_count()
+                assert (new.statistics.min, new.statistics.max) == (values.min(), values.max())
+
+
+def test_pyarrow_codecs_per_column(tmp_path, table):
+    src, dst = tmp_path / "source.parquet", tmp_path / "out.parquet"
+    write_with_pyarrow(table, src)
+    rewrite(src, dst)
+    meta = pq.ParquetFile(dst).metadata
+    for i in range(meta.num_row_groups):
+        row_group = meta.row_group(i)
+        assert {row_group.column(c).path_in_schema: row_group.column(c).compression
+                for c in range(meta.num_columns)} == CODECS
+
+
+@pytest.fixture
+def int96_source(tmp_path, table):
+    """A file whose timestamps are INT96, which the rewritten row group would encode as INT64."""
+    path = tmp_path / "int96.parquet"
+    df = table.with_columns(pl.lit(datetime.datetime(2024, 1, 1)).cast(pl.Datetime("ns")).alias("ts"))
+    pq.write_table(df.to_arrow(), path, row_group_size=ROW_GROUP_ROWS, use_deprecated_int96_timestamps=True)
+    return path
+
+
+def test_schema_mismatch_raises(int96_source, tmp_path):
+    with pytest.raises(ValueError, match="schema"):
+        rewrite(int96_source, tmp_path / "out.parquet")
+
+
+def test_save_falls_back_to_full_rewrite(int96_source, tmp_path):
+    manager = DataManager("local", {"path": str(int96_source)}, cache=SourceCache())
+    out_path = manager.save_edits(EDITED, output_folder=str(tmp_path / "modified"))
+    assert manager.last_save_stats["bytes_copied"] == 0
+    expected = apply_updates(pl.read_parquet(int96_source), updates_for(int96_source))
+    assert pl.read_parquet(out_path).equals(expected)
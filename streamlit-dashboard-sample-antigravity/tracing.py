@@ -0,0 +1,216 @@
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+import polars as pl
+
+# Finished spans kept for the timings panel
+DEFAULT_MAX_SPANS = 2000
+# Slowest plan nodes kept from each Polars profile
+PROFILE_NODES = 10
+DEFAULT_TRACE_DIR = "data/traces"
+METRIC_PREFIX = "dashboard_span"
+
+
+def frame_size(obj):
+    """(rows, bytes) of a Polars DataFrame or Arrow table, else (None, None)."""
+    if isinstance(obj, pl.DataFrame):
+        return obj.height, obj.estimated_size()
+    if hasattr(obj, "num_rows") and hasattr(obj, "nbytes"):
+        return obj.num_rows, obj.nbytes
+    return None, None
+
+
+class Span:
+    __slots__ = ("name", "parent", "start", "seconds", "rows", "bytes", "attrs", "profile", "thread", "session")
+
+    def __init__(self, name, parent, attrs, session=None):
+        self.name = name
+        self.parent = parent
+        self.start = time.time()
+        self.seconds = None
+        self.rows = None
+        self.bytes = None
+        self.attrs = attrs
+        self.profile = None  # [{node, start, end}] in microseconds, when profiling
+        self.thread = threading.current_thread().name
+        self.session = session
+
+    def set_frame(self, obj):
+        """Record the rows and bytes of a result."""
+        rows, nbytes = frame_size(obj)
+        if rows is not None:
+            self.rows, self.bytes = rows, nbytes
+        return obj
+
+    def to_dict(self):
+        return {
+            "name": self.name,
+            "parent": self.parent,
+            "start": self.start,
+            "seconds": self.seconds,
+            "rows": self.rows,
+            "bytes": self.bytes,
+            "thread": self.thread,
+            "session": self.session,
+            **({"attrs": self.attrs} if self.attrs else {}),
+            **({"profile": self.profile} if self.profile else {}),
+        }
+
+
+class Tracer:
+    """
+    Wall-time spans around the dashboard's hot paths, with the rows and bytes
+    each produced. Spans nest per thread, so a page fetch shows up under the
+    phase that triggered it. One tracer serves the whole process: bind()
+    tags a thread's spans with its session and turns profiling on for that
+    thread only, so collects made there through Tracer.collect run Polars'
+    profile() and keep the slowest plan nodes. Spans from background threads
+    carry no session. Totals per span name are kept for Prometheus export;
+    the most recent spans are kept for the panel and JSONL export.
+    """
+
+    def __init__(self, max_spans=DEFAULT_MAX_SPANS):
+        self.enabled = True
+        self._spans = deque(maxlen=max_spans)
+        self._totals = {}  # {name: [count, seconds, rows, bytes]}
+        self._exported = 0  # spans finished before the last JSONL export
+        self._finished = 0
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    def _stack(self):
+        if not hasattr(self._local, "stack"):
+            self._local.stack = []
+        return self._local.stack
+
+    def bind(self, session, profile=False):
+        """Tag spans started on this thread with session, and profile its collects if profile is set."""
+        self._local.session = session
+        self._local.profile = profile
+
+    @contextmanager
+    def span(self, name, **attrs):
+        if not self.enabled:
+            yield Span(name, None, attrs)
+            return
+        stack = self._stack()
+        span = Span(name, stack[-1].name if stack else None, attrs, getattr(self._local, "session", None))
+        stack.append(span)
+        t0 = time.perf_counter()
+        try:
+            yield span
+        finally:
+            span.seconds = time.perf_counter() - t0
+            stack.pop()
+            self._finish(span)
+
+    def _finish(self, span):
+        with self._lock:
+            self._spans.append(span)
+            self._finished += 1
+            totals = self._totals.setdefault(span.name, [0, 0.0, 0, 0])
+            totals[0] += 1
+            totals[1] += span.seconds
+            totals[2] += span.rows or 0
+            totals[3] += span.bytes or 0
+
+    def collect(self, lf):
+        """lf.collect(), or lf.profile() when profiling, recorded on the current span."""
+        stack = self._stack() if self.enabled else []
+        if not (getattr(self._local, "profile", False) and stack):
+            df = lf.collect()
+        else:
+            df, timings = lf.profile()
+            timings = timings.with_columns((pl.col("end") - pl.col("start")).alias("us"))
+            slowest = timings.sort("us", descending=True).head(PROFILE_NODES)
+            stack[-1].profile = slowest.select("node", "start", "end").to_dicts()
+        if stack:
+            stack[-1].set_frame(df)
+        return df
+
+    def recent(self, n=50, session=None):
+        """The last n spans (of one session, if given), newest first."""
+        with self._lock:
+            spans = [s for s in self._spans if session is None or s.session == session][-n:][::-1]
+        return pl.DataFrame(
+            [{"span": s.name, "parent": s.parent, "ms": s.seconds * 1000, "rows": s.rows,
+              "bytes": s.bytes, "thread": s.thread} for s in spans],
+            schema={"span": pl.String, "parent": pl.String, "ms": pl.Float64, "rows": pl.Int64,
+                    "bytes": pl.Int64, "thread": pl.String},
+        )
+
+    def last_profile(self, session=None):
+        """Profile nodes of the most recent profiled span (of one session, if given), as (span name, DataFrame), or None."""
+        with self._lock:
+            for s in reversed(self._spans):
+                if s.profile and (session is None or s.session == session):
+                    return s.name, pl.DataFrame(s.profile).with_columns(
+                        ((pl.col("end") - pl.col("start")) / 1000).alias("ms"))
+        return None
+
+    def summary(self):
+        """Per span name: count, mean/p95/max milliseconds over recent spans, and totals."""
+        with self._lock:
+            rows = [(s.name, s.seconds * 1000) for s in self._spans]
+            totals = {name: list(t) for name, t in self._totals.items()}
+        if not rows:
+            return pl.DataFrame()
+        recent = pl.DataFrame(rows, schema=["span", "ms"], orient="row").group_by("span").agg(
+            pl.col("ms").mean().alias("mean_ms"),
+            pl.col("ms").quantile(0.95).alias("p95_ms"),
+            pl.col("ms").max().alias("max_ms"),
+        )
+        total = pl.DataFrame(
+            [(name, t[0], t[2], t[3]) for name, t in totals.items()],
+            schema=["span", "count", "rows", "bytes"], orient="row",
+        )
+        return total.join(recent, on="span", how="left").sort("count", descending=True)
+
+    def export_jsonl(self, path):
+        """Append spans finished since the last export, one JSON object per line. Returns how many."""
+        with self._lock:
+            new = min(self._finished - self._exported, len(self._spans))
+            spans = list(self._spans)[len(self._spans) - new:] if new else []
+            self._exported = self._finished
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "a") as f:
+            for s in spans:
+                f.write(json.dumps(s.to_dict(), default=str) + "\n")
+        return len(spans)
+
+    def export_prometheus(self, path):
+        """Write cumulative totals in Prometheus text format (for a textfile collector)."""
+        with self._lock:
+            totals = {name: list(t) for name, t in self._totals.items()}
+        lines = []
+        for metric, i, kind, help_text in [
+            ("seconds", 1, "counter", "Wall time spent in the span"),
+            ("count", 0, "counter", "Times the span ran"),
+            ("rows", 2, "counter", "Rows produced by the span"),
+            ("bytes", 3, "counter", "Bytes produced by the span"),
+        ]:
+            name = f"{METRIC_PREFIX}_{metric}_total"
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for span, t in sorted(totals.items()):
+                lines.append(f'{name}{{span="{span}"}} {t[i]}')
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        # Written whole and swapped in, so a scraper never reads half a file
+        tmp = f"{path}.tmp"
+        with open(tmp, "w") as f:
+            f.write("\n".join(lines) + "\n")
+        os.replace(tmp, path)
+
+    def clear(self):
+        with self._lock:
+            self._spans.clear()
+            self._totals = {}
+            self._exported = self._finished = 0
+
+
+# Process-wide tracer
+TRACER = Tracer()
@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""
+Keep the modules both dashboards use identical.
+
+The two apps are separate uv projects, each deployable from its own directory
+with its own lockfile, so the shared modules are copied into both rather than
+installed from a common package. The antigravity app holds the copies that are
+edited; this script copies them to the opencode app, or with --check lists the
+ones that differ and exits non-zero.
+"""
+
+import argparse
+import filecmp
+import shutil
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).parent
+SOURCE = ROOT / "streamlit-dashboard-sample-antigravity"
+TARGETS = [ROOT / "data-dashboard-streamlit-opencode"]
+SHARED_MODULES = [
+    "columnar_cache.py",
+    "cube.py",
+    "jobs.py",
+    "paging.py",
+    "profiler.py",
+    "row_count.py",
+    "shared_registry.py",
+    "tracing.py",
+]
+
+
+def out_of_sync():
+    """Copies of the shared modules that differ from (or are missing next to) the source's."""
+    return [
+        target / name
+        for target in TARGETS
+        for name in SHARED_MODULES
+        if not (target / name).exists() or not filecmp.cmp(SOURCE / name, target / name, shallow=False)
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Copy the shared modules from the antigravity app to the opencode app")
+    parser.add_argument("--check", action="store_true", help="Only report copies that differ")
+    args = parser.parse_args()
+
+    stale = out_of_sync()
+    if args.check:
+        for path in stale:
+            print(f"Out of sync: {path.relative_to(ROOT)}")
+        return 1 if stale else 0
+    for path in stale:
+        shutil.copyfile(SOURCE / path.name, path)
+        print(f"Updated {path.relative_to(ROOT)}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())